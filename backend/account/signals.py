@@ -2,6 +2,7 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from authentication.models import UserAccount
 from teacher.dashboard.models import Dashboard
+from core.authentication import mark_claims_stale
 from .models import Teacher, Student
 
 @receiver(post_save, sender=UserAccount)
@@ -17,3 +18,19 @@ def create_teacher_dashboard(sender, instance, created, **kwargs):
     if created:
         Dashboard.objects.create(teacher=instance)
 
+
+# Columns copied into token claims, see core.authentication
+CLAIM_FIELDS = {
+    UserAccount: {"email", "username", "full_name", "role", "is_staff", "is_active"},
+    Teacher: {"account_type", "status", "can_access_schedule"},
+    Student: {"account_type"},
+}
+
+@receiver(post_save, sender=UserAccount)
+@receiver(post_save, sender=Teacher)
+@receiver(post_save, sender=Student)
+def expire_token_claims(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not CLAIM_FIELDS[sender] & set(update_fields):
+        return
+    # Tokens issued before this change carry old claims, authenticate them from the row
+    mark_claims_stale(instance.pk if sender is UserAccount else instance.user_id)
@@ -94,6 +94,15 @@ class UserAccount(AbstractBaseUser, PermissionsMixin):
     def get_short_name(self):
         return self.username
 
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Users authenticated from token claims (core.authentication) defer
+        # every other column; the first one touched loads them all at once
+        if fields is not None and len(fields) == 1:
+            deferred = self.get_deferred_fields()
+            if fields[0] in deferred:
+                fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
     class Meta:
         verbose_name = _("User Account")
         verbose_name_plural = _("User Accounts")
@@ -7,6 +7,7 @@ from django.contrib.auth.password_validation import validate_password
 from django.utils.translation import gettext_lazy as _
 
 from account.models import Teacher, Student
+from core.authentication import token_claims
 from .models import ROLE_CHOICES
 import uuid
 
@@ -78,4 +79,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
             except Student.DoesNotExist:
                 token['subscription_type'] = "unverified"
 
+        # Read by core.authentication.ClaimsJWTAuthentication instead of the user row
+        for claim, value in token_claims(user).items():
+            token[claim] = value
+
         return token
@@ -2,7 +2,6 @@ from celery import shared_task
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils import timezone 
-from datetime import timedelta
 
 from account.models import Teacher, SubscriptionTeacher
 import logging
@@ -80,10 +79,11 @@ def send_session_reminder_to_teacher(
     student_name,
     session_date,
     session_time,
-    session_link
+    session_link,
+    minutes_left=30
 ):
     try:
-        subject = "Session Reminder - Starting in 30 Minutes"
+        subject = f"Session Reminder - Starting in {minutes_left} Minute{'s' if minutes_left != 1 else ''}"
         body = render_to_string(
             "session_reminder_teacher.html",
             {
@@ -91,7 +91,8 @@ def send_session_reminder_to_teacher(
                 "student_name": student_name,
                 "session_date": session_date,
                 "session_time": session_time,
-                "session_link": session_link
+                "session_link": session_link,
+                "minutes_left": minutes_left
             }
         )
         email = EmailMultiAlternatives(subject, "", to=[teacher_email])
@@ -111,10 +112,11 @@ def send_session_reminder_to_student(
     teacher_name,
     session_date,
     session_time,
-    session_link
+    session_link,
+    minutes_left=30
 ):
     try:
-        subject = "Session Reminder - Starting in 30 Minutes"
+        subject = f"Session Reminder - Starting in {minutes_left} Minute{'s' if minutes_left != 1 else ''}"
         body = render_to_string(
             "session_reminder_student.html",
             {
@@ -122,7 +124,8 @@ def send_session_reminder_to_student(
                 "teacher_name": teacher_name,
                 "session_date": session_date,
                 "session_time": session_time,
-                "session_link": session_link
+                "session_link": session_link,
+                "minutes_left": minutes_left
             }
         )
         email = EmailMultiAlternatives(subject, "", to=[student_email])
@@ -134,71 +137,6 @@ def send_session_reminder_to_student(
         raise self.retry(exc=exc, countdown=10)
 
 
-@shared_task
-def check_and_send_session_reminders():
-    """
-    Celery Beat task that runs every minute to check for sessions
-    starting in 30 minutes and sends reminders.
-    """
-    from teacher.session.models import BookedSession  # Import here to avoid circular imports
-    
-    now = timezone.now()
-    # Get sessions starting in 29-31 minutes (1-minute window to catch it)
-    reminder_time_start = now + timedelta(minutes=29)
-    reminder_time_end = now + timedelta(minutes=31)
-    
-    # Get all paid sessions that haven't been reminded yet and are starting soon
-    sessions_to_remind = BookedSession.objects.filter(
-        is_paid=True,
-        session_time__gte=reminder_time_start,
-        session_time__lte=reminder_time_end,
-        reminder_sent=False  # Add this field to your model
-    )
-    
-    logger.info(f"Found {sessions_to_remind.count()} sessions to remind")
-    
-    for session in sessions_to_remind:
-        teacher = session.teacher
-        student = session.student
-        
-        if not teacher or not student:
-            continue
-        
-        # Format session details
-        session_date = session.session_time.strftime("%B %d, %Y")
-        session_time = session.session_time.strftime("%I:%M %p")
-        
-        # Create session link (adjust based on your URL structure)
-        session_link = f"https://ballmastery.com/session/{session.channel_name}"
-        
-        # Send reminder to teacher
-        send_session_reminder_to_teacher.delay(
-            teacher_email=teacher.user.email,
-            teacher_name=teacher.user.get_full_name() or teacher.user.username,
-            student_name=student.get_full_name() or student.username,
-            session_date=session_date,
-            session_time=session_time,
-            session_link=session_link
-        )
-        
-        # Send reminder to student
-        send_session_reminder_to_student.delay(
-            student_email=student.email,
-            student_name=student.get_full_name() or student.username,
-            teacher_name=teacher.user.get_full_name() or teacher.user.username,
-            session_date=session_date,
-            session_time=session_time,
-            session_link=session_link
-        )
-        
-        # Mark as reminded
-        session.reminder_sent = True
-        session.save()
-        
-        logger.info(f"Reminders queued for session {session.id}")
-    
-    return f"Processed {sessions_to_remind.count()} session reminders"
-
 @shared_task
 def remove_invalid_teacher_subscriptions():
     """
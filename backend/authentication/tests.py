@@ -1,3 +1,112 @@
+import uuid
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from account.models import Student, Teacher
+from core import authentication
+from core.authentication import ClaimsJWTAuthentication, _LocalCache
+from .models import UserAccount
+from .serializers import CustomTokenObtainPairSerializer
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        # Every test starts without per-process copies of rows or stamps
+        patcher = mock.patch.object(authentication, "_local", _LocalCache(size=100))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        name = f"teacher{uuid.uuid4().hex[:8]}"
+        self.user = UserAccount.objects.create_user(
+            email=f"{name}@example.com", username=name, password="secret", role="teacher", is_active=True
+        )
+        self.backend = ClaimsJWTAuthentication()
+
+    def authenticate(self, token=None):
+        token = token or CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        return self.backend.get_user(self.backend.get_validated_token(str(token)))
+
+    def test_fresh_claims_need_no_query(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.teacher.pk, self.user.teacher.pk)
+
+    def test_claims_older_than_a_profile_change_are_not_trusted(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        teacher = Teacher.objects.get(user=self.user)
+        teacher.can_access_schedule = True
+        teacher.save(update_fields=["can_access_schedule"])
+
+        with self.assertNumQueries(1):
+            user = self.authenticate(token)
+        self.assertTrue(user.teacher.can_access_schedule)
+
+        # A token issued after the change carries it
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        with self.assertNumQueries(0):
+            self.assertTrue(self.authenticate(token).teacher.can_access_schedule)
+
+    def test_unreadable_stamps_fall_back_to_the_database(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        with mock.patch.object(authentication.cache, "get", side_effect=ConnectionError("cache down")):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.authenticate(token).pk, self.user.pk)
+
+    def test_tokens_without_claims_use_the_database(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        del token["claims_at"]
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(token).pk, self.user.pk)
+
+    def test_deactivated_users_are_rejected(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.user.is_active = False
+        self.user.save(update_fields=["is_active"])
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+        # Claims issued while inactive are rejected without the row
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        with self.assertNumQueries(0), self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+
+class ClaimsProfileViewTests(TestCase):
+    """Views serializing a whole profile load it at once, not a deferred column at a time"""
+
+    def setUp(self):
+        patcher = mock.patch.object(authentication, "_local", _LocalCache(size=100))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, role, path):
+        name = f"{role}{uuid.uuid4().hex[:8]}"
+        user = UserAccount.objects.create_user(
+            email=f"{name}@example.com", username=name, password="secret", role=role, is_active=True
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}")
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return [query["sql"] for query in context.captured_queries]
+
+    def assertRowQueries(self, queries, table, count):
+        self.assertEqual(sum(f'FROM "{table}"' in sql for sql in queries), count, queries)
+
+    def test_teacher_account_detail(self):
+        queries = self.get("teacher", "/teacher/d/account/")
+        self.assertRowQueries(queries, Teacher._meta.db_table, 1)
+        self.assertRowQueries(queries, UserAccount._meta.db_table, 0)
 
-# Create your tests here.
+    def test_student_profile(self):
+        queries = self.get("student", "/student/profile/")
+        self.assertRowQueries(queries, Student._meta.db_table, 1)
+        self.assertRowQueries(queries, UserAccount._meta.db_table, 0)
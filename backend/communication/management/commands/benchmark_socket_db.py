@@ -0,0 +1,103 @@
+import asyncio
+import time
+import uuid
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from authentication.models import UserAccount
+from communication.messaging import socket
+from communication.messaging.db import database_sync_to_async
+from communication.messaging.models import Conversation
+from communication.messaging.receipts import advance_read_mark
+from communication.messaging.writer import message_writer
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure socket handler throughput (events/sec) for many concurrent clients, "
+        "once per database pool size. Run with SOCKETIO_MANAGER=memory to leave Redis out."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=300, help="Concurrent simulated clients")
+        parser.add_argument("--events", type=int, default=30, help="Events sent by every client")
+        parser.add_argument("--pool-sizes", default="0,8",
+                            help="Comma separated SOCKET_DB_POOL_SIZE values, 0 is the shared sync_to_async thread")
+
+    def handle(self, *args, **options):
+        try:
+            pool_sizes = [int(size) for size in options["pool_sizes"].split(",") if size.strip()]
+        except ValueError:
+            raise CommandError("--pool-sizes must be a comma separated list of integers")
+        if options["clients"] <= 0 or options["events"] <= 0:
+            raise CommandError("--clients and --events must be positive")
+
+        # One teacher/student pair per client, like real conversations
+        run = uuid.uuid4().hex[:6]
+        users = UserAccount.objects.bulk_create([
+            UserAccount(
+                email=f"bench-{role}-{run}-{i}@example.com", username=f"bench_{role[0]}_{run}_{i}",
+                full_name=f"Benchmark {role.title()} {i}", role=role, profile_pic='bench', password='!'
+            )
+            for i in range(options["clients"])
+            for role in ('teacher', 'student')
+        ])
+        conversations = Conversation.objects.bulk_create([
+            Conversation(teacher=users[i], student=users[i + 1])
+            for i in range(0, len(users), 2)
+        ])
+
+        try:
+            for size in pool_sizes:
+                with override_settings(SOCKET_DB_POOL_SIZE=size):
+                    events, seconds, latencies = asyncio.run(
+                        _run_clients(conversations, options["events"])
+                    )
+                label = "shared thread" if size == 0 else f"pool of {size}"
+                ms = np.array(latencies) * 1000
+                self.stdout.write(
+                    f"{label:<14} {events} events in {seconds:.2f}s: {events / seconds:,.0f} events/sec, "
+                    f"p50 {np.percentile(ms, 50):.1f}ms, p99 {np.percentile(ms, 99):.1f}ms"
+                )
+        finally:
+            # Cascades to the conversations, their messages and the notifications
+            UserAccount.objects.filter(id__in=[user.id for user in users]).delete()
+
+
+advance_read = database_sync_to_async(advance_read_mark)
+
+
+async def _run_clients(conversations, events):
+    latencies = []
+
+    async def client(number, conversation):
+        sid = f"bench-{number}"
+        for event in range(events):
+            kind = event % 3
+            started = time.perf_counter()
+            if kind == 0:
+                await socket.send_message(sid, {
+                    "conversation_id": str(conversation.id),
+                    "sender_id": str(conversation.student_id),
+                    "recipient_id": str(conversation.teacher_id),
+                    "text": f"Benchmark message {number}/{event}",
+                })
+            elif kind == 1:
+                # mark_as_read only queues the receipt, time the upsert it leads to
+                await advance_read(conversation.id, conversation.teacher_id)
+            else:
+                await socket.send_notification(sid, {
+                    "user_id": str(conversation.student_id),
+                    "header": "Benchmark",
+                    "detail": f"Notification {number}/{event}",
+                    "onclick_location": "/benchmark/",
+                })
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client(number, conversation) for number, conversation in enumerate(conversations)])
+    seconds = time.perf_counter() - started
+    await message_writer.close()
+    return len(conversations) * events, seconds, latencies
@@ -0,0 +1,30 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from communication.notification.events import NOTIFICATION_GROUP, notification_consumer
+
+
+class Command(BaseCommand):
+    help = (
+        f"Consume domain events from the event bus as a member of the {NOTIFICATION_GROUP} "
+        "consumer group, storing and pushing their notifications. Run as many as needed, "
+        "every event is handled by one of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--consumer", help="Consumer name, unique within the group (default host-pid)")
+        parser.add_argument("--batch", type=int, default=50, help="Events read per call")
+        parser.add_argument("--block", type=int, default=5000, help="Milliseconds to wait for new events")
+
+    def handle(self, *args, **options):
+        consumer = notification_consumer(name=options["consumer"], batch=options["batch"], block_ms=options["block"])
+
+        # Finish the current batch on SIGTERM/SIGINT, its events are acked
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+
+        self.stdout.write(f"Consuming events as {consumer.name} in {NOTIFICATION_GROUP}")
+        consumer.run(stop)
@@ -0,0 +1,314 @@
+import asyncio
+import json
+import os
+import random
+import socket as _socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import socketio
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import UserAccount
+from communication.messaging.models import Conversation
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the chat and notification socket server: N simulated teacher/student pairs "
+        "connect, send messages at a fixed rate and report delivery latency, drops and server CPU. "
+        "Without --url a single uvicorn worker of core.asgi is started with the in-memory client "
+        "manager against the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pairs", type=int, default=100, help="Teacher/student pairs, two sockets each")
+        parser.add_argument("--rate", type=float, default=1.0, help="Messages per second sent by every student")
+        parser.add_argument("--duration", type=float, default=30.0, help="Seconds of sending")
+        parser.add_argument("--ramp", type=float, default=5.0, help="Seconds over which clients connect")
+        parser.add_argument("--notification-ratio", type=float, default=0.1,
+                            help="Share of sends that are notifications instead of chat messages")
+        parser.add_argument("--grace", type=float, default=5.0,
+                            help="Seconds to wait for deliveries after sending stops")
+        parser.add_argument("--url", help="Existing server to test, e.g. http://127.0.0.1:8000")
+        parser.add_argument("--server-pid", type=int, help="Pid of the --url server, to report its CPU")
+        parser.add_argument("--port", type=int, default=0, help="Port of the started server, 0 picks a free one")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        if options["pairs"] <= 0 or options["rate"] <= 0 or options["duration"] <= 0:
+            raise CommandError("--pairs, --rate and --duration must be positive")
+        random.seed(options["seed"])
+
+        users, conversations = _create_fixtures(options["pairs"])
+        server = None
+        try:
+            if options["url"]:
+                url, pid = options["url"].rstrip("/"), options["server_pid"]
+            else:
+                server, url = _start_server(options["port"])
+                pid = server.pid
+
+            report = asyncio.run(_run(url, pid, conversations, options))
+        finally:
+            if server is not None:
+                # SIGTERM lets the writer flush before the rows are deleted
+                server.terminate()
+                try:
+                    server.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+            # Cascades to the conversations, their messages and the notifications
+            UserAccount.objects.filter(id__in=[user.id for user in users]).delete()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print(report)
+
+    def _print(self, report):
+        self.stdout.write(
+            f"{report['clients']} clients ({report['connect_failures']} failed to connect), "
+            f"connect p50 {report['connect_ms']['p50']}ms p99 {report['connect_ms']['p99']}ms"
+        )
+        for kind in ("messages", "notifications"):
+            stats = report[kind]
+            self.stdout.write(
+                f"{kind:<13} sent {stats['sent']:>7}  delivered {stats['delivered']:>7}  "
+                f"dropped {stats['dropped']:>5}  ({stats['sent'] / report['seconds']:,.0f}/sec)  "
+                f"latency p50 {stats['latency_ms']['p50']}ms p95 {stats['latency_ms']['p95']}ms "
+                f"p99 {stats['latency_ms']['p99']}ms"
+            )
+        self.stdout.write(
+            f"message acks  {report['acks']['ok']} ok, {report['acks']['failed']} failed, "
+            f"p50 {report['acks']['latency_ms']['p50']}ms p99 {report['acks']['latency_ms']['p99']}ms"
+        )
+        cpu = report["server_cpu_percent"]
+        self.stdout.write(f"server CPU    {cpu:.0f}% of one core" if cpu is not None else "server CPU    unknown")
+
+
+# ---------------------------
+# Fixtures and server
+# ---------------------------
+def _create_fixtures(pairs):
+    run = uuid.uuid4().hex[:6]
+    users = UserAccount.objects.bulk_create([
+        UserAccount(
+            email=f"load-{role}-{run}-{i}@example.com", username=f"load_{role[0]}_{run}_{i}",
+            full_name=f"Load {role.title()} {i}", role=role, profile_pic='load', password='!', is_active=True
+        )
+        for i in range(pairs)
+        for role in ('teacher', 'student')
+    ])
+    conversations = Conversation.objects.bulk_create([
+        Conversation(teacher=users[i], student=users[i + 1])
+        for i in range(0, len(users), 2)
+    ])
+    return users, conversations
+
+
+def _start_server(port):
+    if not port:
+        with _socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "core.settings"),
+        "SOCKETIO_MANAGER": "memory",
+        "MAP_WARM_UP": "false",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "core.asgi:application",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=settings.BASE_DIR, env=env,
+    )
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise CommandError(f"Socket server exited with {server.returncode}")
+        try:
+            _socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return server, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise CommandError("Socket server did not start within 60s")
+
+
+def _cpu_seconds(pid):
+    """User + system CPU time of a process, None where /proc is not available"""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            fields = stat.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+# ---------------------------
+# Clients
+# ---------------------------
+class Stats:
+    """Shared by the client threads, list.append and dict writes are atomic"""
+
+    def __init__(self):
+        self.sent = {"messages": {}, "notifications": {}}
+        self.latencies = {"messages": [], "notifications": []}
+        self.delivered = {"messages": set(), "notifications": set()}
+        self.acks, self.ack_failures = [], 0
+        self.connect_times, self.connect_failures = [], 0
+        self.lock = threading.Lock()
+
+    def received(self, kind, key):
+        sent = self.sent[kind].get(key)
+        if sent is None or key in self.delivered[kind]:
+            return
+        self.delivered[kind].add(key)
+        self.latencies[kind].append(time.perf_counter() - sent)
+
+
+def _connect(url, user, stats):
+    user_id = str(user.id)
+    client = socketio.Client(reconnection=False)
+
+    @client.on("receive_message")
+    def on_message(data):
+        # Senders get their own messages too, only the recipient counts
+        if data.get("recipient_id") == user_id and data.get("content", "").startswith("load "):
+            stats.received("messages", data["content"][5:])
+
+    @client.on("receive_notification")
+    def on_notification(data):
+        if data.get("detail", "").startswith("load "):
+            stats.received("notifications", data["detail"][5:])
+
+    token = str(AccessToken.for_user(user))
+    started = time.perf_counter()
+    try:
+        client.connect(url, auth={"token": token}, transports=["websocket"], wait_timeout=30)
+    except Exception:
+        with stats.lock:
+            stats.connect_failures += 1
+        return None
+    stats.connect_times.append(time.perf_counter() - started)
+    return client
+
+
+async def _sender(client, conversation, stats, options, stop_at):
+    interval = 1 / options["rate"]
+    # Spread the first sends so the students are out of phase
+    await asyncio.sleep(random.uniform(0, interval))
+    while time.perf_counter() < stop_at:
+        key = uuid.uuid4().hex
+        if random.random() < options["notification_ratio"]:
+            stats.sent["notifications"][key] = time.perf_counter()
+            payload = {
+                "user_id": str(conversation.teacher_id),
+                "header": "Load test",
+                "detail": f"load {key}",
+                "onclick_location": "/load/",
+            }
+            await asyncio.to_thread(client.emit, "send_notification", payload)
+        else:
+            sent = stats.sent["messages"][key] = time.perf_counter()
+
+            def acked(result, sent=sent):
+                if isinstance(result, dict) and result.get("success"):
+                    stats.acks.append(time.perf_counter() - sent)
+                else:
+                    with stats.lock:
+                        stats.ack_failures += 1
+
+            payload = {
+                "conversation_id": str(conversation.id),
+                "sender_id": str(conversation.student_id),
+                "recipient_id": str(conversation.teacher_id),
+                "text": f"load {key}",
+            }
+            await asyncio.to_thread(client.emit, "send_message", payload, callback=acked)
+        await asyncio.sleep(random.expovariate(options["rate"]))
+
+
+async def _run(url, pid, conversations, options):
+    stats = Stats()
+
+    # Connects block on the handshake, run them on threads spread over the ramp
+    async def connect(index, user):
+        await asyncio.sleep(options["ramp"] * index / (2 * len(conversations)))
+        return await asyncio.to_thread(_connect, url, user, stats)
+
+    # Enough threads that connects and emits do not queue behind each other
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=64))
+    clients = await asyncio.gather(*[
+        connect(index, user)
+        for index, user in enumerate(
+            user for conversation in conversations
+            for user in (conversation.teacher, conversation.student)
+        )
+    ])
+    pairs = [
+        (conversation, clients[2 * i], clients[2 * i + 1])
+        for i, conversation in enumerate(conversations)
+    ]
+
+    cpu_started, started = _cpu_seconds(pid), time.perf_counter()
+    stop_at = started + options["duration"]
+    await asyncio.gather(*[
+        _sender(student, conversation, stats, options, stop_at)
+        for conversation, teacher, student in pairs
+        if teacher is not None and student is not None
+    ])
+    seconds = time.perf_counter() - started
+    cpu_stopped = _cpu_seconds(pid)
+
+    # Whatever has not arrived after the grace period counts as dropped
+    deadline = time.perf_counter() + options["grace"]
+    while time.perf_counter() < deadline and any(
+        len(stats.delivered[kind]) < len(stats.sent[kind]) for kind in stats.sent
+    ):
+        await asyncio.sleep(0.1)
+
+    await asyncio.gather(*[asyncio.to_thread(client.disconnect) for client in clients if client is not None])
+
+    def percentiles(values):
+        if not values:
+            return {"p50": None, "p95": None, "p99": None}
+        ms = np.array(values) * 1000
+        return {f"p{p}": round(float(np.percentile(ms, p)), 1) for p in (50, 95, 99)}
+
+    cpu = None
+    if cpu_started is not None and cpu_stopped is not None:
+        cpu = (cpu_stopped - cpu_started) / seconds * 100
+
+    return {
+        "clients": 2 * len(conversations),
+        "connect_failures": stats.connect_failures,
+        "connect_ms": percentiles(stats.connect_times),
+        "seconds": round(seconds, 2),
+        **{
+            kind: {
+                "sent": len(stats.sent[kind]),
+                "delivered": len(stats.delivered[kind]),
+                "dropped": len(stats.sent[kind]) - len(stats.delivered[kind]),
+                "latency_ms": percentiles(stats.latencies[kind]),
+            }
+            for kind in ("messages", "notifications")
+        },
+        "acks": {"ok": len(stats.acks), "failed": stats.ack_failures, "latency_ms": percentiles(stats.acks)},
+        "server_cpu_percent": cpu,
+    }
@@ -1,16 +1,21 @@
+import logging
+
 from asgiref.sync import sync_to_async
 from .models import Message  # if you store chat in DB
 from django.contrib.auth.models import User
 from .asgi import sio
+from .metrics import log_sampled
+
+logger = logging.getLogger(__name__)
 
 # When user connects
 @sio.event
 async def connect(sid, environ, auth):
-    print(f"Client connected: {sid}")
+    log_sampled(logger, logging.INFO, f"Client connected: {sid}")
 
 @sio.event
 async def disconnect(sid):
-    print(f"Client disconnected: {sid}")
+    log_sampled(logger, logging.INFO, f"Client disconnected: {sid}")
 
 # Handle incoming message
 @sio.event
@@ -41,5 +46,5 @@ async def join_room(sid, data):
     """
     await sio.save_session(sid, {"room": data["room"]})
     await sio.enter_room(sid, data["room"])
-    print(f"{sid} joined {data['room']}")
+    logger.debug(f"{sid} joined {data['room']}")
 
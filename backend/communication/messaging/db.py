@@ -0,0 +1,63 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from .metrics import db_seconds, db_wait_seconds
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = Lock()
+
+
+def _get_executor(size: int) -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None or _pool[0] != size:
+        with _pool_lock:
+            if _pool is None or _pool[0] != size:
+                if _pool is not None:
+                    _pool[1].shutdown(wait=False)
+                _pool = (size, ThreadPoolExecutor(max_workers=size, thread_name_prefix="socket-db"))
+                logger.info(f"Socket database pool started with {size} connections")
+    return _pool[1]
+
+
+def database_sync_to_async(func):
+    """Run ORM code from a socket handler on the socket database pool
+
+    Plain sync_to_async (and Django's async ORM methods, which use it) runs
+    every call on one shared thread, so all socket handlers of a worker wait
+    on each other's queries. The pool has SOCKET_DB_POOL_SIZE threads, each
+    holding its own persistent connection, so that many queries run at
+    once. SOCKET_DB_POOL_SIZE = 0 falls back to the shared thread.
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def run(queued, *args, **kwargs):
+        started = time.perf_counter()
+        db_wait_seconds.observe(started - queued, call=name)
+        try:
+            # Pool connections outlive requests, replace one that broke
+            if connection.connection is not None and connection.errors_occurred and not connection.is_usable():
+                connection.close()
+            return func(*args, **kwargs)
+        finally:
+            db_seconds.observe(time.perf_counter() - started, call=name)
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        size = settings.SOCKET_DB_POOL_SIZE
+        if size > 0:
+            call = sync_to_async(run, thread_sensitive=False, executor=_get_executor(size))
+        else:
+            call = sync_to_async(run)
+        return await call(time.perf_counter(), *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,77 @@
+from collections import defaultdict
+from typing import Iterable
+
+from django.db.models import Case, F, PositiveIntegerField, Q, Value, When
+
+from .models import Conversation, Message
+
+PREVIEW_LENGTH = 120
+
+
+def message_preview(content: str) -> str:
+    return content[:PREVIEW_LENGTH]
+
+
+def record_messages(messages: Iterable[Message]):
+    """Move the inbox columns of conversations forward for new messages
+
+    Must run in the transaction that inserts the messages. Counters are
+    bumped with F() expressions and the last message only moves forward,
+    so concurrent writers never lose an update.
+    """
+    by_conversation = defaultdict(list)
+    for message in messages:
+        if message.conversation_id:
+            # Ids may still be strings on messages built from socket payloads
+            by_conversation[str(message.conversation_id)].append(message)
+    if not by_conversation:
+        return
+
+    participants = {
+        str(conversation_id): (str(teacher_id), str(student_id))
+        for conversation_id, teacher_id, student_id in Conversation.objects.filter(
+            id__in=by_conversation
+        ).values_list("id", "teacher_id", "student_id")
+    }
+
+    for conversation_id, batch in by_conversation.items():
+        if conversation_id not in participants:
+            continue
+        teacher_id, student_id = participants[conversation_id]
+        latest = max(batch, key=lambda message: (message.created_at, message.id))
+
+        Conversation.objects.filter(id=conversation_id).update(
+            teacher_unread=F("teacher_unread") + sum(1 for m in batch if str(m.recipient_id) == teacher_id),
+            student_unread=F("student_unread") + sum(1 for m in batch if str(m.recipient_id) == student_id),
+        )
+        Conversation.objects.filter(
+            Q(last_message_at__isnull=True)
+            | Q(last_message_at__lt=latest.created_at)
+            | Q(last_message_at=latest.created_at, last_message_id__lt=latest.id),
+            id=conversation_id,
+        ).update(
+            last_message_id=latest.id,
+            last_message_at=latest.created_at,
+            last_message_preview=message_preview(latest.content),
+        )
+
+
+def set_unread(conversation_id, user_id, count: int) -> int:
+    """Set the unread counter of user_id in a conversation, one UPDATE"""
+    return Conversation.objects.filter(id=conversation_id).update(
+        teacher_unread=Case(
+            When(teacher_id=user_id, then=Value(count)),
+            default=F("teacher_unread"),
+            output_field=PositiveIntegerField()
+        ),
+        student_unread=Case(
+            When(student_id=user_id, then=Value(count)),
+            default=F("student_unread"),
+            output_field=PositiveIntegerField()
+        ),
+    )
+
+
+def clear_unread(conversation_id, user_id) -> int:
+    """Zero the unread counter of user_id in a conversation, one UPDATE"""
+    return set_unread(conversation_id, user_id, 0)
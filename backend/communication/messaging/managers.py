@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import pickle
+from collections import defaultdict
+from threading import Lock
+
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Subscribers of every in-memory channel, one queue per client manager
+_channels = defaultdict(set)
+
+
+class InMemoryPubSubManager(AsyncPubSubManager):
+    """Pub/sub client manager whose "broker" lives in this process
+
+    Behaves like AsyncRedisManager, so several AsyncServer instances created
+    in one process (e.g. in tests) deliver each other's emits and room
+    events, without a Redis server.
+    """
+    name = 'memory'
+
+    async def _publish(self, data):
+        for queue in list(_channels[self.channel]):
+            queue.put_nowait(data)
+
+    async def _listen(self):
+        queue = asyncio.Queue()
+        _channels[self.channel].add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            _channels[self.channel].discard(queue)
+
+
+def get_client_manager(write_only: bool = False):
+    """Socket.IO client manager selected by settings.SOCKETIO_MANAGER
+
+    "redis" shares emits and rooms between every ASGI worker through Redis
+    pub/sub, "memory" keeps them inside this process, "local" is the
+    default single process manager of python-socketio.
+    """
+    backend = getattr(settings, 'SOCKETIO_MANAGER', 'redis')
+    channel = getattr(settings, 'SOCKETIO_CHANNEL', 'socketio')
+
+    if backend == 'redis':
+        url = getattr(settings, 'SOCKETIO_REDIS_URL', settings.REDIS_URL)
+        logger.info(f"Socket.IO using Redis client manager on channel {channel}")
+        return socketio.AsyncRedisManager(url, channel=channel, write_only=write_only)
+    if backend == 'memory':
+        return InMemoryPubSubManager(channel=channel, write_only=write_only)
+    if backend == 'local':
+        return socketio.AsyncManager()
+
+    raise ValueError(f"Unknown SOCKETIO_MANAGER: {backend}")
+
+
+class BatchRedisManager(socketio.RedisManager):
+    """Write-only Redis manager for processes without a Socket.IO server
+
+    emit_many publishes a whole batch of emits in one Redis pipeline, one
+    round trip instead of one PUBLISH per emit. The socket workers
+    subscribed to the channel deliver them to their rooms.
+    """
+    _batch = None
+
+    def _publish(self, data):
+        if self._batch is not None:
+            self._batch.append(data)
+            return
+        return super()._publish(data)
+
+    def emit_many(self, emits):
+        """emits: iterable of (event, data, room)"""
+        self._batch = []
+        try:
+            for event, data, room in emits:
+                self.emit(event, data, namespace='/', room=room)
+            batch = self._batch
+        finally:
+            self._batch = None
+        if not batch:
+            return 0
+
+        pipeline = self.redis.pipeline(transaction=False)
+        for message in batch:
+            pipeline.publish(self.channel, pickle.dumps(message))
+        pipeline.execute()
+        return len(batch)
+
+
+_emitter = None
+_emitter_lock = Lock()
+
+
+def get_external_emitter():
+    """Emitter for Celery workers and other processes outside the socket server
+
+    Only the Redis client manager reaches the socket workers from another
+    process, None with the "memory" and "local" managers.
+    """
+    global _emitter
+    if getattr(settings, 'SOCKETIO_MANAGER', 'redis') != 'redis':
+        return None
+    if _emitter is None:
+        with _emitter_lock:
+            if _emitter is None:
+                url = getattr(settings, 'SOCKETIO_REDIS_URL', settings.REDIS_URL)
+                channel = getattr(settings, 'SOCKETIO_CHANNEL', 'socketio')
+                _emitter = BatchRedisManager(url, channel=channel, write_only=True)
+    return _emitter
@@ -0,0 +1,330 @@
+import asyncio
+import bisect
+import logging
+import os
+import random
+import socket as _socket
+import time
+from functools import wraps
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from socketio.exceptions import ConnectionRefusedError
+
+from core.cache import shared_cache as cache
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a cached query to a stalled handler
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Worker snapshots shared through the cache, see publish_snapshot
+SNAPSHOT_WORKERS_KEY = "socket_metrics_workers"
+SNAPSHOT_KEY_PREFIX = "socket_metrics_"
+
+WORKER_ID = f"{_socket.gethostname()}-{os.getpid()}"
+
+LabelValues = Tuple[str, ...]
+
+
+# ---------------------------
+# Metric types
+# ---------------------------
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = Lock()
+
+    def _key(self, labels: dict) -> LabelValues:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def samples(self) -> List[Tuple[str, dict, float]]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(f"{self.name}_total", dict(zip(self.labels, key)), value) for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, collect: Optional[Callable[[], Dict[LabelValues, float]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+        # Computed at collection time instead of kept up to date
+        self._collect = collect
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self._collect is not None:
+            values = self._collect()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [(self.name, dict(zip(self.labels, key)), value) for key, value in values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (bucket counts, sum, count)
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                labels = dict(zip(self.labels, key))
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, counts):
+                    cumulative += bucket
+                    samples.append((f"{self.name}_bucket", {**labels, "le": repr(bound)}, cumulative))
+                samples.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, count))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def snapshot(self) -> dict:
+        """Plain data version of every metric, safe to pickle into the cache"""
+        return {
+            "worker": WORKER_ID,
+            "time": time.time(),
+            "metrics": [
+                {"name": m.name, "kind": m.kind, "help": m.documentation, "samples": m.samples()}
+                for m in self.metrics
+            ],
+        }
+
+
+registry = Registry()
+
+
+# ---------------------------
+# Socket metrics
+# ---------------------------
+events_total = registry.register(Counter(
+    "socket_events", "Socket.IO events handled, by outcome", ["event", "outcome"]
+))
+event_seconds = registry.register(Histogram(
+    "socket_event_seconds", "Socket.IO handler latency, from receipt to return", ["event"]
+))
+db_seconds = registry.register(Histogram(
+    "socket_db_seconds", "Time socket handlers spend in database calls", ["call"]
+))
+db_wait_seconds = registry.register(Histogram(
+    "socket_db_wait_seconds", "Time database calls wait for a socket database pool thread", ["call"]
+))
+emit_seconds = registry.register(Histogram(
+    "socket_emit_seconds", "Time spent emitting, including the client manager publish", ["event"]
+))
+connected_clients = registry.register(Gauge(
+    "socket_connected_clients", "Sockets connected to this worker"
+))
+
+
+def _rooms_by_kind() -> Dict[str, List[int]]:
+    """Member counts of this worker's rooms, grouped by prefix (user, conversation)"""
+    # Imported here, the socket module imports this one
+    from .socket import sio
+
+    sizes: Dict[str, List[int]] = {}
+    for room, members in sio.manager.rooms.get("/", {}).items():
+        if room is None or room in members:
+            continue  # the namespace wide room and every socket's own room
+        kind = room.split("_", 1)[0] if "_" in room else "other"
+        sizes.setdefault(kind, []).append(len(members))
+    return sizes
+
+
+rooms = registry.register(Gauge(
+    "socket_rooms", "Rooms with members on this worker, by kind", ["kind"],
+    collect=lambda: {(kind,): len(sizes) for kind, sizes in _rooms_by_kind().items()}
+))
+room_members = registry.register(Gauge(
+    "socket_room_members", "Room memberships on this worker, by room kind", ["kind"],
+    collect=lambda: {(kind,): sum(sizes) for kind, sizes in _rooms_by_kind().items()}
+))
+
+
+def instrumented(func):
+    """Count and time a Socket.IO event handler under its function name
+
+    Outcome is "error" when the handler raises, "rejected" when its ack is
+    {"success": False, ...} and "ok" otherwise.
+    """
+    event = func.__name__
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            result = await func(*args, **kwargs)
+            if isinstance(result, dict) and (result.get("success") is False or "error" in result):
+                outcome = "rejected"
+            return result
+        except ConnectionRefusedError:
+            outcome = "rejected"
+            raise
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            event_seconds.observe(time.perf_counter() - started, event=event)
+            events_total.inc(event=event, outcome=outcome)
+
+    return wrapper
+
+
+# ---------------------------
+# Logging
+# ---------------------------
+def log_sampled(log: logging.Logger, level: int, message: str, rate: Optional[float] = None):
+    """Log one in 1/rate calls, for lines written on every chat event
+
+    rate defaults to settings.SOCKET_LOG_SAMPLE_RATE; at DEBUG level every
+    line is kept.
+    """
+    if not log.isEnabledFor(level):
+        return
+    if rate is None:
+        rate = settings.SOCKET_LOG_SAMPLE_RATE
+    if log.isEnabledFor(logging.DEBUG) or random.random() < rate:
+        log.log(level, message)
+
+
+# ---------------------------
+# Exposition
+# ---------------------------
+def publish_snapshot(timeout: Optional[int] = None) -> dict:
+    """Store this worker's metrics in the cache, where /metrics of any worker finds them"""
+    if timeout is None:
+        timeout = settings.SOCKET_METRICS_SNAPSHOT_TTL
+    snapshot = registry.snapshot()
+    try:
+        cache.set(f"{SNAPSHOT_KEY_PREFIX}{WORKER_ID}", snapshot, timeout)
+        workers = cache.get(SNAPSHOT_WORKERS_KEY) or set()
+        if WORKER_ID not in workers:
+            cache.set(SNAPSHOT_WORKERS_KEY, workers | {WORKER_ID}, None)
+    except Exception as e:
+        logger.warning(f"Socket metrics snapshot failed: {e}")
+    return snapshot
+
+
+_snapshot_task: Optional[asyncio.Task] = None
+
+
+def start_snapshots():
+    """Publish this worker's snapshot every SOCKET_METRICS_SNAPSHOT_INTERVAL seconds"""
+    global _snapshot_task
+    interval = settings.SOCKET_METRICS_SNAPSHOT_INTERVAL
+    if interval > 0 and (_snapshot_task is None or _snapshot_task.done()):
+        _snapshot_task = asyncio.create_task(_publish_every(interval))
+
+
+async def _publish_every(interval: float):
+    publish = sync_to_async(publish_snapshot, thread_sensitive=False)
+    while True:
+        await publish()
+        await asyncio.sleep(interval)
+
+
+def collect_snapshots() -> List[dict]:
+    """Snapshots of every worker that published within its TTL, this one included"""
+    own = publish_snapshot()
+    try:
+        workers = cache.get(SNAPSHOT_WORKERS_KEY) or set()
+        found = cache.get_many([f"{SNAPSHOT_KEY_PREFIX}{worker}" for worker in workers if worker != WORKER_ID])
+    except Exception as e:
+        logger.warning(f"Socket metrics snapshots could not be read: {e}")
+        return [own]
+
+    live = {key[len(SNAPSHOT_KEY_PREFIX):] for key in found}
+    if workers - live - {WORKER_ID}:
+        # Workers that stopped publishing
+        try:
+            cache.set(SNAPSHOT_WORKERS_KEY, live | {WORKER_ID}, None)
+        except Exception:
+            pass
+    return [own, *found.values()]
+
+
+def render(snapshots: List[dict]) -> str:
+    """Prometheus text exposition of the snapshots, each labelled with its worker"""
+    lines = []
+    for index, metric in enumerate(snapshots[0]["metrics"] if snapshots else []):
+        lines.append(f"# HELP {metric['name']} {metric['help']}")
+        lines.append(f"# TYPE {metric['name']} {metric['kind']}")
+        for snapshot in snapshots:
+            if index >= len(snapshot["metrics"]) or snapshot["metrics"][index]["name"] != metric["name"]:
+                continue  # a worker running other code
+            for name, labels, value in snapshot["metrics"][index]["samples"]:
+                labels = {"worker": snapshot["worker"], **labels}
+                rendered = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+                lines.append(f"{name}{{{rendered}}} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 from account.models import Teacher
 import uuid
@@ -12,8 +13,42 @@ class Conversation(models.Model):
     student = models.ForeignKey(User, related_name='student_conversations', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Inbox columns, kept up to date by communication.messaging.inbox
+    last_message_id = models.UUIDField(blank=True, null=True)
+    last_message_at = models.DateTimeField(blank=True, null=True)
+    last_message_preview = models.CharField(max_length=120, blank=True, default="")
+    teacher_unread = models.PositiveIntegerField(default=0)
+    student_unread = models.PositiveIntegerField(default=0)
+
     class Meta:
         unique_together = ("teacher", "student")  # one conversation per pair
+        indexes = [
+            # Inbox of a user, most recent conversation first
+            models.Index(fields=["teacher", "-last_message_at"]),
+            models.Index(fields=["student", "-last_message_at"]),
+        ]
+
+    def unread_for(self, user_id) -> int:
+        return self.teacher_unread if str(self.teacher_id) == str(user_id) else self.student_unread
+
+class ReadState(models.Model):
+    """How far a participant has read a conversation
+
+    A high-water mark in (created_at, id) order: every message up to and
+    including last_read_message_id counts as read by this user.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    conversation = models.ForeignKey(Conversation, related_name="read_states", on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name="conversation_read_states", on_delete=models.CASCADE)
+    last_read_message_id = models.UUIDField()
+    last_read_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("conversation", "user")
+
+    def __str__(self):
+        return f"{self.user} read {self.conversation_id} up to {self.last_read_at}"
 
 class Message(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -23,12 +58,17 @@ class Message(models.Model):
     sender = models.ForeignKey(User, related_name="sent_messages", on_delete=models.CASCADE)
     recipient = models.ForeignKey(User, related_name="received_messages", on_delete=models.CASCADE)
     content = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the message is received, not when the write-behind batch lands
+    created_at = models.DateTimeField(default=timezone.now)
     delivered = models.BooleanField(default=False)
     read = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination and delta sync walk a conversation by (created_at, id)
+            models.Index(fields=["conversation", "created_at", "id"]),
+        ]
     
     def __str__(self):
         return f"{self.sender} - {self.content}"
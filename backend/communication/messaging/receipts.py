@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .db import database_sync_to_async
+from .inbox import clear_unread, set_unread
+from .models import Conversation, Message, ReadState
+from .sync import after_cursor, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# A position in a conversation, (created_at, message id)
+Position = Tuple[datetime, uuid.UUID]
+
+
+# ---------------------------
+# Read marks
+# ---------------------------
+def advance_read_mark(conversation_id, user_id, cursor: Optional[str] = None) -> Optional[dict]:
+    """Move the read mark of user_id forward to cursor, or to the last message
+
+    One UPDATE of the (conversation, user) row, an INSERT the first time,
+    instead of flagging every unread message. The mark never moves back.
+    The conversation row is locked while the unread counter is recomputed.
+    A cursor past the last message is clamped to it. Returns the receipt to
+    broadcast, None when the user is not part of the conversation, it has
+    no messages or the mark was already there. Raises ValueError on a
+    malformed cursor.
+    """
+    with transaction.atomic():
+        # Locked until the counter is written: record_messages bumps it with
+        # F() in the transaction inserting new messages, an absolute value
+        # computed from an unlocked read would overwrite those increments
+        conversation = (
+            Conversation.objects.filter(id=conversation_id)
+            .filter(Q(teacher_id=user_id) | Q(student_id=user_id))
+            .select_for_update()
+            .values("last_message_id", "last_message_at")
+            .first()
+        )
+        if conversation is None:
+            return None
+
+        last: Optional[Position] = None
+        if conversation["last_message_id"]:
+            last = (conversation["last_message_at"], conversation["last_message_id"])
+
+        if last is None:
+            return None  # nothing to read yet
+        position = decode_cursor(cursor) if cursor else last
+        if position > last:
+            # A mark past the last message would count later ones as read
+            position = last
+        read_at, message_id = position
+
+        advanced = ReadState.objects.filter(
+            Q(last_read_at__lt=read_at) | Q(last_read_at=read_at, last_read_message_id__lt=message_id),
+            conversation_id=conversation_id,
+            user_id=user_id,
+        ).update(last_read_message_id=message_id, last_read_at=read_at, updated_at=timezone.now())
+        if not advanced:
+            _, created = ReadState.objects.get_or_create(
+                conversation_id=conversation_id,
+                user_id=user_id,
+                defaults={"last_read_message_id": message_id, "last_read_at": read_at},
+            )
+            if not created:
+                return None
+
+        if position == last:
+            clear_unread(conversation_id, user_id)
+        else:
+            # Read part of the way, whatever came after the mark stays unread
+            remaining = Message.objects.filter(
+                after_cursor(encode_cursor(read_at, message_id)),
+                conversation_id=conversation_id,
+                recipient_id=user_id,
+            ).count()
+            set_unread(conversation_id, user_id, remaining)
+
+    return {
+        "conversation_id": str(conversation_id),
+        "user_id": str(user_id),
+        "last_read_message_id": str(message_id),
+        "last_read_at": read_at.isoformat(),
+        "cursor": encode_cursor(read_at, message_id),
+    }
+
+
+def read_marks(conversation_ids: Iterable) -> Dict[Tuple[str, str], Position]:
+    """Read marks of every participant of the given conversations, one query"""
+    return {
+        (str(conversation_id), str(user_id)): (read_at, message_id)
+        for conversation_id, user_id, read_at, message_id in ReadState.objects.filter(
+            conversation_id__in=list(conversation_ids)
+        ).values_list("conversation_id", "user_id", "last_read_at", "last_read_message_id")
+    }
+
+
+def is_read(message: Message, marks: Dict[Tuple[str, str], Position]) -> bool:
+    """Whether the recipient's read mark covers message"""
+    mark = marks.get((str(message.conversation_id), str(message.recipient_id)))
+    if mark is None:
+        # Messages marked before read marks existed
+        return message.read
+    return (message.created_at, uuid.UUID(str(message.id))) <= mark
+
+
+# ---------------------------
+# Coalesced receipts
+# ---------------------------
+class ReadReceipts:
+    """Throttled read receipts per (conversation, user)
+
+    A client reports reads as it scrolls. The first report of a burst is
+    stored and broadcast right away, the ones that follow within the
+    interval are merged into the furthest position and handled once when
+    the interval ends. A conversation costs at most one upsert and one
+    messages_read broadcast per interval and reader.
+    """
+
+    def __init__(self, broadcast: Callable[[dict], Awaitable], interval: Optional[float] = None):
+        self.broadcast = broadcast
+        self._interval = interval
+        # key -> furthest cursor reported, None meaning "up to the last message"
+        self._pending: Dict[Tuple[str, str], Optional[str]] = {}
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    @property
+    def interval(self) -> float:
+        if self._interval is not None:
+            return self._interval
+        return settings.READ_RECEIPT_INTERVAL
+
+    def mark(self, conversation_id, user_id, cursor: Optional[str] = None):
+        """Record a read report, stored and broadcast by a background task
+
+        Raises ValueError on a malformed cursor so the caller can answer
+        the client before anything is queued.
+        """
+        if cursor:
+            decode_cursor(cursor)
+        key = (str(conversation_id), str(user_id))
+        if key in self._pending:
+            self._pending[key] = _furthest(self._pending[key], cursor)
+        else:
+            self._pending[key] = cursor
+
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            self._tasks[key] = asyncio.create_task(self._run(key))
+
+    async def close(self):
+        """Store the reports still waiting for their interval, used on ASGI shutdown"""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._tasks.clear()
+        pending, self._pending = self._pending, {}
+        for key, cursor in pending.items():
+            await self._flush(key, cursor)
+
+    async def _run(self, key):
+        try:
+            while key in self._pending:
+                await self._flush(key, self._pending.pop(key))
+                await asyncio.sleep(self.interval)
+        finally:
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+
+    async def _flush(self, key, cursor: Optional[str]):
+        conversation_id, user_id = key
+        try:
+            receipt = await _advance(conversation_id, user_id, cursor)
+            if receipt:
+                await self.broadcast(receipt)
+        except Exception as e:
+            logger.error(f"Read receipt for {user_id} in {conversation_id} failed: {e}", exc_info=True)
+
+
+@database_sync_to_async
+def _advance(conversation_id, user_id, cursor):
+    return advance_read_mark(conversation_id, user_id, cursor)
+
+
+def _furthest(current: Optional[str], cursor: Optional[str]) -> Optional[str]:
+    if current is None or cursor is None:
+        return None
+    return cursor if decode_cursor(cursor) > decode_cursor(current) else current
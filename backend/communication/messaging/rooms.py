@@ -0,0 +1,122 @@
+import logging
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.cache import shared_cache as cache
+from .models import Conversation
+
+logger = logging.getLogger(__name__)
+
+# Conversation ids of a user, dropped whenever one of their conversations
+# is created or deleted
+CONVERSATION_IDS_CACHE_TTL = 60 * 60
+
+
+def conversation_ids_cache_key(user_id) -> str:
+    return f"chat_conversation_ids_{user_id}"
+
+
+def participants_cache_key(conversation_id) -> str:
+    return f"chat_conversation_participants_{conversation_id}"
+
+
+def user_room(user_id) -> str:
+    return f"user_{user_id}"
+
+
+def conversation_room(conversation_id) -> str:
+    return f"conversation_{conversation_id}"
+
+
+def authenticate_socket(environ: dict, auth: Optional[dict]) -> Optional[str]:
+    """User id of the access token sent on connect, None when missing or invalid
+
+    The token is read from the Socket.IO auth payload ({"token": "..."}),
+    then the ``token`` query parameter, then a Bearer Authorization header.
+    """
+    token = auth.get("token") if isinstance(auth, dict) else None
+    if not token:
+        token = parse_qs(environ.get("QUERY_STRING", "")).get("token", [None])[0]
+    if not token:
+        header = environ.get("HTTP_AUTHORIZATION", "")
+        if header.startswith("Bearer "):
+            token = header[len("Bearer "):]
+    if not token:
+        return None
+
+    try:
+        access = AccessToken(token)
+    except TokenError as e:
+        logger.info(f"Socket connection with invalid token: {e}")
+        return None
+
+    user_id = access.get(settings.SIMPLE_JWT.get("USER_ID_CLAIM", "user_id"))
+    return str(user_id) if user_id else None
+
+
+def conversation_ids(user_id, refresh: bool = False) -> List[str]:
+    """Ids of every conversation user_id takes part in, cached"""
+    key = conversation_ids_cache_key(user_id)
+    ids = None
+    if not refresh:
+        try:
+            ids = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Conversation ids cache read failed: {e}")
+    if ids is not None:
+        return ids
+
+    # teacher_id and student_id are both indexed, this is a BitmapOr of two index scans
+    ids = [
+        str(conversation_id)
+        for conversation_id in Conversation.objects.filter(
+            Q(teacher_id=user_id) | Q(student_id=user_id)
+        ).values_list("id", flat=True)
+    ]
+    try:
+        cache.set(key, ids, CONVERSATION_IDS_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Conversation ids cache write failed: {e}")
+    return ids
+
+
+def conversation_participants(conversation_id) -> Optional[Tuple[str, str]]:
+    """(teacher id, student id) of a conversation, cached; None when it does not exist"""
+    key = participants_cache_key(conversation_id)
+    try:
+        participants = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Conversation participants cache read failed: {e}")
+        participants = None
+    if participants is not None:
+        return participants
+
+    row = Conversation.objects.filter(id=conversation_id).values_list("teacher_id", "student_id").first()
+    if row is None:
+        return None
+    participants = (str(row[0]), str(row[1]))
+    try:
+        # Who takes part never changes, the entry is dropped when the conversation is deleted
+        cache.set(key, participants, CONVERSATION_IDS_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Conversation participants cache write failed: {e}")
+    return participants
+
+
+def invalidate_conversation_ids(*user_ids):
+    try:
+        cache.delete_many([conversation_ids_cache_key(user_id) for user_id in user_ids])
+    except Exception as e:
+        logger.warning(f"Conversation ids cache invalidation failed: {e}")
+
+
+def invalidate_participants(conversation_id):
+    try:
+        cache.delete(participants_cache_key(conversation_id))
+    except Exception as e:
+        logger.warning(f"Conversation participants cache invalidation failed: {e}")
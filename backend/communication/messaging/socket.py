@@ -1,85 +1,204 @@
 # chat/socket.py
 import socketio
 import logging
-from asgiref.sync import sync_to_async
-from django.db import transaction
+import time
+from socketio.exceptions import ConnectionRefusedError
 from django.contrib.auth import get_user_model
 
+from communication.notification.dispatch import notification_data
 from communication.notification.models import Notification
+from .db import database_sync_to_async
+from .managers import get_client_manager
+from .metrics import connected_clients, emit_seconds, instrumented, log_sampled, start_snapshots
+from .rooms import authenticate_socket, conversation_ids, conversation_participants, conversation_room, user_room
+from .sync import message_cursor, messages_since
 from .models import Message, Conversation
+from .receipts import ReadReceipts
+from .writer import message_writer
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# The client manager relays emits and room changes between ASGI workers,
+# so a room can have members connected to any of them
 sio = socketio.AsyncServer(
     async_mode="asgi",
-    cors_allowed_origins="*"
+    cors_allowed_origins="*",
+    client_manager=get_client_manager()
 )
 
+
+async def emit(event, data, **kwargs):
+    """sio.emit, timed per event for the socket metrics"""
+    started = time.perf_counter()
+    try:
+        await sio.emit(event, data, **kwargs)
+    finally:
+        emit_seconds.observe(time.perf_counter() - started, event=event)
+
+
 # ---------------------------
 # Connection Events
 # ---------------------------
 @sio.event
+@instrumented
 async def connect(sid, environ, auth):
-    print(f"✅ Client connected: {sid}")
-    logger.info(f"Client connected: {sid}")
+    """
+    Client connects with its access token:
+    io(url, { auth: { token: accessToken } })
+
+    The socket is put in the user's notification room and every
+    conversation room of the user, no join events needed.
+    """
+    user_id = authenticate_socket(environ, auth)
+    if user_id is None:
+        logger.warning(f"Refused unauthenticated socket connection: {sid}")
+        raise ConnectionRefusedError("authentication_failed")
+
+    await sio.save_session(sid, {"user_id": user_id})
+
+    conversation_ids = await load_conversation_ids(user_id)
+    await sio.enter_room(sid, user_room(user_id))
+    for conv_id in conversation_ids:
+        await sio.enter_room(sid, conversation_room(conv_id))
+
+    connected_clients.inc()
+    start_snapshots()
+    log_sampled(logger, logging.INFO, f"Client connected: {sid} user {user_id}, {len(conversation_ids)} conversations")
 
 @sio.event
+@instrumented
 async def disconnect(sid):
-    print(f"❌ Client disconnected: {sid}")
-    logger.info(f"Client disconnected: {sid}")
+    connected_clients.dec()
+    log_sampled(logger, logging.INFO, f"Client disconnected: {sid}")
+
+@database_sync_to_async
+def load_conversation_ids(user_id, refresh=False):
+    return conversation_ids(user_id, refresh=refresh)
+
+@database_sync_to_async
+def load_participants(conversation_id):
+    return conversation_participants(conversation_id)
 
 # ---------------------------
 # Room Join
 # ---------------------------
 @sio.event
+@instrumented
 async def join_conversations(sid, data):
     """
-    Frontend calls this after login:
+    Rooms are joined on connect, call this for conversations created
+    since then:
     socket.emit("join_conversations", { conversations: [conversationId1, ...] })
+
+    Only conversations of the connected user are joined.
     """
-    conversations = data.get("conversations", [])
-    for conv_id in conversations:
-        await sio.enter_room(sid, f"conversation_{conv_id}")
-        logger.info(f"{sid} joined conversation_{conv_id}")
-    print(f"✅ {sid} joined {len(conversations)} conversations")
+    session = await sio.get_session(sid)
+    user_id = session["user_id"]
+
+    requested = {str(conv_id) for conv_id in data.get("conversations", [])}
+    allowed = set(await load_conversation_ids(user_id))
+    if not requested <= allowed:
+        # The cached list may predate a new conversation
+        allowed = set(await load_conversation_ids(user_id, refresh=True))
+
+    joined = requested & allowed
+    for conv_id in joined:
+        await sio.enter_room(sid, conversation_room(conv_id))
+    if requested - joined:
+        logger.warning(f"{sid} (user {user_id}) asked to join {len(requested - joined)} conversations it is not part of")
+    logger.debug(f"{sid} joined {len(joined)} conversations")
+    return {"joined": sorted(joined)}
+
+# ---------------------------
+# Resume
+# ---------------------------
+@sio.event
+@instrumented
+async def sync_messages(sid, data):
+    """
+    After a reconnect, fetch what was missed in every conversation:
+    socket.emit("sync_messages", { cursors: { conversationId: lastCursor }, since: cursor }, ack)
+
+    The ack carries { messages, cursors, has_more } like POST msg/sync/.
+    """
+    session = await sio.get_session(sid)
+    data = data or {}
+    cursors = data.get("cursors") or {}
+    if not isinstance(cursors, dict):
+        return {"error": "cursors must be an object"}
+
+    @database_sync_to_async
+    def load():
+        return messages_since(conversation_ids(session["user_id"]), since=data.get("since"), cursors=cursors)
+
+    try:
+        return await load()
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        logger.error(f"Error in sync_messages: {str(e)}", exc_info=True)
+        return {"error": "Sync failed"}
 
 # ---------------------------
 # Send Message
 # ---------------------------
 @sio.event
+@instrumented
 async def send_message(sid, data):
     """
     data = {
       "conversation_id": "...",
-      "sender_id": "...",
-      "recipient_id": "...",
       "text": "Hello!"
     }
+
+    The sender is the connected user and the recipient the other
+    participant of the conversation; sender_id and recipient_id sent by
+    older clients are only checked. The room gets the message
+    immediately, the ack ({"success": True, "id": "..."}) only once it
+    is saved.
     """
     try:
-        conversation_id = data.get("conversation_id")
-        sender_id = data.get("sender_id")
-        recipient_id = data.get("recipient_id")
+        session = await sio.get_session(sid)
+        sender_id = session["user_id"]
+        conversation_id = str(data.get("conversation_id") or "")
         text = data.get("text")
 
-        if not (conversation_id and sender_id and recipient_id and text):
-            logger.error("❌ Missing fields in send_message")
-            return
+        if not (conversation_id and isinstance(text, str) and text.strip()):
+            logger.warning(f"Missing fields in send_message from {sid}")
+            return {"success": False, "error": "Missing fields"}
+        if "\x00" in text:
+            # Postgres text cannot hold NUL, the write would fail after the emit
+            return {"success": False, "error": "Invalid characters in text"}
+
+        if data.get("sender_id") and str(data["sender_id"]) != sender_id:
+            logger.warning(f"{sid} (user {sender_id}) tried to send as {data['sender_id']}")
+            return {"success": False, "error": "Cannot send messages as another user"}
+
+        if conversation_id not in await load_conversation_ids(sender_id):
+            # The cached list may predate a new conversation
+            if conversation_id not in await load_conversation_ids(sender_id, refresh=True):
+                logger.warning(f"{sid} (user {sender_id}) tried to send to conversation {conversation_id}")
+                return {"success": False, "error": "Not a participant of this conversation"}
 
-        @sync_to_async
-        def create_message():
-            with transaction.atomic():
-                message = Message.objects.create(
-                    conversation_id=conversation_id,
-                    sender_id=sender_id,
-                    recipient_id=recipient_id,
-                    content=text.strip(),
-                    delivered=True
-                )
-                return message
-
-        message = await create_message()
+        participants = await load_participants(conversation_id)
+        if participants is None:
+            return {"success": False, "error": "Conversation not found"}
+        teacher_id, student_id = participants
+        recipient_id = student_id if sender_id == teacher_id else teacher_id
+        if data.get("recipient_id") and str(data["recipient_id"]) != recipient_id:
+            return {"success": False, "error": "Recipient is not the other participant"}
+
+        # Everything the INSERT could reject is checked above, the row is
+        # written behind and can now only fail on database errors.
+        # Id and timestamp are final here
+        message = Message(
+            conversation_id=conversation_id,
+            sender_id=sender_id,
+            recipient_id=recipient_id,
+            content=text.strip(),
+            delivered=True
+        )
         
         msg_data = {
             "id": str(message.id),
@@ -90,56 +209,72 @@ async def send_message(sid, data):
             "created_at": message.created_at.isoformat(),
             "delivered": message.delivered,
             "read": message.read,
+            "cursor": message_cursor(message),
         }
 
 
-        room = f"conversation_{conversation_id}"
-        await sio.emit("receive_message", msg_data, room=room)
+        room = conversation_room(conversation_id)
+        await emit("receive_message", msg_data, room=room)
 
         # Update inbox preview for both sender and recipient
-        await sio.emit("update_inbox", msg_data, room=room)
+        await emit("update_inbox", msg_data, room=room)
 
-        print(f"📤 Message sent in {room}: {msg_data}")
+        log_sampled(logger, logging.INFO, f"Message {message.id} sent in {room}")
 
     except Exception as e:
         logger.error(f"Error in send_message: {str(e)}", exc_info=True)
-        await sio.emit("message_error", {"error": str(e)}, to=sid)
+        await emit("message_error", {"error": str(e)}, to=sid)
+        return {"success": False, "error": str(e)}
+
+    # The sender's ack only comes once the message is stored
+    try:
+        await message_writer.submit(message)
+    except Exception as e:
+        logger.error(f"Message {message.id} could not be saved: {str(e)}")
+        await emit("message_error", {"id": str(message.id), "error": "Message could not be saved"}, to=sid)
+        return {"success": False, "id": str(message.id), "error": "Message could not be saved"}
+
+    return {"success": True, "id": str(message.id)}
 
 # ---------------------------
 # Mark as Read
 # ---------------------------
 @sio.event
+@instrumented
 async def mark_as_read(sid, data):
     """
-    data = { "conversation_id": "...", "user_id": "..." }
+    data = { "conversation_id": "...", "cursor": "..." }
+
+    cursor is the one of the last message the user has seen, without it
+    the whole conversation counts as read. Reports are coalesced, the room
+    gets at most one messages_read per READ_RECEIPT_INTERVAL and reader:
+    { conversation_id, user_id, last_read_message_id, last_read_at, cursor }
     """
     try:
         conversation_id = data.get("conversation_id")
-        user_id = data.get("user_id")
+        if not conversation_id:
+            return {"success": False, "error": "Missing fields"}
 
-        if not (conversation_id and user_id):
-            return
+        session = await sio.get_session(sid)
+        user_id = session["user_id"]
+        if data.get("user_id") and str(data["user_id"]) != user_id:
+            return {"success": False, "error": "Cannot mark messages read for another user"}
 
-        @sync_to_async
-        def update_read():
-            return Message.objects.filter(
-                conversation_id=conversation_id,
-                recipient_id=user_id,
-                read=False
-            ).update(read=True)
-
-        updated = await update_read()
-
-        if updated:
-            await sio.emit(
-                "messages_read",
-                {"conversation_id": conversation_id, "user_id": user_id},
-                room=f"conversation_{conversation_id}"
-            )
-            print(f"✅ {updated} messages marked as read in {conversation_id}")
+        read_receipts.mark(conversation_id, user_id, data.get("cursor"))
+        return {"success": True}
 
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
     except Exception as e:
         logger.error(f"Error in mark_as_read: {str(e)}", exc_info=True)
+        return {"success": False, "error": "Mark as read failed"}
+
+
+async def broadcast_read(receipt):
+    await emit("messages_read", receipt, room=conversation_room(receipt["conversation_id"]))
+
+
+read_receipts = ReadReceipts(broadcast_read)
 
 
 # # send notification
@@ -211,6 +346,7 @@ async def mark_as_read(sid, data):
 
 # send notification
 @sio.event
+@instrumented
 async def send_notification(sid, data):
     """
     data = {
@@ -220,127 +356,95 @@ async def send_notification(sid, data):
         "onclick_location": "/courses/django/"
     }
     """
-    print(f"📨 send_notification called with data: {data}")
-    print(f"📨 Session ID: {sid}")
-    
     try:
         user_id = data.get("user_id")
         header = data.get("header")
         detail = data.get("detail", "")
         onclick_location = data.get("onclick_location", "")
-        
-        print(f"📋 Extracted data - user_id: {user_id}, header: {header}, onclick_location: {onclick_location}")
-        
+
         if not (user_id and header and onclick_location):
-            print("❌ Missing required fields")
-            await sio.emit(
+            logger.warning(f"Missing fields in send_notification from {sid}")
+            await emit(
                 "notification_error",
                 {"error": "Missing required fields"},
                 to=sid
             )
             return
-        
-        print("✅ All required fields present")
-        
+
         # ✅ 1. Save to Database
-        @sync_to_async
+        @database_sync_to_async
         def create_notification():
-            print(f"💾 Creating notification in database for user_id: {user_id}")
-            notification = Notification.objects.create(
+            return Notification.objects.create(
                 recipient_id=user_id,
                 header=header,
                 detail=detail,
                 onclick_location=onclick_location
             )
-            print(f"💾 Notification created with ID: {notification.id}")
-            return notification
-            
+
         notification = await create_notification()
-        print(f"✅ Notification saved to database: ID={notification.id}")
-        
+
         # ✅ 2. Real-time Emit
-        room = f"user_{user_id}"
-        print(f"📡 Attempting to emit to room: {room}")
-        
-        # Check if there are any clients in the room
-        room_clients = sio.manager.get_participants(sio.namespace, room)
-        print(f"👥 Clients in room '{room}': {len(room_clients) if room_clients else 0}")
-        
-        if not room_clients:
-            print(f"⚠️ No clients found in room '{room}' - user might not be connected")
-        
-        notification_data = {
-            "id": str(notification.id),
-            "header": notification.header,
-            "detail": notification.detail,
-            "onclick_location": notification.onclick_location,
-            "created_at": notification.created_at.isoformat(),
-            "is_read": notification.is_read,
-        }
-        
-        print(f"📤 Emitting notification data: {notification_data}")
-        
-        await sio.emit(
+        room = user_room(user_id)
+
+        # Room members may be connected to other workers, the client
+        # manager delivers the emit to all of them
+        await emit(
             "receive_notification",
-            notification_data,
+            notification_data(notification),
             room=room
         )
-        
-        print(f"✅ Notification successfully emitted to room: {room}")
-        
+
         # Also emit success confirmation to the sender
-        await sio.emit(
+        await emit(
             "notification_sent",
             {"success": True, "notification_id": str(notification.id)},
             to=sid
         )
-        
-        print(f"🔔 Notification process completed successfully → {room}")
-        
+
+        log_sampled(logger, logging.INFO, f"Notification {notification.id} sent to {room}")
+
     except Exception as e:
-        print(f"❌ Error in send_notification: {e}")
         logger.error(f"Error in send_notification: {e}", exc_info=True)
-        await sio.emit("notification_error", {"error": str(e)}, to=sid)
+        await emit("notification_error", {"error": str(e)}, to=sid)
 
 
 # join notification channel
 @sio.event
+@instrumented
 async def join_notification_room(sid, data):
-    print(f"🔗 join_notification_room called with data: {data}")
-    print(f"🔗 Session ID: {sid}")
-    
     try:
+        # The room was joined on connect, a socket may only use its own
+        session = await sio.get_session(sid)
         user_id = data.get("user_id")
-        print(f"👤 Extracted user_id: {user_id}")
-        
-        if user_id:
-            room = f"user_{user_id}"
+
+        if user_id and str(user_id) != session["user_id"]:
+            logger.warning(f"{sid} (user {session['user_id']}) asked to join the notification room of {user_id}")
+            await emit(
+                "notification_error",
+                {"error": "Cannot join the notification room of another user"},
+                to=sid
+            )
+        elif user_id:
+            room = user_room(user_id)
             await sio.enter_room(sid, room)
-            print(f"✅ Notification Connected: {sid} joined {room}")
-            
-            # Verify the client actually joined the room
-            room_clients = sio.manager.get_participants(sio.namespace, room)
-            print(f"👥 Total clients now in room '{room}': {len(room_clients) if room_clients else 0}")
-            
+
             # Send confirmation to client
-            await sio.emit(
+            await emit(
                 "notification_room_joined",
                 {"success": True, "room": room, "user_id": user_id},
                 to=sid
             )
-            
-            print(f"✅ Client {sid} successfully joined notification room for user {user_id}")
-            
+
+            logger.debug(f"{sid} joined notification room {room}")
+
         else:
-            print("❌ No user_id provided in join_notification_room")
-            await sio.emit(
+            logger.warning(f"join_notification_room from {sid} without user_id")
+            await emit(
                 "notification_error",
                 {"error": "user_id is required to join notification room"},
                 to=sid
             )
-            
+
     except Exception as e:
-        print(f"❌ Error in join_notification_room: {e}")
         logger.error(f"Error in join_notification_room: {e}", exc_info=True)
-        await sio.emit("notification_error", {"error": str(e)}, to=sid)
-
+        await emit("notification_error", {"error": str(e)}, to=sid)
@@ -0,0 +1,154 @@
+import base64
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Q
+
+from .models import Message
+
+# Upper bound of messages returned by one sync call, clients call again
+# with the returned cursors while has_more is true
+SYNC_MAX_MESSAGES = 500
+
+# History pages
+DEFAULT_PAGE_SIZE = 30
+MAX_PAGE_SIZE = 100
+
+
+# ---------------------------
+# Cursors
+# ---------------------------
+def encode_cursor(created_at: datetime, message_id) -> str:
+    """Opaque position of a message: its created_at, ties broken by id"""
+    raw = f"{created_at.isoformat()}|{message_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Inverse of encode_cursor, raises ValueError on anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, message_id = raw.split("|")
+        created_at = datetime.fromisoformat(created_at)
+        if created_at.tzinfo is None:
+            # Compared with aware timestamps, a naive one raises TypeError
+            raise ValueError("naive timestamp")
+        return created_at, uuid.UUID(message_id)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def message_cursor(message: Message) -> str:
+    return encode_cursor(message.created_at, message.id)
+
+
+def after_cursor(cursor: str) -> Q:
+    """Messages strictly after cursor in (created_at, id) order"""
+    created_at, message_id = decode_cursor(cursor)
+    # The outer range is what lets Postgres bound the index scan, the OR
+    # only settles ties on created_at
+    return Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(id__gt=message_id))
+
+
+def before_cursor(cursor: str) -> Q:
+    """Messages strictly before cursor in (created_at, id) order"""
+    created_at, message_id = decode_cursor(cursor)
+    return Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=message_id))
+
+
+# ---------------------------
+# History pages
+# ---------------------------
+def page_size_param(value, default: int = DEFAULT_PAGE_SIZE) -> int:
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def history_page(queryset, before: Optional[str], page_size: int) -> Tuple[List[Message], Optional[str]]:
+    """Keyset page of messages older than ``before``, newest first
+
+    Walks the (conversation, created_at, id) index backwards from the
+    cursor, so a page costs the same at any depth of the history and no
+    COUNT(*) is needed. Returns the rows and the cursor of the next (older)
+    page, None on the last page. Raises ValueError on a malformed cursor.
+    """
+    if before:
+        queryset = queryset.filter(before_cursor(before))
+    rows = list(queryset.order_by("-created_at", "-id")[:page_size + 1])
+    if len(rows) > page_size:
+        return rows[:page_size], message_cursor(rows[page_size - 1])
+    return rows, None
+
+
+# ---------------------------
+# Delta sync
+# ---------------------------
+def message_data(message: Message, read: Optional[bool] = None) -> dict:
+    """Message as returned by the REST and socket sync APIs
+
+    ``read`` overrides the stored flag, callers pass what the recipient's
+    read mark says (see receipts.is_read).
+    """
+    return {
+        "id": str(message.id),
+        "conversation_id": str(message.conversation_id),
+        "sender_id": str(message.sender_id),
+        "sender_name": message.sender.username,
+        "recipient_id": str(message.recipient_id),
+        "recipient_name": message.recipient.username,
+        "content": message.content,
+        "created_at": message.created_at.isoformat(),
+        "delivered": message.delivered,
+        "read": message.read if read is None else read,
+        "cursor": message_cursor(message),
+    }
+
+
+def messages_since(conversation_ids: Iterable[str], since: Optional[str] = None,
+                   cursors: Optional[Dict[str, str]] = None, limit: int = SYNC_MAX_MESSAGES) -> dict:
+    """Messages newer than the client's last seen ones, in one query
+
+    ``cursors`` maps conversation ids to the cursor of the last message the
+    client has; conversations without one use ``since`` (or are skipped when
+    there is no ``since`` either). Only ``conversation_ids`` (the user's own
+    conversations) are read. Raises ValueError on a malformed cursor.
+    """
+    cursors = cursors or {}
+    allowed = {str(conversation_id) for conversation_id in conversation_ids}
+
+    condition = Q()
+    for conversation_id, cursor in cursors.items():
+        if conversation_id in allowed and cursor:
+            condition |= Q(conversation_id=conversation_id) & after_cursor(cursor)
+
+    rest = allowed - {conversation_id for conversation_id, cursor in cursors.items() if cursor}
+    if since and rest:
+        condition |= Q(conversation_id__in=rest) & after_cursor(since)
+
+    if not condition:
+        return {"messages": {}, "cursors": {}, "has_more": False}
+
+    rows = list(
+        Message.objects.filter(condition)
+        .select_related("sender", "recipient")
+        .order_by("created_at", "id")[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Imported here, receipts builds on the cursors of this module
+    from .receipts import is_read, read_marks
+    marks = read_marks({message.conversation_id for message in rows})
+
+    # Every conversation gets a prefix of its new messages, so the last
+    # cursor per conversation is a safe place to resume from
+    messages, latest = {}, {}
+    for message in rows:
+        conversation_id = str(message.conversation_id)
+        messages.setdefault(conversation_id, []).append(message_data(message, is_read(message, marks)))
+        latest[conversation_id] = message_cursor(message)
+
+    return {"messages": messages, "cursors": latest, "has_more": has_more}
@@ -1,7 +1,9 @@
 from django.urls import path
 from .views import (
     ConversationList,
-    ConversationMessages
+    ConversationMessages,
+    ConversationRead,
+    ConversationSync
 )
 
 urlpatterns = [
@@ -11,4 +13,10 @@ urlpatterns = [
         ConversationMessages.as_view(),
         name="conversation-messages",
     ),
+    path(
+        "conversations/<uuid:conversation_id>/read/",
+        ConversationRead.as_view(),
+        name="conversation-read",
+    ),
+    path("sync/", ConversationSync.as_view(), name="conversation-sync"),
 ]
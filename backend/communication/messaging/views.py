@@ -1,48 +1,70 @@
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Max
+from django.db.models import F, Q
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import BasePermission, IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
+from rest_framework import status
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
 
+from . import metrics
+from .managers import get_external_emitter
 from .models import Conversation, Message
+from .receipts import advance_read_mark, is_read, read_marks
+from .rooms import conversation_ids, conversation_room
+from .sync import (
+    SYNC_MAX_MESSAGES,
+    after_cursor,
+    history_page,
+    message_cursor,
+    message_data,
+    messages_since,
+    page_size_param
+)
 from django.contrib.auth import get_user_model
+import logging
 
+logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
+class InboxPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
 class ConversationList(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         user = request.user
 
-        # Annotate by last message time and order by it (latest conversations first)
+        # Latest conversations first, all inbox data lives on the row
         conversations = (
             Conversation.objects.filter(Q(teacher=user) | Q(student=user))
-            .annotate(last_message_time=Max("messages__created_at"))
-            .order_by("-last_message_time")
-            .distinct()
+            .select_related("teacher", "student")
+            .order_by(F("last_message_at").desc(nulls_last=True), "-created_at")
         )
 
-        paginator = PageNumberPagination()
+        paginator = InboxPagination()
         page = paginator.paginate_queryset(conversations, request, view=self)
 
         result = []
         for conv in page:
-            # conv.messages ordering uses Message.Meta ordering (latest first)
-            last_msg = conv.messages.first()
-            unread_count = conv.messages.filter(recipient=user, read=False).count()
-            other_user = conv.student if conv.teacher == user else conv.teacher
+            other_user = conv.student if conv.teacher_id == user.id else conv.teacher
 
             result.append(
                 {
                     "conversation_id": str(conv.id),
                     "other_user": getattr(other_user, "username", str(other_user)),
                     "other_user_id": str(other_user.id),
-                    "last_message": last_msg.content if last_msg else "",
-                    "last_message_at": last_msg.created_at.isoformat() if last_msg else None,
-                    "unread_count": unread_count,
+                    "last_message": conv.last_message_preview,
+                    "last_message_id": str(conv.last_message_id) if conv.last_message_id else None,
+                    "last_message_at": conv.last_message_at.isoformat() if conv.last_message_at else None,
+                    "unread_count": conv.unread_for(user.id),
                 }
             )
 
@@ -55,23 +77,43 @@ class ConversationMessages(APIView):
     def get(self, request, conversation_id):
         user = request.user
 
-        print(conversation_id)
         # Ensure the conversation exists and the user is a participant
         qs = Conversation.objects.filter(id=conversation_id).filter(Q(teacher=user) | Q(student=user))
-        print(qs)
         conversation = get_object_or_404(qs)
 
+        # ?since=<cursor> returns only the messages after it, oldest first
+        since = request.query_params.get("since")
+        if since:
+            try:
+                newer = Message.objects.filter(after_cursor(since), conversation=conversation)
+            except ValueError:
+                return Response({"error": "Invalid since cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+            rows = list(
+                newer.select_related("sender", "recipient")
+                .order_by("created_at", "id")[:SYNC_MAX_MESSAGES + 1]
+            )
+            marks = read_marks([conversation.id])
+            return Response({
+                "results": [message_data(msg, is_read(msg, marks)) for msg in rows[:SYNC_MAX_MESSAGES]],
+                "has_more": len(rows) > SYNC_MAX_MESSAGES,
+            })
+
         # Select related for sender/recipient to reduce queries
         messages = (
             Message.objects.filter(conversation=conversation)
             .select_related("sender", "recipient")
-            .order_by("-created_at")  # ascending so oldest messages first (useful for chat UI)
         )
 
-        paginator = PageNumberPagination()
-        page = paginator.paginate_queryset(messages, request, view=self)
+        # ?before=<cursor> pages back through older history
+        page_size = page_size_param(request.query_params.get("page_size"))
+        try:
+            page, next_cursor = history_page(messages, request.query_params.get("before"), page_size)
+        except ValueError:
+            return Response({"error": "Invalid before cursor"}, status=status.HTTP_400_BAD_REQUEST)
 
-        page = list(reversed(page))
+        page = list(reversed(page))  # ascending so oldest messages first (useful for chat UI)
+        marks = read_marks([conversation.id])
         result = []
         for msg in page:
             result.append(
@@ -84,9 +126,108 @@ class ConversationMessages(APIView):
                     "content": msg.content,
                     "created_at": msg.created_at.isoformat(),
                     "delivered": msg.delivered,
-                    "read": msg.read,
+                    "read": is_read(msg, marks),
+                    "cursor": message_cursor(msg),
                 }
             )
 
-        return paginator.get_paginated_response(result)
+        base_url = request.build_absolute_uri(request.path)
+        return Response({
+            "next": f"{base_url}?before={next_cursor}&page_size={page_size}" if next_cursor else None,
+            "results": result,
+        })
+
+
+class ConversationSync(APIView):
+    """
+    Catch up after a reconnect with one request for all conversations:
+    POST { "cursors": { conversationId: lastCursor, ... }, "since": cursor }
+
+    Returns the newer messages grouped by conversation and the cursor to
+    resume from in each; call again with them while has_more is true.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        cursors = request.data.get("cursors") or {}
+        since = request.data.get("since")
+        if not isinstance(cursors, dict):
+            return Response({"error": "cursors must be an object"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = messages_since(conversation_ids(request.user.id), since=since, cursors=cursors)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+        return Response(result)
+
+
+
+class ConversationRead(APIView):
+    """
+    Mark a conversation read up to a message:
+    POST { "cursor": "<cursor of the last message seen>" }
+
+    Without a cursor the whole conversation is read. The read mark only
+    moves forward; the response carries the receipt, or null when the
+    mark was already there.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, conversation_id):
+        user = request.user
+        qs = Conversation.objects.filter(id=conversation_id).filter(Q(teacher=user) | Q(student=user))
+        get_object_or_404(qs)
+
+        try:
+            receipt = advance_read_mark(conversation_id, user.id, request.data.get("cursor"))
+        except ValueError:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if receipt:
+            # Through the Redis client manager like the notification emits,
+            # this view may run outside the socket server's event loop
+            emitter = get_external_emitter()
+            if emitter is None:
+                logger.warning("No Socket.IO emitter outside the socket server, read receipt not pushed")
+            else:
+                try:
+                    emitter.emit(
+                        "messages_read", receipt, namespace="/", room=conversation_room(receipt["conversation_id"])
+                    )
+                except Exception as e:
+                    logger.error(f"Read receipt broadcast failed: {e}", exc_info=True)
+
+        return Response({"success": True, "receipt": receipt})
+
+
+class MetricsAccess(BasePermission):
+    """Bearer METRICS_TOKEN for scrapers, staff users otherwise"""
+
+    def has_permission(self, request, view):
+        header = request.META.get("HTTP_AUTHORIZATION", "")
+        if settings.METRICS_TOKEN and header.startswith("Bearer "):
+            return constant_time_compare(header[len("Bearer "):], settings.METRICS_TOKEN)
+        return bool(request.user and request.user.is_staff)
+
+
+class SocketMetrics(APIView):
+    """
+    Socket.IO metrics of every worker in the Prometheus text format:
+    event counts and latency, database and emit time, connected clients
+    and room sizes.
+    """
+    # The scrape token is not a JWT, authenticate only when it is absent
+    permission_classes = [MetricsAccess]
+
+    def get_authenticators(self):
+        header = self.request.META.get("HTTP_AUTHORIZATION", "")
+        if settings.METRICS_TOKEN and constant_time_compare(header, f"Bearer {settings.METRICS_TOKEN}"):
+            return []
+        return super().get_authenticators()
+
+    def get(self, request):
+        return HttpResponse(
+            metrics.render(metrics.collect_snapshots()),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from django.db import DatabaseError, DataError, IntegrityError, transaction
+
+from .db import database_sync_to_async
+from .inbox import record_messages
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+# A batch is written once it holds this many messages...
+WRITE_BATCH_SIZE = 200
+# ...or once its first message has waited this long (seconds)
+WRITE_FLUSH_INTERVAL = 0.05
+
+# Attempts per batch on database errors, with exponential backoff
+WRITE_MAX_ATTEMPTS = 4
+WRITE_RETRY_DELAY = 0.2
+
+
+class MessageWriter:
+    """Write-behind persistence of chat messages
+
+    Socket handlers build a Message with its final id and timestamp, emit it
+    right away and then await submit(), which resolves once the row is
+    committed. Messages are written with bulk_create in batches bounded by
+    size and time, so a busy chat costs one INSERT per batch instead of one
+    transaction per line.
+
+    Callers validate a message before emitting it (participants, content),
+    so a row dropped by _insert_each means the conversation or a user was
+    deleted in between.
+    """
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE, flush_interval: float = WRITE_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, message: Message) -> Message:
+        """Queue message for writing and wait until it is stored"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((message, future))
+        return await future
+
+    async def close(self):
+        """Write everything still queued, used on ASGI shutdown"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        self._task = None
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    # ---------------------------
+    # Flushing
+    # ---------------------------
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                logger.error(f"Message writer failed on a batch of {len(batch)}: {e}", exc_info=True)
+                _settle(batch, e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[Tuple[Message, asyncio.Future]]):
+        messages = [message for message, _ in batch]
+        for attempt in range(1, WRITE_MAX_ATTEMPTS + 1):
+            try:
+                await _bulk_insert(messages)
+                _settle(batch)
+                logger.debug(f"Message writer stored {len(messages)} messages")
+                return
+            except (IntegrityError, DataError):
+                # A bad row (e.g. unknown conversation) must not sink the
+                # others, store them one by one to find it
+                errors = await _insert_each(messages)
+                for item, error in zip(batch, errors):
+                    _settle([item], error)
+                return
+            except DatabaseError as e:
+                if attempt == WRITE_MAX_ATTEMPTS:
+                    raise
+                delay = WRITE_RETRY_DELAY * 2 ** (attempt - 1)
+                logger.warning(f"Message batch write failed ({e}), retry {attempt} in {delay}s")
+                await asyncio.sleep(delay)
+
+
+@database_sync_to_async
+def _bulk_insert(messages: List[Message]):
+    with transaction.atomic():
+        Message.objects.bulk_create(messages)
+        record_messages(messages)
+
+
+@database_sync_to_async
+def _insert_each(messages: List[Message]) -> List[Optional[Exception]]:
+    errors = []
+    for message in messages:
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create([message])
+                record_messages([message])
+            errors.append(None)
+        except DatabaseError as e:
+            logger.error(f"Dropping message {message.id}: {e}")
+            errors.append(e)
+    return errors
+
+
+def _settle(batch, error: Optional[Exception] = None):
+    for message, future in batch:
+        if future.done():
+            continue
+        if error is None:
+            future.set_result(message)
+        else:
+            future.set_exception(error)
+
+
+message_writer = MessageWriter()
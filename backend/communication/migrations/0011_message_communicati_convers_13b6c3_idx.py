@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0010_alter_message_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'created_at', 'id'], name='communicati_convers_13b6c3_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:01
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+
+def backfill_inbox(apps, schema_editor):
+    Conversation = apps.get_model('communication', 'Conversation')
+    Message = apps.get_model('communication', 'Message')
+
+    latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+
+    def unread(participant):
+        counts = (
+            Message.objects.filter(conversation=OuterRef('pk'), recipient=OuterRef(participant), read=False)
+            .order_by()
+            .values('conversation')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    Conversation.objects.update(
+        last_message_id=Subquery(latest.values('id')[:1]),
+        last_message_at=Subquery(latest.values('created_at')[:1]),
+        last_message_preview=Coalesce(Subquery(latest.annotate(preview=Substr('content', 1, 120)).values('preview')[:1]), Value('')),
+        teacher_unread=unread('teacher'),
+        student_unread=unread('student'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0012_conversation_last_message_at_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_inbox, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:05
+
+from django.db import migrations
+
+
+def backfill_read_states(apps, schema_editor):
+    Message = apps.get_model('communication', 'Message')
+    ReadState = apps.get_model('communication', 'ReadState')
+
+    # Latest read message per (conversation, recipient) becomes the read mark
+    latest_read = (
+        Message.objects.filter(read=True, conversation__isnull=False)
+        .order_by('conversation_id', 'recipient_id', '-created_at', '-id')
+        .distinct('conversation_id', 'recipient_id')
+        .values_list('conversation_id', 'recipient_id', 'id', 'created_at')
+    )
+    ReadState.objects.bulk_create(
+        [
+            ReadState(
+                conversation_id=conversation_id,
+                user_id=user_id,
+                last_read_message_id=message_id,
+                last_read_at=created_at,
+            )
+            for conversation_id, user_id, message_id, created_at in latest_read.iterator()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0014_readstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_read_states, migrations.RunPython.noop),
+    ]
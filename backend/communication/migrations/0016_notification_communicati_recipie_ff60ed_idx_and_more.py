@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0015_backfill_readstate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', 'created_at'], name='communicati_recipie_ff60ed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'created_at', 'id'], name='communicati_recipie_5e6a85_idx'),
+        ),
+    ]
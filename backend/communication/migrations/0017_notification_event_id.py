@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0016_notification_communicati_recipie_ff60ed_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='event_id',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('event_id__isnull', False)), fields=('event_id', 'recipient'), name='notification_event_recipient_unique'),
+        ),
+    ]
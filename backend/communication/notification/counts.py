@@ -0,0 +1,41 @@
+import logging
+
+from core.cache import shared_cache as cache
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+# Unread count of a user, dropped whenever one of their notifications is
+# created or changes state
+UNREAD_COUNT_CACHE_TTL = 60 * 10
+
+
+def unread_count_cache_key(user_id) -> str:
+    return f"notification_unread_{user_id}"
+
+
+def unread_count(user_id) -> int:
+    """Unread notifications of user_id, cached"""
+    key = unread_count_cache_key(user_id)
+    try:
+        count = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Unread count cache read failed: {e}")
+        count = None
+    if count is not None:
+        return count
+
+    # Index only count on (recipient, is_read, created_at)
+    count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+    try:
+        cache.set(key, count, UNREAD_COUNT_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Unread count cache write failed: {e}")
+    return count
+
+
+def invalidate_unread_count(*user_ids):
+    try:
+        cache.delete_many([unread_count_cache_key(user_id) for user_id in set(user_ids)])
+    except Exception as e:
+        logger.warning(f"Unread count cache invalidation failed: {e}")
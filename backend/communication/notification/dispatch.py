@@ -0,0 +1,164 @@
+import logging
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import QuerySet
+
+from communication.messaging.managers import get_external_emitter
+from .counts import invalidate_unread_count
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+# Recipients per bulk_create, and per Celery task when fanning out
+NOTIFY_CHUNK_SIZE = 1000
+# Emits per Redis pipeline
+EMIT_BATCH_SIZE = 500
+
+
+# ---------------------------
+# Audiences
+# ---------------------------
+# Named recipient queries, resolved by the Celery worker so the caller
+# never loads the ids of a large audience
+AUDIENCES: Dict[str, Callable[..., QuerySet]] = {
+    "pro_students": lambda: User.objects.filter(student__account_type="pro"),
+    "teachers": lambda: User.objects.filter(teacher__isnull=False),
+}
+
+
+def audience_ids(name: str, **kwargs) -> Iterable:
+    if name not in AUDIENCES:
+        raise ValueError(f"Unknown notification audience: {name}")
+    return AUDIENCES[name](**kwargs).values_list("id", flat=True).iterator(chunk_size=NOTIFY_CHUNK_SIZE)
+
+
+# ---------------------------
+# Dispatch
+# ---------------------------
+def notify(recipients=None, *, audience: Optional[str] = None, audience_kwargs: Optional[dict] = None,
+           header: str, detail: str = "", onclick_location: str = "", event_id=None):
+    """Queue a notification for many users, returns right away
+
+    recipients is an iterable of users or user ids, or a user QuerySet;
+    audience names one of AUDIENCES instead. Rows and socket emits are
+    handled by Celery in chunks of NOTIFY_CHUNK_SIZE, queued once the
+    current transaction commits (right away outside of one, where a
+    broker error reaches the caller). With event_id a chunk queued twice
+    notifies nobody twice, see create_notifications.
+    """
+    from .tasks import deliver_notifications, notify_audience
+
+    content = {"header": header, "detail": detail, "onclick_location": onclick_location}
+    event_id = str(event_id) if event_id else None
+
+    if audience is not None:
+        if audience not in AUDIENCES:
+            raise ValueError(f"Unknown notification audience: {audience}")
+        transaction.on_commit(lambda: notify_audience.delay(audience, audience_kwargs or {}, content, event_id))
+        return
+
+    if isinstance(recipients, QuerySet):
+        recipients = recipients.values_list("pk", flat=True)
+    user_ids = [str(getattr(recipient, "pk", recipient)) for recipient in recipients]
+    for chunk in _chunks(user_ids, NOTIFY_CHUNK_SIZE):
+        transaction.on_commit(lambda chunk=chunk: deliver_notifications.delay(chunk, content, event_id))
+
+
+def deliver(user_ids: Iterable, header: str, detail: str = "", onclick_location: str = "",
+            event_id=None) -> List[Notification]:
+    """Store one notification per user and push them to the user rooms
+
+    With event_id, users that already have a notification for that event
+    are skipped, see create_notifications.
+    """
+    return create_notifications([
+        Notification(recipient_id=user_id, header=header, detail=detail, onclick_location=onclick_location,
+                     event_id=event_id)
+        for user_id in user_ids
+    ])
+
+
+def create_notifications(notifications: List[Notification]) -> List[Notification]:
+    """Store and push notifications that may differ per recipient
+
+    Rows are written with bulk_create, NOTIFY_CHUNK_SIZE at a time, each
+    chunk in its own transaction and emitted once committed. Notifications
+    with an event_id that the recipient already has are dropped, so an
+    event handled twice stores nothing new; only the rows actually
+    inserted are returned and emitted.
+    """
+    created = []
+    for chunk in _chunks(notifications, NOTIFY_CHUNK_SIZE):
+        with transaction.atomic():
+            chunk = _without_delivered(chunk)
+            Notification.objects.bulk_create(chunk, ignore_conflicts=True)
+        # bulk_create sends no post_save
+        invalidate_unread_count(*[notification.recipient_id for notification in chunk])
+        emit_notifications(chunk)
+        created.extend(chunk)
+    return created
+
+
+def emit_notifications(notifications: List[Notification]) -> int:
+    """Send receive_notification to the user_<id> room of every recipient
+
+    Emits leave in batches of EMIT_BATCH_SIZE through the Redis client
+    manager; a failure is logged, the rows are already stored and show in
+    the notification list.
+    """
+    emitter = get_external_emitter()
+    if emitter is None:
+        logger.warning(f"No Socket.IO emitter outside the socket server, {len(notifications)} notifications not pushed")
+        return 0
+
+    sent = 0
+    for batch in _chunks(notifications, EMIT_BATCH_SIZE):
+        try:
+            sent += emitter.emit_many(
+                ("receive_notification", notification_data(notification), f"user_{notification.recipient_id}")
+                for notification in batch
+            )
+        except Exception as e:
+            logger.error(f"Pushing {len(batch)} notifications failed: {e}", exc_info=True)
+    return sent
+
+
+def notification_data(notification: Notification) -> dict:
+    """Payload of the receive_notification socket event"""
+    return {
+        "id": str(notification.id),
+        "header": notification.header,
+        "detail": notification.detail,
+        "onclick_location": notification.onclick_location,
+        "created_at": notification.created_at.isoformat(),
+        "is_read": notification.is_read,
+    }
+
+
+def _without_delivered(notifications: List[Notification]) -> List[Notification]:
+    """Drop notifications whose (event_id, recipient) is stored already"""
+    event_ids = {notification.event_id for notification in notifications if notification.event_id}
+    if not event_ids:
+        return notifications
+    delivered = set(
+        Notification.objects
+        .filter(event_id__in=event_ids, recipient_id__in=[n.recipient_id for n in notifications])
+        .values_list("event_id", "recipient_id")
+    )
+    return [
+        notification for notification in notifications
+        if (_uuid(notification.event_id), _uuid(notification.recipient_id)) not in delivered
+    ]
+
+
+def _uuid(value):
+    return value if value is None or isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
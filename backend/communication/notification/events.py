@@ -0,0 +1,102 @@
+import logging
+
+from django.utils.dateparse import parse_datetime
+
+from core.events import Consumer, Event
+from .dispatch import deliver, notify
+
+logger = logging.getLogger(__name__)
+
+# Consumer group storing and pushing the notifications of domain events,
+# run with ./manage.py consume_notification_events
+NOTIFICATION_GROUP = "notifications"
+
+
+# ---------------------------
+# Handlers
+# ---------------------------
+def booking_created(event: Event):
+    """
+    payload = {
+        "booked_session_id", "teacher_user_id", "student_user_id",
+        "student_name", "starts_at"
+    }
+    """
+    payload = event.payload
+    starts_at = parse_datetime(payload["starts_at"])
+    deliver(
+        [payload["teacher_user_id"]],
+        header="New Session Booked",
+        detail=f"{payload['student_name']} booked a session for {starts_at.strftime('%Y-%m-%d %H:%M')}.",
+        onclick_location=f"/teacher/booked-sessions/{payload['booked_session_id']}",
+        event_id=event.id,
+    )
+
+
+def payment_succeeded(event: Event):
+    """
+    payload = {"kind": "subscription" | "teacher-subscription", "user_id", "ends_at"}
+    payload = {"kind": "booked_session", "user_id", "teacher_user_id", "booked_session_id", "student_name"}
+    """
+    payload = event.payload
+    kind = payload["kind"]
+
+    if kind in ("subscription", "teacher-subscription"):
+        ends_at = parse_datetime(payload["ends_at"])
+        role = "student" if kind == "subscription" else "teacher"
+        deliver(
+            [payload["user_id"]],
+            header="Pro plan activated",
+            detail=f"Your Pro plan is active until {ends_at.strftime('%B %d, %Y')}.",
+            onclick_location=f"/{role}/subscription",
+            event_id=event.id,
+        )
+    elif kind == "booked_session":
+        session_id = payload["booked_session_id"]
+        deliver(
+            [payload["user_id"]],
+            header="Payment received",
+            detail="Your session payment went through.",
+            onclick_location=f"/student/booked-sessions/{session_id}",
+            event_id=event.id,
+        )
+        deliver(
+            [payload["teacher_user_id"]],
+            header="Session paid",
+            detail=f"{payload['student_name']} paid for their booked session.",
+            onclick_location=f"/teacher/booked-sessions/{session_id}",
+            event_id=event.id,
+        )
+    else:
+        logger.warning(f"payment.succeeded event {event.id} of unknown kind {kind}")
+
+
+def video_ready(event: Event):
+    """
+    payload = {"video_id", "title", "consumer": "student" | "teacher"}
+
+    The audience can be every teacher or pro student, it is resolved and
+    delivered by Celery in chunks, see dispatch.notify. The event fails
+    and is retried when the task cannot be queued; chunks queued twice
+    notify nobody twice, they carry the event's id.
+    """
+    payload = event.payload
+    for_students = payload["consumer"] == "student"
+    notify(
+        audience="pro_students" if for_students else "teachers",
+        header="New video available",
+        detail=payload["title"],
+        onclick_location="/student/video-library" if for_students else "/teacher/video-library",
+        event_id=event.id,
+    )
+
+
+HANDLERS = {
+    "booking.created": booking_created,
+    "payment.succeeded": payment_succeeded,
+    "video.ready": video_ready,
+}
+
+
+def notification_consumer(**kwargs) -> Consumer:
+    return Consumer(NOTIFICATION_GROUP, HANDLERS, **kwargs)
@@ -40,8 +40,29 @@ class Notification(models.Model):
         default=False
     )
 
+    # Event bus event the notification was created for, see core.events
+    event_id = models.UUIDField(
+        blank=True,
+        null=True,
+        editable=False
+    )
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread list, unread count and mark-all-read of a user
+            models.Index(fields=['recipient', 'is_read', 'created_at']),
+            # Keyset pages of a user's whole list
+            models.Index(fields=['recipient', 'created_at', 'id']),
+        ]
+        constraints = [
+            # A redelivered event does not notify anyone twice
+            models.UniqueConstraint(
+                fields=['event_id', 'recipient'],
+                condition=models.Q(event_id__isnull=False),
+                name='notification_event_recipient_unique'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.header} -> {self.recipient.username}"
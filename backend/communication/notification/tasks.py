@@ -1,54 +1,240 @@
-from celery import shared_task
+from celery import group, shared_task
+from django.db import DatabaseError, transaction
+from django.db.models import Q
 from django.utils import timezone
-import requests
+from datetime import timedelta
+import logging
+import math
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3)
+def deliver_notifications(self, user_ids, content, event_id=None):
+    """
+    Store and push one notification per user id, at most
+    NOTIFY_CHUNK_SIZE of them. Queued by dispatch.notify.
+    """
+    from .dispatch import deliver
+
+    try:
+        return len(deliver(user_ids, event_id=event_id, **content))
+    except DatabaseError as exc:
+        # The chunk is written in one transaction, nothing was stored
+        raise self.retry(exc=exc, countdown=5)
+
+
+@shared_task(bind=True, max_retries=3)
+def notify_audience(self, audience, audience_kwargs, content, event_id=None):
+    """
+    Resolve a named audience and queue its recipients in chunks,
+    so they are delivered by several workers at once. A retry queues
+    every chunk again, with event_id the repeats store nothing.
+    """
+    from .dispatch import NOTIFY_CHUNK_SIZE, audience_ids
+
+    try:
+        chunk, queued = [], 0
+        for user_id in audience_ids(audience, **audience_kwargs):
+            chunk.append(str(user_id))
+            if len(chunk) == NOTIFY_CHUNK_SIZE:
+                deliver_notifications.delay(chunk, content, event_id)
+                queued += len(chunk)
+                chunk = []
+        if chunk:
+            deliver_notifications.delay(chunk, content, event_id)
+            queued += len(chunk)
+    except DatabaseError as exc:
+        raise self.retry(exc=exc, countdown=5)
+    return queued
 
 
 @shared_task(bind=True, max_retries=3)
-def send_reminder_notification():
+def deliver_notification_rows(self, rows):
+    """
+    Store and push notifications whose content differs per recipient,
+    rows = [{"recipient_id", "header", "detail", "onclick_location"}, ...]
+    """
+    from .dispatch import create_notifications
+    from .models import Notification
+
+    try:
+        return len(create_notifications([Notification(**row) for row in rows]))
+    except DatabaseError as exc:
+        raise self.retry(exc=exc, countdown=5)
+
+
+# ---------------------------
+# Session reminders
+# ---------------------------
+# Reminders go out this long before a session starts
+REMINDER_LEAD = timedelta(minutes=30)
+# Sessions claimed per transaction
+REMINDER_SWEEP_BATCH = 200
+# Sessions whose reminders are queued as one Celery group
+REMINDER_GROUP_SESSIONS = 30
+# Namespace of the event ids of in-app reminders, one per session
+REMINDER_EVENT_NAMESPACE = uuid.UUID("5f0c6f1e-2d4b-4f0e-9a57-3c1f8e6b2a90")
+
+
+@shared_task
+def sweep_session_reminders():
     """
-    Celery Beat task that runs every minute to check for session
-    starting in 30 minutes and sends reminders.
+    Celery Beat task that runs every minute and sends the email and
+    in-app reminders of every paid session starting within REMINDER_LEAD.
+
+    Due sessions are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so
+    overlapping sweeps (a slow tick, several beat instances) never take
+    the same session, and their flags are set with one UPDATE. The
+    reminders are queued once the claim commits; sessions whose group
+    cannot be queued are released for the next tick. In-app reminders
+    carry an event id derived from the session, so one queued twice is
+    stored once.
+
+    Sessions that started without their reminders (booked or paid too
+    late, sweeper down) are marked sent, so they leave the partial index.
     """
-    
+    expired = _expire_missed_reminders()
+    if expired:
+        logger.info(f"Reminders of {expired} started sessions skipped")
+
+    total = 0
+    while True:
+        claimed = _claim_and_dispatch_reminders()
+        total += claimed
+        if claimed < REMINDER_SWEEP_BATCH:
+            break
+    if total:
+        logger.info(f"Reminders queued for {total} sessions")
+    return total
+
+
+def reminder_event_id(session_id) -> uuid.UUID:
+    return uuid.uuid5(REMINDER_EVENT_NAMESPACE, str(session_id))
+
+
+def _expire_missed_reminders():
+    from teacher.session.models import BookedSession
+
+    # Served by the booked_session_reminder_due partial index
+    return BookedSession.objects.filter(
+        Q(reminder_sent=False) | Q(notification_reminder_sent=False),
+        is_paid=True,
+        session_time__lte=timezone.now(),
+    ).update(reminder_sent=True, notification_reminder_sent=True)
+
+
+def _claim_and_dispatch_reminders():
+    from authentication.tasks import send_session_reminder_to_student, send_session_reminder_to_teacher
     from teacher.session.models import BookedSession
 
     now = timezone.now()
+    with transaction.atomic():
+        # Served by the booked_session_reminder_due partial index
+        sessions = list(
+            BookedSession.objects.filter(
+                Q(reminder_sent=False) | Q(notification_reminder_sent=False),
+                is_paid=True,
+                session_time__gt=now,
+                session_time__lte=now + REMINDER_LEAD,
+            )
+            .select_related("teacher__user", "student")
+            .select_for_update(skip_locked=True, of=("self",))
+            .order_by("session_time")[:REMINDER_SWEEP_BATCH]
+        )
+        if not sessions:
+            return 0
 
-    reminder_time_start = now + timedelta(minutes=29)
-    reminder_time_end = now + timedelta(minutes=31)
+        BookedSession.objects.filter(id__in=[session.id for session in sessions]).update(
+            reminder_sent=True, notification_reminder_sent=True
+        )
 
-    sessions_to_remind = BookedSession.objects.filter(
-        is_paid=True,
-        session_time__gte=reminder_time_start,
-        session_time__lte=reminder_time_end,
-        notification_reminder_sent=False
-    )
+        # (session id, flags claimed, signatures) per session
+        claims = []
+        for session in sessions:
+            teacher = session.teacher.user if session.teacher else None
+            student = session.student
+            if not teacher or not student:
+                continue
 
-    notification_url = 'http://localhost:8004/notifications/'
+            teacher_name = teacher.get_full_name() or teacher.username
+            student_name = student.get_full_name() or student.username
+            session_date = session.session_time.strftime("%B %d, %Y")
+            session_time = session.session_time.strftime("%I:%M %p")
+            session_link = f"https://ballmastery.com/session/{session.channel_name}"
+            # Sessions booked inside REMINDER_LEAD are due less than 30 minutes ahead
+            minutes_left = max(1, math.ceil((session.session_time - now).total_seconds() / 60))
+            minutes = f"{minutes_left} minute{'s' if minutes_left != 1 else ''}"
 
+            flags, signatures = [], []
+            if not session.reminder_sent:
+                flags.append("reminder_sent")
+                signatures.append(send_session_reminder_to_teacher.s(
+                    teacher_email=teacher.email,
+                    teacher_name=teacher_name,
+                    student_name=student_name,
+                    session_date=session_date,
+                    session_time=session_time,
+                    session_link=session_link,
+                    minutes_left=minutes_left
+                ))
+                signatures.append(send_session_reminder_to_student.s(
+                    student_email=student.email,
+                    student_name=student_name,
+                    teacher_name=teacher_name,
+                    session_date=session_date,
+                    session_time=session_time,
+                    session_link=session_link,
+                    minutes_left=minutes_left
+                ))
 
-    payload = {
-        "user_id": user_id,
-        "msg_title": msg_title,
-        "msg_body": msg_body
-    }
+            if not session.notification_reminder_sent:
+                flags.append("notification_reminder_sent")
+                event_id = str(reminder_event_id(session.id))
+                signatures.append(deliver_notification_rows.s([
+                    {
+                        "recipient_id": str(teacher.id),
+                        "header": "Session starting soon",
+                        "detail": f"Your session with {student_name} starts in {minutes}, at {session_time}.",
+                        "onclick_location": f"/teacher/booked-sessions/{session.id}",
+                        "event_id": event_id,
+                    },
+                    {
+                        "recipient_id": str(student.id),
+                        "header": "Session starting soon",
+                        "detail": f"Your session with {teacher_name} starts in {minutes}, at {session_time}.",
+                        "onclick_location": f"/student/booked-sessions/{session.id}",
+                        "event_id": event_id,
+                    },
+                ]))
 
-    header = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
+            claims.append((session.id, flags, signatures))
 
-    try:
-        response = requests.post(
-            notification_url,
-            json=payload,
-            header=header
-        )
-        response.raise_for_status()
-        return response.json()
+        # Queued only once the claim is committed, a rolled back claim
+        # cannot have sent anything
+        transaction.on_commit(lambda: _dispatch_reminders(claims))
+
+    return len(sessions)
 
-    except requests.exception.RequestException as exc:
-        raise self.retry(exc=exc, countdown=5)
 
+def _dispatch_reminders(claims):
+    """Queue the reminders of claimed sessions, a Celery group per REMINDER_GROUP_SESSIONS
+
+    When the broker fails, the sessions of that group and of every later
+    one are released, the next sweep claims them again.
+    """
+    from teacher.session.models import BookedSession
 
-            
+    for start in range(0, len(claims), REMINDER_GROUP_SESSIONS):
+        block = claims[start:start + REMINDER_GROUP_SESSIONS]
+        try:
+            group([signature for _, _, signatures in block for signature in signatures]).apply_async()
+        except Exception as e:
+            unsent = claims[start:]
+            logger.error(f"Queueing reminders failed, {len(unsent)} sessions released: {e}", exc_info=True)
+            for flag in ("reminder_sent", "notification_reminder_sent"):
+                BookedSession.objects.filter(
+                    id__in=[session_id for session_id, flags, _ in unsent if flag in flags]
+                ).update(**{flag: False})
+            return
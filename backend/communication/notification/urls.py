@@ -1,6 +1,14 @@
 from django.urls import path
-from .views import NotificationList
+from .views import (
+    NotificationList,
+    NotificationMarkAllRead,
+    NotificationMarkRead,
+    NotificationUnreadCount
+)
 
 urlpatterns = [
-    path('list/', NotificationList.as_view())
+    path('list/', NotificationList.as_view()),
+    path('unread-count/', NotificationUnreadCount.as_view(), name='notification-unread-count'),
+    path('mark-read/', NotificationMarkRead.as_view(), name='notification-mark-read'),
+    path('mark-all-read/', NotificationMarkAllRead.as_view(), name='notification-mark-all-read'),
 ]
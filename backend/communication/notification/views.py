@@ -1,10 +1,97 @@
+import uuid
+
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import generics, status, permissions
 
+from communication.messaging.sync import history_page, page_size_param
+from .counts import invalidate_unread_count, unread_count
 from .serializers import NotificationSerializer
 from .models import Notification
 
+# Upper bound of ids accepted by one mark-read call
+MARK_READ_MAX_IDS = 500
+
+
 class NotificationList(generics.ListAPIView):
+    """
+    The user's notifications, newest first, in keyset pages:
+    GET list/?page_size=20&before=<cursor>&unread=true
+
+    "next" links to the following (older) page, null on the last one.
+    """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = NotificationSerializer
-    queryset = Notification.objects.all()
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(recipient=self.request.user)
+        if self.request.query_params.get("unread") in ("1", "true"):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        page_size = page_size_param(request.query_params.get("page_size"), default=20)
+        try:
+            page, next_cursor = history_page(self.get_queryset(), request.query_params.get("before"), page_size)
+        except ValueError:
+            return Response({"error": "Invalid before cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        next_url = None
+        if next_cursor:
+            params = request.query_params.copy()
+            params["before"] = next_cursor
+            params["page_size"] = page_size
+            next_url = f"{request.build_absolute_uri(request.path)}?{params.urlencode()}"
+
+        return Response({
+            "next": next_url,
+            "results": self.get_serializer(page, many=True).data,
+        })
+
+
+class NotificationUnreadCount(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({"unread_count": unread_count(request.user.id)})
+
+
+class NotificationMarkRead(APIView):
+    """
+    Mark some of the user's notifications read:
+    POST { "ids": ["...", ...] }
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        ids = request.data.get("ids")
+        if not isinstance(ids, list) or not ids:
+            return Response({"error": "ids must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > MARK_READ_MAX_IDS:
+            return Response(
+                {"error": f"At most {MARK_READ_MAX_IDS} ids per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            ids = [uuid.UUID(str(notification_id)) for notification_id in ids]
+        except ValueError:
+            return Response({"error": "Invalid notification id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        updated = Notification.objects.filter(
+            recipient=request.user, id__in=ids, is_read=False
+        ).update(is_read=True)
+
+        if updated:
+            invalidate_unread_count(request.user.id)
+        return Response({"success": True, "updated": updated})
+
+
+class NotificationMarkAllRead(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        updated = Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+        if updated:
+            invalidate_unread_count(request.user.id)
+        return Response({"success": True, "updated": updated})
@@ -1,6 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from communication.messaging.models import Conversation
+from communication.messaging.rooms import invalidate_conversation_ids, invalidate_participants
+from communication.notification.counts import invalidate_unread_count
+from communication.notification.models import Notification
 from teacher.session.models import BookedSession
 
 @receiver(post_save, sender=BookedSession)
@@ -11,3 +14,15 @@ def ensure_conversation(sender, instance, created, **kwargs):
             student=instance.student
         )
 
+@receiver(post_save, sender=Conversation)
+@receiver(post_delete, sender=Conversation)
+def refresh_conversation_rooms(sender, instance, created=True, **kwargs):
+    # Saves of existing rows do not change who takes part
+    if created:
+        invalidate_conversation_ids(instance.teacher_id, instance.student_id)
+        invalidate_participants(instance.id)
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def refresh_unread_count(sender, instance, **kwargs):
+    invalidate_unread_count(instance.recipient_id)
@@ -1,3 +1,360 @@
-from django.test import TestCase
+import threading
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from account.models import Student, Teacher
+from core.events import Event
+from teacher.session.models import BookedSession
+from communication.messaging.inbox import record_messages
+from communication.messaging.models import Conversation, Message, ReadState
+from communication.messaging.receipts import advance_read_mark
+from communication.messaging.sync import decode_cursor, encode_cursor, history_page, message_cursor, messages_since
+from communication.notification import dispatch, tasks
+from communication.notification.dispatch import deliver
+from communication.notification.events import video_ready
+from communication.notification.models import Notification
+
+User = get_user_model()
+
+
+def create_user(role):
+    name = f"{role}{uuid.uuid4().hex[:8]}"
+    return User.objects.create_user(email=f"{name}@example.com", username=name, password="secret", role=role)
+
+
+# ---------------------------
+# Messages
+# ---------------------------
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        created_at, message_id = timezone.now(), uuid.uuid4()
+        self.assertEqual(decode_cursor(encode_cursor(created_at, message_id)), (created_at, message_id))
+
+    def test_malformed_cursors_raise_value_error(self):
+        naive = encode_cursor(timezone.now().replace(tzinfo=None), uuid.uuid4())
+        for cursor in ("", "not-a-cursor", "%%%", naive, encode_cursor(timezone.now(), "x")):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+
+class ConversationMixin:
+    def setUp(self):
+        self.teacher = create_user("teacher")
+        self.student = create_user("student")
+        self.conversation = Conversation.objects.create(teacher=self.teacher, student=self.student)
+
+    def send(self, count, sender=None, created_at=None):
+        """count messages, the ones sharing created_at are ordered by id"""
+        sender = sender or self.student
+        recipient = self.teacher if sender == self.student else self.student
+        start = created_at or timezone.now()
+        messages = [
+            Message(conversation=self.conversation, sender=sender, recipient=recipient, content=f"message {i}",
+                    created_at=created_at or start + timedelta(seconds=i))
+            for i in range(count)
+        ]
+        with transaction.atomic():
+            Message.objects.bulk_create(messages)
+            record_messages(messages)
+        return sorted(messages, key=lambda message: (message.created_at, message.id))
+
+
+class ConversationTestCase(ConversationMixin, TestCase):
+    pass
+
+
+class SyncTests(ConversationTestCase):
+    def test_messages_since_cursor(self):
+        messages = self.send(5)
+        result = messages_since([self.conversation.id], cursors={str(self.conversation.id): message_cursor(messages[1])})
+        received = result["messages"][str(self.conversation.id)]
+        self.assertEqual([m["id"] for m in received], [str(m.id) for m in messages[2:]])
+        self.assertEqual(result["cursors"][str(self.conversation.id)], message_cursor(messages[-1]))
+        self.assertFalse(result["has_more"])
+
+    def test_limit_and_other_users_conversations(self):
+        messages = self.send(5)
+        result = messages_since([self.conversation.id], since=message_cursor(messages[0]), limit=2)
+        self.assertEqual([m["id"] for m in result["messages"][str(self.conversation.id)]],
+                         [str(m.id) for m in messages[1:3]])
+        self.assertTrue(result["has_more"])
+
+        # Cursors of conversations the user is not part of are ignored
+        other = Conversation.objects.create(teacher=create_user("teacher"), student=self.student)
+        self.assertEqual(messages_since([other.id], since=message_cursor(messages[0]))["messages"], {})
+        self.assertEqual(
+            messages_since([other.id], cursors={str(self.conversation.id): message_cursor(messages[0])})["messages"], {}
+        )
+
+
+class HistoryTests(ConversationTestCase):
+    def test_pages_walk_the_history_newest_first(self):
+        now = timezone.now()
+        # Ties on created_at have to be split by id, not skipped or repeated
+        messages = self.send(4, created_at=now) + self.send(5, created_at=now + timedelta(minutes=1))
+        queryset = Message.objects.filter(conversation=self.conversation)
+
+        seen, before = [], None
+        while True:
+            rows, before = history_page(queryset, before, 2)
+            seen.extend(rows)
+            if before is None:
+                break
+        self.assertEqual([m.id for m in seen], [m.id for m in reversed(messages)])
+
+    def test_last_page_has_no_cursor(self):
+        messages = self.send(3)
+        queryset = Message.objects.filter(conversation=self.conversation)
+        rows, before = history_page(queryset, None, 3)
+        self.assertEqual(len(rows), 3)
+        self.assertIsNone(before)
+        self.assertEqual(history_page(queryset, message_cursor(messages[0]), 3), ([], None))
+
+
+class ReadMarkTests(ConversationTestCase):
+    def unread(self):
+        self.conversation.refresh_from_db()
+        return self.conversation.unread_for(self.teacher.id)
+
+    def test_mark_moves_forward_only(self):
+        messages = self.send(4)
+        self.assertEqual(self.unread(), 4)
+
+        receipt = advance_read_mark(self.conversation.id, self.teacher.id, message_cursor(messages[1]))
+        self.assertEqual(receipt["last_read_message_id"], str(messages[1].id))
+        self.assertEqual(self.unread(), 2)
+
+        self.assertIsNone(advance_read_mark(self.conversation.id, self.teacher.id, message_cursor(messages[0])))
+        self.assertEqual(ReadState.objects.get(user=self.teacher).last_read_message_id, messages[1].id)
+
+        receipt = advance_read_mark(self.conversation.id, self.teacher.id)
+        self.assertEqual(receipt["last_read_message_id"], str(messages[-1].id))
+        self.assertEqual(self.unread(), 0)
+
+    def test_cursor_past_the_last_message_is_clamped(self):
+        messages = self.send(2)
+        future = encode_cursor(timezone.now() + timedelta(days=1), uuid.uuid4())
+        receipt = advance_read_mark(self.conversation.id, self.teacher.id, future)
+        self.assertEqual(receipt["last_read_message_id"], str(messages[-1].id))
+
+        # The next message is not covered by the mark
+        self.send(1)
+        self.assertEqual(self.unread(), 1)
+
+    def test_outsiders_and_empty_conversations(self):
+        self.assertIsNone(advance_read_mark(self.conversation.id, self.teacher.id))
+        self.send(1)
+        self.assertIsNone(advance_read_mark(self.conversation.id, create_user("student").id))
+        with self.assertRaises(ValueError):
+            advance_read_mark(self.conversation.id, self.teacher.id, "not-a-cursor")
+
+
+class ConcurrentReadMarkTests(ConversationMixin, TransactionTestCase):
+    def test_messages_arriving_while_marking_stay_unread(self):
+        messages = self.send(2)
+        inserted, release = threading.Event(), threading.Event()
+
+        def writer():
+            try:
+                # A write-behind batch holding the conversation row
+                with transaction.atomic():
+                    self.send(1, created_at=timezone.now() + timedelta(minutes=1))
+                    inserted.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        def reader():
+            try:
+                advance_read_mark(self.conversation.id, self.teacher.id, message_cursor(messages[-1]))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+        threads[0].start()
+        self.assertTrue(inserted.wait(10))
+        threads[1].start()
+        # Long enough for the reader to queue up behind the writer's lock
+        time.sleep(0.5)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.unread_for(self.teacher.id), 1)
+
+
+# ---------------------------
+# Notifications
+# ---------------------------
+class DeliverTests(TestCase):
+    def test_redelivered_event_notifies_nobody_twice(self):
+        users = [create_user("student") for _ in range(3)]
+        event_id = uuid.uuid4()
+
+        with mock.patch.object(dispatch, "emit_notifications"):
+            self.assertEqual(len(deliver([u.id for u in users[:2]], header="Hi", event_id=event_id)), 2)
+            self.assertEqual(len(deliver([u.id for u in users], header="Hi", event_id=event_id)), 1)
+        self.assertEqual(Notification.objects.filter(event_id=event_id).count(), 3)
+
+
+class NotifyTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(dispatch, "emit_notifications")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_recipients_are_queued_in_chunks_after_commit(self):
+        users = [create_user("student") for _ in range(5)]
+        with mock.patch.object(dispatch, "NOTIFY_CHUNK_SIZE", 2), \
+                mock.patch.object(tasks.deliver_notifications, "delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with transaction.atomic():
+                    dispatch.notify(User.objects.filter(id__in=[u.id for u in users]), header="Hi")
+                    delay.assert_not_called()
+        self.assertEqual(len(callbacks), 3)
+        self.assertEqual(sorted(len(call.args[0]) for call in delay.call_args_list), [1, 2, 2])
+
+    def test_audience_chunks_with_an_event_id_are_stored_once(self):
+        students = [create_user("student") for _ in range(3)]
+        Student.objects.filter(user__in=students).update(account_type="pro")
+        event_id = str(uuid.uuid4())
+        content = {"header": "New video available", "detail": "Dribbling", "onclick_location": "/student/video-library"}
+
+        with mock.patch.object(dispatch, "NOTIFY_CHUNK_SIZE", 2), \
+                mock.patch.object(tasks.deliver_notifications, "delay", side_effect=tasks.deliver_notifications):
+            self.assertEqual(tasks.notify_audience("pro_students", {}, content, event_id), 3)
+            # A retried audience task queues its chunks again
+            tasks.notify_audience("pro_students", {}, content, event_id)
+
+        self.assertEqual(
+            set(Notification.objects.filter(event_id=event_id).values_list("recipient_id", flat=True)),
+            {student.id for student in students},
+        )
+
+    def test_video_ready_is_fanned_out_by_celery(self):
+        event = Event("1-1", str(uuid.uuid4()), "video.ready", {"video_id": 1, "title": "Dribbling",
+                                                                "consumer": "teacher"}, "", 1)
+        # Consumers run outside of a transaction, where on_commit runs right away
+        with mock.patch.object(tasks.notify_audience, "delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                video_ready(event)
+        delay.assert_called_once_with("teachers", {}, mock.ANY, event.id)
+
+        # The event is retried when the task cannot be queued
+        with mock.patch.object(tasks.notify_audience, "delay", side_effect=ConnectionError("broker down")):
+            with self.assertRaises(ConnectionError), self.captureOnCommitCallbacks(execute=True):
+                video_ready(event)
+
+
+# ---------------------------
+# Session reminders
+# ---------------------------
+class ReminderSweepTests(TransactionTestCase):
+    def setUp(self):
+        self.teacher = create_user("teacher")
+        self.student = create_user("student")
+
+    def book(self, starts_in, **fields):
+        return BookedSession.objects.create(
+            teacher=Teacher.objects.get(user=self.teacher), student=self.student,
+            session_time=timezone.now() + starts_in, channel_name="channel", **{"is_paid": True, **fields}
+        )
+
+    def sweep(self):
+        with mock.patch.object(tasks, "group") as group:
+            claimed = tasks._claim_and_dispatch_reminders()
+        return claimed, [sig for call in group.call_args_list for sig in call.args[0]]
+
+    def test_due_sessions_are_claimed_once(self):
+        due = self.book(timedelta(minutes=5))
+        self.book(timedelta(hours=2))
+        self.book(timedelta(minutes=10), is_paid=False)
+
+        claimed, signatures = self.sweep()
+        self.assertEqual(claimed, 1)
+        self.assertEqual(
+            sorted(sig.task.rsplit(".", 1)[1] for sig in signatures),
+            ["deliver_notification_rows", "send_session_reminder_to_student", "send_session_reminder_to_teacher"],
+        )
+        self.assertEqual({sig.kwargs.get("minutes_left") for sig in signatures}, {5, None})
+
+        due.refresh_from_db()
+        self.assertTrue(due.reminder_sent and due.notification_reminder_sent)
+        self.assertEqual(self.sweep(), (0, []))
+
+    def test_reminders_are_queued_after_the_claim_commits(self):
+        self.book(timedelta(minutes=5))
+        with mock.patch.object(tasks, "group") as group:
+            with transaction.atomic():
+                self.assertEqual(tasks._claim_and_dispatch_reminders(), 1)
+                group.assert_not_called()
+            group.assert_called_once()
+
+    def test_sessions_locked_by_another_sweep_are_skipped(self):
+        session = self.book(timedelta(minutes=5))
+        locked, release = threading.Event(), threading.Event()
+
+        def other_sweep():
+            try:
+                with transaction.atomic():
+                    BookedSession.objects.select_for_update().get(id=session.id)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_sweep)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            # Does not wait for the lock, the session is left to its holder
+            self.assertEqual(self.sweep(), (0, []))
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(self.sweep()[0], 1)
+
+    def test_broker_failure_releases_the_claim(self):
+        emailed = self.book(timedelta(minutes=5), reminder_sent=True)
+        other = self.book(timedelta(minutes=6))
+        with mock.patch.object(tasks, "group") as group:
+            group.return_value.apply_async.side_effect = ConnectionError("broker down")
+            tasks._claim_and_dispatch_reminders()
+
+        # Only what this sweep claimed is released
+        emailed.refresh_from_db()
+        self.assertTrue(emailed.reminder_sent)
+        self.assertFalse(emailed.notification_reminder_sent)
+        other.refresh_from_db()
+        self.assertFalse(other.reminder_sent or other.notification_reminder_sent)
+        self.assertEqual(self.sweep()[0], 2)
+
+    def test_in_app_reminders_are_stored_once(self):
+        session = self.book(timedelta(minutes=5))
+        _, signatures = self.sweep()
+        rows, = [sig.args[0] for sig in signatures if sig.task.endswith("deliver_notification_rows")]
+
+        with mock.patch("communication.notification.dispatch.emit_notifications"):
+            self.assertEqual(tasks.deliver_notification_rows(rows), 2)
+            # Queued again after a failure halfway through a group
+            self.assertEqual(tasks.deliver_notification_rows(rows), 0)
+        self.assertEqual(Notification.objects.filter(event_id=tasks.reminder_event_id(session.id)).count(), 2)
+
+    def test_started_sessions_leave_the_index(self):
+        missed = self.book(-timedelta(minutes=10))
+        upcoming = self.book(timedelta(hours=2))
+        with mock.patch.object(tasks, "group"):
+            tasks.sweep_session_reminders()
+
+        missed.refresh_from_db()
+        self.assertTrue(missed.reminder_sent and missed.notification_reminder_sent)
+        upcoming.refresh_from_db()
+        self.assertFalse(upcoming.reminder_sent or upcoming.notification_reminder_sent)
@@ -8,12 +8,13 @@ from account.models import (
 )
 from django.utils import timezone
 from django.contrib.auth import get_user_model, password_validation
-from django.core.paginator import Paginator
 
 from datetime import timedelta
 from teacher.session.models import BookedSession
 from teacher.dashboard.models import Bank, PayPal
 from communication.messaging.models import Conversation, Message
+from communication.messaging.receipts import is_read, read_marks
+from communication.messaging.sync import history_page, page_size_param
 from .models import Sport, Withdraw, AdminVideo
     
 User = get_user_model()
@@ -229,6 +230,7 @@ class MessageSerializer(serializers.ModelSerializer):
     sender_username = serializers.CharField(source="sender.username", read_only=True)
     recipient_name = serializers.CharField(source="recipient.full_name", read_only=True)
     recipient_username = serializers.CharField(source="recipient.username", read_only=True)
+    read = serializers.SerializerMethodField()
 
     class Meta:
         model = Message
@@ -244,6 +246,11 @@ class MessageSerializer(serializers.ModelSerializer):
             "read",
         ]
 
+    def get_read(self, obj):
+        # Read marks of the conversation, loaded once by the parent serializer
+        marks = self.context.get("read_marks")
+        return obj.read if marks is None else is_read(obj, marks)
+
 
 class ChatlogDetailSerializer(serializers.ModelSerializer):
     teacher_name = serializers.CharField(source="teacher.full_name", read_only=True)
@@ -272,32 +279,28 @@ class ChatlogDetailSerializer(serializers.ModelSerializer):
 
     def get_messages(self, obj):
         request = self.context.get("request")
-        page_number = int(request.query_params.get("page", 1))
-        page_size = int(request.query_params.get("page_size", 30))  # default = 30
+        page_size = page_size_param(request.query_params.get("page_size"))
+        before = request.query_params.get("before")
 
-        queryset = obj.messages.all()
-        paginator = Paginator(queryset, page_size)
-        page = paginator.get_page(page_number)
+        queryset = obj.messages.select_related("sender", "recipient")
+        try:
+            page, next_cursor = history_page(queryset, before, page_size)
+        except ValueError:
+            raise serializers.ValidationError({"before": "Invalid cursor"})
 
-        serializer = MessageSerializer(page, many=True, context=self.context)
+        context = {**self.context, "read_marks": read_marks([obj.id])}
+        serializer = MessageSerializer(page, many=True, context=context)
 
-        # Build next/previous URLs
+        # Keyset links: "next" goes to older messages
         base_url = request.build_absolute_uri(request.path)
         next_url = None
-        prev_url = None
 
-        if page.has_next():
-            next_url = f"{base_url}?page={page.next_page_number()}&page_size={page_size}"
-        if page.has_previous():
-            prev_url = f"{base_url}?page={page.previous_page_number()}&page_size={page_size}"
+        if next_cursor:
+            next_url = f"{base_url}?before={next_cursor}&page_size={page_size}"
 
         return {
-            "count": paginator.count,
-            "total_pages": paginator.num_pages,
-            "current_page": page.number,
             "page_size": page_size,
             "next": next_url,
-            "previous": prev_url,
             "results": serializer.data,
         }
 
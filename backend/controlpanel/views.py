@@ -37,6 +37,7 @@ from account.models import Teacher, Student, Document
 from teacher.session.models import BookedSession, TRAINING_TYPE
 from teacher.dashboard.models import IncomeHistory
 from communication.messaging.models import Conversation, Message
+from core.events import publish
 from .models import Sport, Withdraw, AdminIncome, AdminVideo
 
 import calendar
@@ -486,6 +487,7 @@ class CloudinaryWebhookView(APIView):
 
         try:
             video = AdminVideo.objects.get(id=video_id)
+            newly_ready = video.status != "ready"
             video.public_id = public_id
             video.format = format_
             video.duration = duration
@@ -497,6 +499,10 @@ class CloudinaryWebhookView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        # Webhooks can be redelivered, only announce a video once
+        if newly_ready:
+            publish("video.ready", {"video_id": video.id, "title": video.title, "consumer": video.consumer})
+
         return Response({"success": True}, status=status.HTTP_200_OK)
 
     
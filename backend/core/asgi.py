@@ -10,8 +10,17 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 django.setup()
 
 # Import after django.setup()
-from communication.messaging.socket import sio  
+from communication.messaging.socket import read_receipts, sio
+from communication.messaging.writer import message_writer
 
 django_asgi_app = get_asgi_application()
-application = socketio.ASGIApp(sio, django_asgi_app)
+
+
+async def on_shutdown():
+    # Flush queued chat messages and read receipts before the worker exits
+    await message_writer.close()
+    await read_receipts.close()
+
+
+application = socketio.ASGIApp(sio, django_asgi_app, on_shutdown=on_shutdown)
 
@@ -0,0 +1,241 @@
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from account.models import Student, Teacher
+from .cache import shared_cache as cache
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+# Claim with the time the profile claims were read, copied from the
+# refresh token into every access token it issues
+CLAIMS_AT = "claims_at"
+
+CLAIMS_CHANGED_KEY = "auth_claims_changed_{}"
+
+
+def mark_claims_stale(user_id):
+    """Tokens with claims read before now fall back to the database
+
+    Called whenever a user, teacher or student row is saved. Kept as long
+    as a refresh token lives, the longest a claim can be carried over.
+    """
+    timeout = int(settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"].total_seconds())
+    try:
+        cache.set(CLAIMS_CHANGED_KEY.format(user_id), time.time(), timeout)
+    except Exception as e:
+        # Readers fail closed while the cache is down, a stamp lost to a
+        # transient error is not noticed though
+        logger.error(f"Claims change stamp failed for {user_id}: {e}")
+    # Other workers see the stamp once their own copies expire
+    _local.drop(f"user:{user_id}", f"changed:{user_id}")
+
+
+def token_claims(user) -> dict:
+    """Profile claims added to the tokens of user, see ClaimsJWTAuthentication"""
+    claims = {
+        CLAIMS_AT: time.time(),
+        "is_staff": user.is_staff,
+        "is_active": user.is_active,
+        "teacher_id": None,
+        "student_id": None,
+        "account_type": None,
+    }
+    teacher = Teacher.objects.filter(user=user).values("id", "account_type").first()
+    if teacher:
+        claims["teacher_id"] = str(teacher["id"])
+        claims["account_type"] = teacher["account_type"]
+    student = Student.objects.filter(user=user).values("id", "account_type").first()
+    if student:
+        claims["student_id"] = str(student["id"])
+        claims["account_type"] = student["account_type"]
+    return claims
+
+
+# ---------------------------
+# Per-process cache
+# ---------------------------
+class _LocalCache:
+    """Small LRU of values per user id that expire after ttl seconds"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, ttl: float):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] + ttl < time.monotonic():
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def drop(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._items.pop(key, None)
+
+
+_local = _LocalCache(size=10_000)
+
+
+def _ttl() -> float:
+    return settings.AUTH_USER_CACHE_TTL
+
+
+def _claims_changed_at(user_id: str) -> Optional[float]:
+    """When the user's profile last changed, 0 if not recently; cached in-process
+
+    None when the cache cannot be read, claims are then not trusted.
+    """
+    key = f"changed:{user_id}"
+    changed = _local.get(key, _ttl())
+    if changed is None:
+        try:
+            changed = cache.get(CLAIMS_CHANGED_KEY.format(user_id)) or 0
+        except Exception as e:
+            logger.warning(f"Claims change stamp read failed for {user_id}: {e}")
+            return None
+        _local.set(key, changed)
+    return changed
+
+
+# ---------------------------
+# Users
+# ---------------------------
+def _build(model, values: dict):
+    """Model instance from a subset of its columns, the others deferred"""
+    # Claims are JSON, ids arrive as strings
+    values = {name: model._meta.get_field(name).to_python(value) for name, value in values.items()}
+    return model.from_db("default", list(values), list(values.values()))
+
+
+def _assemble(user_values: dict, teacher_values: Optional[dict], student_values: Optional[dict]):
+    user = _build(User, user_values)
+    for name, model, values in (("teacher", Teacher, teacher_values), ("student", Student, student_values)):
+        # Cached reverse one-to-one: user.teacher and hasattr(user, "teacher")
+        # answer without a query, None meaning "no such profile"
+        profile = _build(model, values) if values else None
+        User._meta.get_field(name).set_cached_value(user, profile)
+        if profile is not None:
+            model._meta.get_field("user").set_cached_value(profile, user)
+    return user
+
+
+def user_from_claims(token):
+    """UserAccount built from token claims, no query
+
+    Columns that are not claims (password, profile_pic, ...) are deferred
+    and cost a query on first use. Views reading most of a profile load it
+    themselves with select_related.
+    """
+    user_id = str(token[api_settings.USER_ID_CLAIM])
+    user_values = {
+        "id": user_id,
+        "email": token.get("email", ""),
+        "username": token.get("username", ""),
+        "full_name": token.get("full_name", ""),
+        "role": token.get("role", ""),
+        "is_staff": token.get("is_staff", False),
+        "is_active": token.get("is_active", False),
+    }
+    teacher_values = student_values = None
+    if token.get("teacher_id"):
+        teacher_values = {
+            "id": token["teacher_id"],
+            "user_id": user_id,
+            "account_type": token.get("account_type"),
+            "status": token.get("verification_status"),
+            "can_access_schedule": token.get("can_access_schedule", False),
+        }
+    if token.get("student_id"):
+        student_values = {
+            "id": token["student_id"],
+            "user_id": user_id,
+            "account_type": token.get("account_type"),
+        }
+    return _assemble(user_values, teacher_values, student_values)
+
+
+def load_user(user_id):
+    """UserAccount with its teacher/student profile, from a short-lived per-process cache
+
+    Row values are cached rather than instances, every request gets its own
+    objects. None when the user does not exist.
+    """
+    user_id = str(user_id)
+    key = f"user:{user_id}"
+    cached = _local.get(key, _ttl())
+    if cached is None:
+        user = User.objects.filter(id=user_id).select_related("teacher", "student").first()
+        if user is None:
+            return None
+        profiles = []
+        for name in ("teacher", "student"):
+            profile = getattr(user, name, None)
+            profiles.append(
+                {field.attname: getattr(profile, field.attname) for field in profile._meta.concrete_fields}
+                if profile is not None else None
+            )
+        cached = (
+            {field.attname: getattr(user, field.attname) for field in User._meta.concrete_fields},
+            *profiles,
+        )
+        _local.set(key, cached)
+    return _assemble(*cached)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the per-request user query.
+
+    request.user is built from the token's claims: id, email, username,
+    full_name, role, is_staff, and the teacher/student profile (id,
+    account_type, verification status). It is a real UserAccount, so it
+    works in ORM filters and assignments, with the remaining columns
+    loaded on first use.
+
+    Tokens issued before the claims existed, tokens whose claims are
+    older than the user's last profile change, and every token while the
+    change stamps cannot be read, use the database row from a per-process
+    cache (AUTH_USER_CACHE_TTL seconds) instead.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = None
+        claims_at = validated_token.get(CLAIMS_AT)
+        if claims_at is not None and "is_active" in validated_token:
+            changed_at = _claims_changed_at(user_id)
+            if changed_at is not None and claims_at >= changed_at:
+                user = user_from_claims(validated_token)
+
+        if user is None:
+            user = load_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
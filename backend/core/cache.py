@@ -0,0 +1,13 @@
+"""Cache aliases besides the per-process default
+
+The default cache stays local to each process. State that every worker
+has to agree on (invalidations, stamps, snapshots) goes to the "shared"
+alias, a Redis cache.
+"""
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+SHARED_CACHE_ALIAS = "shared"
+
+# Resolves the alias per thread on each use, like django.core.cache.cache
+shared_cache = ConnectionProxy(caches, SHARED_CACHE_ALIAS)
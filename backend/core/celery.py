@@ -11,15 +11,17 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 
 # Auto-discover tasks.py in all apps
 app.autodiscover_tasks()
+# ...and in packages of apps that are not apps themselves
+app.autodiscover_tasks(["communication.notification"])
 
 # Celery Beat schedule
 app.conf.beat_schedule = {
-    'check-session-reminders-every-minute': {
-        'task': 'authentication.tasks.check_and_send_session_reminders',
+    'sweep-session-reminders-every-minute': {
+        'task': 'communication.notification.tasks.sweep_session_reminders',
         'schedule': 60.0,  # Run every 60 seconds (1 minute)
     },
-    'check-session-reminder-notification-every-minute': {
-        'task': 'communication.notification.tasks.check-session-reminder-notification-every-minute',
+    'relay-outbox-events-every-minute': {
+        'task': 'core.tasks.relay_outbox_events',
         'schedule': 60.0,
     },
     'remove-invalid-teacher-subscriptions-every-2-minutes': {
@@ -0,0 +1,346 @@
+import json
+import logging
+import os
+import socket as _socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# (stream id, fields, times delivered including this one)
+Entry = Tuple[str, Dict[str, str], int]
+
+
+class Event(NamedTuple):
+    """A domain event as handed to a consumer"""
+    stream_id: str
+    # Set on publish and kept across redeliveries, the idempotency key
+    id: str
+    type: str
+    payload: dict
+    occurred_at: str
+    deliveries: int
+
+
+# ---------------------------
+# Backends
+# ---------------------------
+class RedisStreamBus:
+    """
+    One Redis stream of events, read by consumer groups.
+
+    Every group sees every event once; within a group each event goes to
+    one consumer and stays pending until acked, so an event whose consumer
+    died is claimed by another one after EVENT_BUS_CLAIM_IDLE seconds.
+    """
+
+    def __init__(self, url: str, stream: str, maxlen: int):
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.stream = stream
+        self.maxlen = maxlen
+        self._groups = set()
+
+    def add(self, fields: Dict[str, str]) -> str:
+        return self.client.xadd(self.stream, fields, maxlen=self.maxlen, approximate=True)
+
+    def ensure_group(self, group: str):
+        import redis
+
+        if group in self._groups:
+            return
+        try:
+            # From the start of the stream, events published before the
+            # group's first consumer are not skipped
+            self.client.xgroup_create(self.stream, group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups.add(group)
+
+    def read(self, group: str, consumer: str, count: int, block_ms: int) -> List[Entry]:
+        response = self.client.xreadgroup(group, consumer, {self.stream: ">"}, count=count, block=block_ms or None)
+        entries = response[0][1] if response else []
+        return [(stream_id, fields, 1) for stream_id, fields in entries]
+
+    def claim(self, group: str, consumer: str, min_idle_ms: int, count: int) -> List[Entry]:
+        pending = self.client.xpending_range(self.stream, group, min="-", max="+", count=count, idle=min_idle_ms)
+        if not pending:
+            return []
+        deliveries = {entry["message_id"]: entry["times_delivered"] + 1 for entry in pending}
+        claimed = self.client.xclaim(self.stream, group, consumer, min_idle_ms, list(deliveries))
+        # Entries trimmed from the stream come back empty
+        gone = [stream_id for stream_id, fields in claimed if not fields]
+        if gone:
+            self.ack(group, gone)
+        return [(stream_id, fields, deliveries[stream_id]) for stream_id, fields in claimed if fields]
+
+    def ack(self, group: str, stream_ids: List[str]):
+        self.client.xack(self.stream, group, *stream_ids)
+
+    def dead_letter(self, fields: Dict[str, str]):
+        self.client.xadd(f"{self.stream}:dead", fields, maxlen=self.maxlen, approximate=True)
+
+
+class MemoryEventBus:
+    """
+    In-process stand-in for RedisStreamBus with the same group, pending
+    and claim rules, for tests and local runs without Redis. Producers and
+    consumers have to share the process.
+    """
+
+    def __init__(self, maxlen: int):
+        self.maxlen = maxlen
+        # seq -> (stream id, fields)
+        self.entries: "OrderedDict[int, Tuple[str, Dict[str, str]]]" = OrderedDict()
+        # group -> {"last": seq, "pending": {seq: [consumer, delivered at, deliveries]}}
+        self.groups: Dict[str, dict] = {}
+        self.dead: List[Dict[str, str]] = []
+        self._seq = 0
+        self._changed = threading.Condition()
+
+    @staticmethod
+    def _seq_of(stream_id: str) -> int:
+        return int(stream_id.rsplit("-", 1)[1])
+
+    def add(self, fields: Dict[str, str]) -> str:
+        with self._changed:
+            self._seq += 1
+            stream_id = f"{int(time.time() * 1000)}-{self._seq}"
+            self.entries[self._seq] = (stream_id, dict(fields))
+            while len(self.entries) > self.maxlen:
+                self.entries.popitem(last=False)
+            self._changed.notify_all()
+            return stream_id
+
+    def ensure_group(self, group: str):
+        with self._changed:
+            self.groups.setdefault(group, {"last": 0, "pending": OrderedDict()})
+
+    def read(self, group: str, consumer: str, count: int, block_ms: int) -> List[Entry]:
+        with self._changed:
+            state = self.groups[group]
+            deadline = time.monotonic() + block_ms / 1000
+            while True:
+                fresh = [seq for seq in self.entries if seq > state["last"]][:count]
+                if fresh or time.monotonic() >= deadline:
+                    break
+                self._changed.wait(deadline - time.monotonic())
+            now = time.monotonic()
+            for seq in fresh:
+                state["pending"][seq] = [consumer, now, 1]
+            if fresh:
+                state["last"] = fresh[-1]
+            return [(*self.entries[seq], 1) for seq in fresh]
+
+    def claim(self, group: str, consumer: str, min_idle_ms: int, count: int) -> List[Entry]:
+        with self._changed:
+            pending = self.groups[group]["pending"]
+            now = time.monotonic()
+            claimed = []
+            for seq, entry in list(pending.items()):
+                if len(claimed) == count:
+                    break
+                if now - entry[1] < min_idle_ms / 1000:
+                    continue
+                if seq not in self.entries:
+                    del pending[seq]
+                    continue
+                entry[0], entry[1], entry[2] = consumer, now, entry[2] + 1
+                claimed.append((*self.entries[seq], entry[2]))
+            return claimed
+
+    def ack(self, group: str, stream_ids: List[str]):
+        with self._changed:
+            for stream_id in stream_ids:
+                self.groups[group]["pending"].pop(self._seq_of(stream_id), None)
+
+    def dead_letter(self, fields: Dict[str, str]):
+        with self._changed:
+            self.dead.append(dict(fields))
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    """The process wide bus, Redis unless EVENT_BUS_URL is memory://"""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            url = settings.EVENT_BUS_URL
+            if url.startswith("memory://"):
+                _bus = MemoryEventBus(settings.EVENT_BUS_MAXLEN)
+            else:
+                _bus = RedisStreamBus(url, settings.EVENT_BUS_STREAM, settings.EVENT_BUS_MAXLEN)
+        return _bus
+
+
+# ---------------------------
+# Publishing
+# ---------------------------
+# Outbox events added to the bus per relay transaction
+OUTBOX_RELAY_BATCH = 500
+
+
+def publish(event_type: str, payload: dict):
+    """
+    Publish a domain event with the current transaction. payload has to
+    be JSON serializable (dates, decimals and UUIDs are encoded by
+    DjangoJSONEncoder).
+
+    The event is written to the outbox table in the caller's transaction,
+    so it exists exactly when the transaction commits. It is added to the
+    bus right after the commit; when the bus cannot be reached it stays in
+    the outbox for relay_outbox, run every minute by Celery beat. The
+    caller's request never fails because of the bus.
+    """
+    from .models import OutboxEvent
+
+    event = OutboxEvent.objects.create(type=event_type, payload=json.dumps(payload, cls=DjangoJSONEncoder))
+    transaction.on_commit(lambda: _relay_after_commit(event.id))
+
+
+def _relay_after_commit(event_id):
+    try:
+        relay_outbox(ids=[event_id])
+    except Exception as e:
+        logger.warning(f"Publishing event {event_id} failed, left in the outbox for the relay: {e}")
+
+
+def relay_outbox(ids: Optional[List] = None, batch: int = OUTBOX_RELAY_BATCH) -> int:
+    """
+    Add outbox events to the bus, oldest first, and delete them; returns
+    the number relayed. Rows are taken with SKIP LOCKED, concurrent relays
+    never add the same event. Raises the bus error once the events added
+    before it are deleted, the rest is tried again by the next relay.
+
+    An event whose delete is lost (a crash right after the add) is added
+    again, consumers dedupe it by its id.
+    """
+    from .models import OutboxEvent
+
+    bus = get_bus()
+    relayed = 0
+    while True:
+        error = None
+        with transaction.atomic():
+            events = OutboxEvent.objects.select_for_update(skip_locked=True).order_by("occurred_at", "id")
+            if ids is not None:
+                events = events.filter(id__in=ids)
+            events = list(events[:batch])
+            added = []
+            for event in events:
+                try:
+                    bus.add(event.fields())
+                except Exception as e:
+                    error = e
+                    break
+                added.append(event.id)
+            OutboxEvent.objects.filter(id__in=added).delete()
+        relayed += len(added)
+        if error is not None:
+            raise error
+        if len(events) < batch:
+            return relayed
+
+
+# ---------------------------
+# Consuming
+# ---------------------------
+class Consumer:
+    """
+    One member of a consumer group, run by as many processes as needed.
+
+    handlers maps event types to callables taking an Event; other types
+    are acked and skipped. An event is acked once its handler returns. A
+    handler that raises leaves it pending, it is retried by whichever
+    consumer claims it after EVENT_BUS_CLAIM_IDLE seconds, and moved to
+    the <stream>:dead stream after EVENT_BUS_MAX_DELIVERIES attempts.
+    Delivery is at least once, handlers have to be idempotent per Event.id.
+    """
+
+    def __init__(self, group: str, handlers: Dict[str, Callable[[Event], None]], name: Optional[str] = None,
+                 bus=None, batch: int = 50, block_ms: int = 5000):
+        self.group = group
+        self.handlers = handlers
+        self.name = name or f"{_socket.gethostname()}-{os.getpid()}"
+        self.bus = bus or get_bus()
+        self.batch = batch
+        self.block_ms = block_ms
+        self.claim_idle_ms = int(settings.EVENT_BUS_CLAIM_IDLE * 1000)
+        self.max_deliveries = settings.EVENT_BUS_MAX_DELIVERIES
+        self._next_claim = 0.0
+        self.bus.ensure_group(group)
+
+    def run(self, stop: Optional[threading.Event] = None):
+        stop = stop or threading.Event()
+        logger.info(f"Consumer {self.name} of {self.group} started")
+        while not stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Consumer {self.name} of {self.group} failed to poll: {e}", exc_info=True)
+                stop.wait(1)
+        logger.info(f"Consumer {self.name} of {self.group} stopped")
+
+    def poll(self, block_ms: Optional[int] = None) -> int:
+        """Handle one batch, stale pending events first; returns the events handled"""
+        entries = []
+        if time.monotonic() >= self._next_claim:
+            # Looking for abandoned events costs a round trip, once per idle period is enough
+            entries = self.bus.claim(self.group, self.name, self.claim_idle_ms, self.batch)
+            if len(entries) < self.batch:
+                self._next_claim = time.monotonic() + self.claim_idle_ms / 1000
+        if not entries:
+            entries = self.bus.read(self.group, self.name, self.batch, self.block_ms if block_ms is None else block_ms)
+
+        close_old_connections()
+        try:
+            return sum(self.handle(*entry) for entry in entries)
+        finally:
+            close_old_connections()
+
+    def handle(self, stream_id: str, fields: Dict[str, str], deliveries: int) -> bool:
+        try:
+            event = Event(
+                stream_id=stream_id,
+                id=fields.get("id") or stream_id,
+                type=fields["type"],
+                payload=json.loads(fields.get("payload") or "{}"),
+                occurred_at=fields.get("occurred_at", ""),
+                deliveries=deliveries,
+            )
+        except (KeyError, ValueError) as e:
+            self._dead_letter(stream_id, fields, f"Malformed event: {e}")
+            return False
+
+        handler = self.handlers.get(event.type)
+        if handler is not None:
+            try:
+                handler(event)
+            except Exception as e:
+                if deliveries >= self.max_deliveries:
+                    self._dead_letter(stream_id, fields, str(e))
+                else:
+                    logger.warning(
+                        f"{event.type} event {event.id} failed in {self.group} "
+                        f"(attempt {deliveries}/{self.max_deliveries}): {e}",
+                        exc_info=True
+                    )
+                return False
+        self.bus.ack(self.group, [stream_id])
+        return handler is not None
+
+    def _dead_letter(self, stream_id: str, fields: Dict[str, str], error: str):
+        logger.error(f"Event {stream_id} given up by {self.group}: {error}")
+        self.bus.dead_letter({**fields, "stream_id": stream_id, "group": self.group, "error": error})
+        self.bus.ack(self.group, [stream_id])
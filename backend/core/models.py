@@ -0,0 +1,36 @@
+import uuid
+
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxEvent(models.Model):
+    """A domain event stored with the transaction that published it
+
+    Added to the event bus and deleted once that transaction commits, or
+    by the relay when the bus could not be reached, see core.events.
+    """
+    # The event's id, kept on the bus as its idempotency key
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    type = models.CharField(max_length=100)
+    # JSON encoded with DjangoJSONEncoder
+    payload = models.TextField()
+    occurred_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # The relay publishes oldest first
+            models.Index(fields=["occurred_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.id}"
+
+    def fields(self) -> dict:
+        """The event as the fields of a stream entry"""
+        return {
+            "id": str(self.id),
+            "type": self.type,
+            "occurred_at": self.occurred_at.isoformat(),
+            "payload": self.payload,
+        }
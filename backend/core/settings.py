@@ -68,6 +68,7 @@ INSTALLED_APPS = [
 
 # in build apps
 INSTALLED_APPS += [
+    'core',
     'account',
     'authentication',
     'communication',
@@ -130,6 +131,82 @@ CHANNEL_LAYERS = {
 
 REDIS_URL = "redis://127.0.0.1:6379/0"
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Rendered nearest-teacher results and the teacher index generation,
+    # see map.engine
+    "map": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env('MAP_CACHE_URL', default=REDIS_URL),
+        "KEY_PREFIX": "map",
+    },
+    # State every worker has to agree on, see core.cache
+    "shared": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env('SHARED_CACHE_URL', default=REDIS_URL),
+        "KEY_PREFIX": "shared",
+    },
+}
+
+# Socket.IO client manager: "redis" relays emits between every ASGI worker,
+# "memory" keeps them in one process (tests), "local" is the plain manager
+SOCKETIO_MANAGER = env('SOCKETIO_MANAGER', default='redis')
+SOCKETIO_REDIS_URL = env('SOCKETIO_REDIS_URL', default=REDIS_URL)
+SOCKETIO_CHANNEL = 'sportverse-socketio'
+
+# Domain event bus (core.events): a Redis stream, or memory:// for an
+# in-process stand-in in tests
+EVENT_BUS_URL = env('EVENT_BUS_URL', default=REDIS_URL)
+EVENT_BUS_STREAM = env('EVENT_BUS_STREAM', default='sportverse-events')
+# Approximate number of events kept in the stream
+EVENT_BUS_MAXLEN = env.int('EVENT_BUS_MAXLEN', default=100_000)
+# Seconds before an unacked event is taken over by another consumer
+EVENT_BUS_CLAIM_IDLE = env.float('EVENT_BUS_CLAIM_IDLE', default=300.0)
+# Attempts before an event is moved to the <stream>:dead stream
+EVENT_BUS_MAX_DELIVERIES = env.int('EVENT_BUS_MAX_DELIVERIES', default=5)
+
+# Threads (and database connections) per worker running socket handler queries
+SOCKET_DB_POOL_SIZE = env.int('SOCKET_DB_POOL_SIZE', default=8)
+
+# Seconds between stored/broadcast read receipts of one reader in one conversation
+READ_RECEIPT_INTERVAL = env.float('READ_RECEIPT_INTERVAL', default=1.0)
+
+# Socket metrics: every worker stores a snapshot in the cache each interval
+# (seconds, 0 disables), GET /metrics renders them all for Prometheus.
+# Scrapers send "Authorization: Bearer <METRICS_TOKEN>", without a token
+# only staff users can read the endpoint.
+SOCKET_METRICS_SNAPSHOT_INTERVAL = env.int('SOCKET_METRICS_SNAPSHOT_INTERVAL', default=15)
+SOCKET_METRICS_SNAPSHOT_TTL = env.int('SOCKET_METRICS_SNAPSHOT_TTL', default=60)
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+
+# Share of per-event socket log lines kept at INFO (DEBUG keeps them all)
+SOCKET_LOG_SAMPLE_RATE = env.float('SOCKET_LOG_SAMPLE_RATE', default=0.01)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'verbose': {'format': '{asctime} {levelname} {name} {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'verbose'},
+    },
+    'loggers': {
+        'communication': {
+            'handlers': ['console'],
+            'level': env('SOCKET_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Map engine: load the gazetteer and numba kernels when a web worker starts
+# (set MAP_WARM_UP=true for gunicorn/uvicorn only, Celery does not need it)
+MAP_WARM_UP = env.bool('MAP_WARM_UP', default=False)
+MAP_NUMBA_CACHE_DIR = env('MAP_NUMBA_CACHE_DIR', default=str(BASE_DIR / 'map' / 'numba_cache'))
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -210,7 +287,7 @@ CELERY_RESULT_BACKEND = "redis://127.0.0.1:6379/0"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -236,6 +313,10 @@ SIMPLE_JWT = {
     'SIGNING_KEY': env('SIGNING_KEY'),
 }
 
+# Seconds a worker keeps a user row, or a user's last profile change, for
+# tokens that cannot be authenticated from their claims alone
+AUTH_USER_CACHE_TTL = env.float('AUTH_USER_CACHE_TTL', default=30.0)
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.hostinger.com'
 EMAIL_PORT = 465
@@ -0,0 +1,20 @@
+import logging
+
+from celery import shared_task
+
+from .events import relay_outbox
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def relay_outbox_events():
+    """
+    Celery Beat task that adds the events left in the outbox, when the
+    bus could not be reached right after their commit. A bus error fails
+    the task, the events stay for the next run.
+    """
+    relayed = relay_outbox()
+    if relayed:
+        logger.info(f"Relayed {relayed} outbox events")
+    return relayed
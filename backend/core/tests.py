@@ -0,0 +1,137 @@
+import json
+import uuid
+from unittest import mock
+
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core import events
+from core.events import Consumer, MemoryEventBus, publish, relay_outbox
+from core.models import OutboxEvent
+
+
+def event_fields(event_type, payload):
+    return {
+        "id": str(uuid.uuid4()),
+        "type": event_type,
+        "occurred_at": timezone.now().isoformat(),
+        "payload": json.dumps(payload),
+    }
+
+
+@override_settings(EVENT_BUS_CLAIM_IDLE=0, EVENT_BUS_MAX_DELIVERIES=3)
+class EventBusTests(SimpleTestCase):
+    def setUp(self):
+        # Consumer.poll closes stale connections, which SimpleTestCase
+        # forbids once another test has opened one
+        patcher = mock.patch("core.events.close_old_connections")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.bus = MemoryEventBus(maxlen=100)
+        self.handled = []
+
+    def consumer(self, handler, group="test"):
+        return Consumer(group, {"thing.happened": handler}, name="worker", bus=self.bus, block_ms=0)
+
+    def test_every_group_gets_every_event_once(self):
+        first, second = self.consumer(self.handled.append, "first"), self.consumer(self.handled.append, "second")
+        self.bus.add(event_fields("thing.happened", {"n": 1}))
+        self.bus.add(event_fields("other.thing", {}))
+
+        self.assertEqual(first.poll(), 1)
+        self.assertEqual(second.poll(), 1)
+        self.assertEqual(first.poll() + second.poll(), 0)
+        self.assertEqual([event.payload for event in self.handled], [{"n": 1}, {"n": 1}])
+        self.assertEqual(self.bus.groups["first"]["pending"], {})
+
+    def test_failed_event_is_redelivered_with_the_same_id(self):
+        def flaky(event):
+            self.handled.append(event)
+            if event.deliveries == 1:
+                raise RuntimeError("database away")
+
+        consumer = self.consumer(flaky)
+        self.bus.add(event_fields("thing.happened", {}))
+        self.assertEqual(consumer.poll(), 0)
+        self.assertEqual(len(self.bus.groups["test"]["pending"]), 1)
+
+        self.assertEqual(consumer.poll(), 1)
+        self.assertEqual([event.deliveries for event in self.handled], [1, 2])
+        self.assertEqual(self.handled[0].id, self.handled[1].id)
+        self.assertEqual(self.bus.groups["test"]["pending"], {})
+        self.assertEqual(self.bus.dead, [])
+
+    def test_event_failing_every_time_is_dead_lettered(self):
+        def broken(event):
+            raise RuntimeError("bug")
+
+        consumer = self.consumer(broken)
+        stream_id = self.bus.add(event_fields("thing.happened", {}))
+        for _ in range(5):
+            consumer.poll()
+
+        self.assertEqual(len(self.bus.dead), 1)
+        self.assertEqual(self.bus.dead[0]["stream_id"], stream_id)
+        self.assertEqual(self.bus.dead[0]["error"], "bug")
+        self.assertEqual(self.bus.groups["test"]["pending"], {})
+
+    def test_malformed_event_is_dead_lettered(self):
+        consumer = self.consumer(self.handled.append)
+        self.bus.add({"type": "thing.happened", "payload": "{not json"})
+        self.assertEqual(consumer.poll(), 0)
+        self.assertEqual(self.handled, [])
+        self.assertEqual(len(self.bus.dead), 1)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.bus = MemoryEventBus(maxlen=100)
+        patcher = mock.patch.object(events, "get_bus", return_value=self.bus)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def added(self):
+        return [fields for _, fields in self.bus.entries.values()]
+
+    def test_events_reach_the_bus_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                publish("thing.happened", {"at": timezone.now(), "id": uuid.uuid4()})
+                event = OutboxEvent.objects.get()
+                self.assertEqual(self.added(), [])
+
+        fields, = self.added()
+        self.assertEqual(fields["id"], str(event.id))
+        self.assertEqual(fields["type"], "thing.happened")
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_rolled_back_events_are_never_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                publish("thing.happened", {})
+                raise ValueError
+        self.assertEqual(self.added(), [])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_events_wait_in_the_outbox_while_the_bus_is_down(self):
+        with mock.patch.object(self.bus, "add", side_effect=ConnectionError("redis down")):
+            with self.captureOnCommitCallbacks(execute=True):
+                publish("thing.happened", {"n": 1})
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+        self.assertEqual(relay_outbox(), 1)
+        self.assertEqual(len(self.added()), 1)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_relay_keeps_what_it_could_not_add(self):
+        for n in range(3):
+            publish("thing.happened", {"n": n})
+
+        with mock.patch.object(self.bus, "add", side_effect=["1-1", ConnectionError("redis down")]):
+            with self.assertRaises(ConnectionError):
+                relay_outbox()
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+
+        self.assertEqual(relay_outbox(batch=1), 2)
+        self.assertEqual([json.loads(fields["payload"]) for fields in self.added()], [{"n": 1}, {"n": 2}])
@@ -3,6 +3,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path, include
 
+from communication.messaging.views import SocketMetrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('authentication.urls')),
@@ -14,6 +16,7 @@ urlpatterns = [
     path('control/', include('controlpanel.urls')),
     path('video/', include('video.urls')),
     path('payment/', include('payment.urls')),
+    path('metrics', SocketMetrics.as_view(), name='socket-metrics'),
 ]
 
 if settings.DEBUG:
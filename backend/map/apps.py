@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class MapConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'map'
+
+    def ready(self):
+        import map.signals
+
+        # No database access here, the teacher index is built by the first
+        # request or by `manage.py warm_map`
+        if settings.MAP_WARM_UP:
+            from map.engine import warm_up
+            warm_up()
@@ -0,0 +1,101 @@
+import logging
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .gazetteer import get_gazetteer, normalize_city, normalize_country
+from .resolver import DEFAULT_COUNTRY
+from .trigrams import similarity
+
+logger = logging.getLogger(__name__)
+
+# Upper bound of gazetteer rows ranked for a single prefix
+PREFIX_SCAN_LIMIT = 20000
+
+# Fuzzy matching: postings read per query, names re-scored exactly, cut-off
+FUZZY_POSTING_BUDGET = 50000
+FUZZY_CANDIDATES = 200
+MIN_SIMILARITY = 0.2
+
+
+@lru_cache(maxsize=4096)
+def suggest_cities(query: str, country: Optional[str] = DEFAULT_COUNTRY, limit: int = 10) -> Tuple[dict, ...]:
+    """Ranked city suggestions for a partial or misspelled name
+
+    Prefix matches come first, then trigram matches fill the remaining
+    slots. Within each group places in ``country`` rank ahead of the rest.
+    """
+    key = normalize_city(query)
+    wanted = (normalize_country(country) or '').encode('utf-8')
+    if not key:
+        return ()
+
+    gazetteer = get_gazetteer()
+    cities = gazetteer.cities
+
+    suggestions = []
+    seen = set()
+
+    def add(row, match, score):
+        name = cities.keys[row]
+        ctry = cities.countries[row]
+        if (name, ctry) in seen:
+            return
+        seen.add((name, ctry))
+        lat, lon = cities.coords[row]
+        suggestions.append({
+            "city": name.decode('utf-8').title(),
+            "country": ctry.decode('utf-8'),
+            "latitude": round(float(lat), 6),
+            "longitude": round(float(lon), 6),
+            "match": match,
+            "score": round(score, 3),
+        })
+
+    # ---------------------------
+    # Prefix matches (sorted keys, two binary searches)
+    # ---------------------------
+    needle = key.encode('utf-8')
+    start = int(np.searchsorted(cities.keys, needle, side='left'))
+    end = int(np.searchsorted(cities.keys, needle + b'\xff', side='left'))
+    end = min(end, start + PREFIX_SCAN_LIMIT)
+    if end > start:
+        keys = cities.keys[start:end]
+        foreign = cities.countries[start:end] != wanted if wanted else np.zeros(end - start, dtype=bool)
+        inexact = keys != needle
+        lengths = np.char.str_len(keys)
+        for offset in np.lexsort((lengths, inexact, foreign)):
+            add(start + int(offset), "prefix", 1.0)
+            if len(suggestions) >= limit:
+                return tuple(suggestions)
+
+    # ---------------------------
+    # Fuzzy matches (trigram similarity)
+    # ---------------------------
+    trigrams = gazetteer.trigrams
+    positions, counts = trigrams.candidates(key, FUZZY_POSTING_BUDGET)
+    if len(positions) > FUZZY_CANDIDATES:
+        top = np.argpartition(counts, -FUZZY_CANDIDATES)[-FUZZY_CANDIDATES:]
+        positions = positions[top]
+
+    scored = []
+    for position in positions:
+        row = int(trigrams.names[position])
+        name = cities.keys[row].decode('utf-8')
+        score = similarity(key, name)
+        if score < MIN_SIMILARITY:
+            continue
+
+        # Pick the row of this name in the wanted country when there is one
+        first, last = cities.find(name)
+        rows = np.arange(first, last)
+        local = rows[cities.countries[first:last] == wanted] if wanted else rows[:0]
+        scored.append((not len(local), -score, len(name), int(local[0] if len(local) else first), score))
+
+    for _, _, _, row, score in sorted(scored):
+        add(row, "fuzzy", score)
+        if len(suggestions) >= limit:
+            break
+
+    return tuple(suggestions)
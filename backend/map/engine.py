@@ -0,0 +1,137 @@
+"""Cheap entry point to the map engine
+
+Importing the map app (models, signals, views, URLs) must not pull in
+numpy, pandas or numba: Celery workers, beat and most management commands
+never serve a map request. Everything heavy is reached through this module
+and imported on first use, or up front by warm_up().
+"""
+import logging
+import os
+import sys
+import time
+from importlib import import_module
+from threading import Lock
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+logger = logging.getLogger(__name__)
+
+# Redis cache shared by every worker, kept apart from the default cache
+MAP_CACHE_ALIAS = 'map'
+map_cache = ConnectionProxy(caches, MAP_CACHE_ALIAS)
+
+# Shared counter bumped on every teacher location change so that other
+# worker processes notice they hold a stale index
+GENERATION_CACHE_KEY = 'map_teacher_index_generation'
+
+# Attributes served lazily from the engine modules
+_EXPORTS = {
+    'teacher_index': 'map.index',
+    'filter_mask': 'map.filters',
+    'resolve_location': 'map.resolver',
+    'resolve_locations': 'map.resolver',
+    'suggest_cities': 'map.autocomplete',
+    'response_cache_key': 'map.response_cache',
+    'get_results': 'map.response_cache',
+    'store_results': 'map.response_cache',
+    'json_response': 'map.response_cache',
+    'get_gazetteer': 'map.gazetteer',
+}
+
+_warm_lock = Lock()
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+# ---------------------------
+# Index generation
+# ---------------------------
+def current_generation() -> Optional[int]:
+    """Shared teacher index generation, changes whenever any teacher location does
+
+    None when the cache cannot be reached; the index then rebuilds from
+    the database now and then instead of trusting a counter it cannot read.
+    """
+    try:
+        return map_cache.get(GENERATION_CACHE_KEY, 0)
+    except Exception as e:
+        logger.warning(f"Teacher index generation read failed: {e}")
+        return None
+
+
+def bump_generation() -> Optional[int]:
+    """New shared generation, None when the cache cannot be reached"""
+    try:
+        try:
+            return map_cache.incr(GENERATION_CACHE_KEY)
+        except ValueError:
+            map_cache.add(GENERATION_CACHE_KEY, 0, None)
+            return map_cache.incr(GENERATION_CACHE_KEY)
+    except Exception as e:
+        logger.warning(f"Teacher index generation bump failed: {e}")
+        return None
+
+
+def index_loaded() -> bool:
+    return 'map.index' in sys.modules
+
+
+def mark_dirty(teacher_ids):
+    """Schedule teachers for reload, or just bump the generation when this process holds no index"""
+    if index_loaded():
+        sys.modules['map.index'].teacher_index.mark_dirty(teacher_ids)
+    elif teacher_ids:
+        bump_generation()
+
+
+def invalidate():
+    if index_loaded():
+        sys.modules['map.index'].teacher_index.invalidate()
+    else:
+        bump_generation()
+
+
+# ---------------------------
+# Warm-up
+# ---------------------------
+def configure_numba():
+    """Point numba's on-disk kernel cache at MAP_NUMBA_CACHE_DIR, must run before numba is imported"""
+    cache_dir = getattr(settings, 'MAP_NUMBA_CACHE_DIR', None)
+    if cache_dir and 'numba' not in sys.modules:
+        os.makedirs(cache_dir, exist_ok=True)
+        os.environ.setdefault('NUMBA_CACHE_DIR', str(cache_dir))
+
+
+def warm_up(kernels: bool = True, gazetteer: bool = True, index: bool = False) -> dict:
+    """Load the engine before the first request needs it, returns timings in ms"""
+    timings = {}
+
+    def timed(name, step):
+        started = time.perf_counter()
+        step()
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    with _warm_lock:
+        if kernels:
+            from .spatial import compile_kernels
+            timed('kernels', compile_kernels)
+        if gazetteer:
+            from .gazetteer import get_gazetteer
+            timed('gazetteer', get_gazetteer)
+        if index:
+            from .index import teacher_index
+            from .views import FindNearestTeacherView
+            timed('index', lambda: teacher_index.get(FindNearestTeacherView()._locate_teacher))
+
+    logger.info(f"Map engine warmed up: {timings}")
+    return timings
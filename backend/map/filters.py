@@ -0,0 +1,88 @@
+import re
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class CoachTypeColumn:
+    """Coach types of every teacher packed as a bitmask, one bit per sport
+
+    ``bits`` has one row per teacher and one uint64 word per 64 sports, so
+    "teaches any of these sports" is a single AND over the column.
+    """
+
+    def __init__(self, coach_types: List[List[str]]):
+        self.sports = {name: i for i, name in enumerate(sorted({n for names in coach_types for n in names}))}
+        words = max(1, (len(self.sports) + 63) // 64)
+        self.bits = np.zeros((len(coach_types), words), dtype=np.uint64)
+        for row, names in enumerate(coach_types):
+            for name in names:
+                bit = self.sports[name]
+                self.bits[row, bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+
+    def encode(self, names: Iterable[str]) -> np.ndarray:
+        wanted = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        for name in names:
+            bit = self.sports.get(name)
+            if bit is not None:
+                wanted[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return wanted
+
+    def mask(self, names: Iterable[str]) -> np.ndarray:
+        """Teachers coaching at least one of names"""
+        return (self.bits & self.encode(names)).any(axis=1)
+
+
+class InstituteColumn:
+    """Inverted index of the words in every teacher's institute name
+
+    Words are kept sorted so a query word matches every indexed word it is
+    a prefix of ("dhak" finds "Dhaka Club") with two binary searches.
+    """
+
+    def __init__(self, names: List[str]):
+        self.size = len(names)
+        pairs = sorted({(token, row) for row, name in enumerate(names) for token in tokenize(name)})
+        self.tokens, starts = np.unique(np.array([t for t, _ in pairs], dtype=str), return_index=True)
+        self.offsets = np.append(starts, len(pairs)).astype(np.int64)
+        self.rows = np.array([r for _, r in pairs], dtype=np.int64)
+
+    def mask(self, text: str) -> np.ndarray:
+        """Teachers whose institute has a word starting with every word of text
+
+        Text without any word ("!!!") matches no one, like the substring
+        search this replaced, rather than every teacher.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return np.zeros(self.size, dtype=bool)
+        result = np.ones(self.size, dtype=bool)
+        for token in tokens:
+            first = np.searchsorted(self.tokens, token, side='left')
+            last = np.searchsorted(self.tokens, token + '\uffff', side='left')
+            matched = np.zeros(self.size, dtype=bool)
+            matched[self.rows[self.offsets[first]:self.offsets[last]]] = True
+            result &= matched
+        return result
+
+
+def filter_mask(teachers, coach_types=None, institute_name=None) -> Optional[np.ndarray]:
+    """Combine the POST filters into one boolean mask, None when nothing filters"""
+    mask = None
+
+    if coach_types:
+        if isinstance(coach_types, str):
+            coach_types = [coach_types]
+        mask = teachers.coach_types.mask(coach_types)
+
+    if institute_name:
+        institute_mask = teachers.institutes.mask(str(institute_name))
+        mask = institute_mask if mask is None else mask & institute_mask
+
+    return mask
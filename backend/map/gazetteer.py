@@ -0,0 +1,272 @@
+import logging
+import os
+from threading import Lock
+from typing import Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .trigrams import COLUMNS as TRIGRAM_COLUMNS, TrigramIndex
+
+logger = logging.getLogger(__name__)
+
+CITIES_CSV = os.path.join(settings.BASE_DIR, 'map', 'city.csv')
+ZIPS_CSV = os.path.join(settings.BASE_DIR, 'map', 'zip.csv')
+
+# Directory holding the precompiled arrays written by `manage.py build_gazetteer`
+GAZETTEER_DIR = getattr(
+    settings,
+    'MAP_GAZETTEER_DIR',
+    os.path.join(settings.BASE_DIR, 'map', 'gazetteer')
+)
+
+TABLES = ('cities', 'postal')
+COLUMNS = ('keys', 'coords', 'countries')
+
+
+class GazetteerTable:
+    """Sorted lookup table of normalized place keys
+
+    ``keys`` is a sorted fixed-width bytes array, ``coords`` the matching
+    float32 (lat, lon) pairs and ``countries`` upper-case country codes.
+    Duplicate keys sit next to each other in their original CSV order, so a
+    lookup is a binary search returning a slice of candidates.
+    """
+
+    def __init__(self, keys: np.ndarray, coords: np.ndarray, countries: np.ndarray):
+        self.keys = keys
+        self.coords = coords
+        self.countries = countries
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, keys, latitudes, longitudes, countries):
+        keys = np.char.encode(np.asarray(keys, dtype=str), 'utf-8')
+        countries = np.char.encode(np.asarray(countries, dtype=str), 'utf-8')
+        order = np.argsort(keys, kind='stable')
+        coords = np.column_stack((latitudes, longitudes)).astype(np.float32)
+        return cls(keys[order], coords[order], countries[order])
+
+    def find(self, key: str) -> Tuple[int, int]:
+        """Return the [start, end) slice of rows matching key"""
+        needle = key.encode('utf-8')
+        if not len(self.keys) or len(needle) > self.keys.dtype.itemsize:
+            return 0, 0
+        start = int(np.searchsorted(self.keys, needle, side='left'))
+        end = int(np.searchsorted(self.keys, needle, side='right'))
+        return start, end
+
+    def lookup(self, key: str, country: Optional[str] = None, prefer_last: bool = False):
+        """Resolve key to (lat, lon, country), preferring rows in country"""
+        start, end = self.find(key)
+        if start == end:
+            return None
+
+        row = end - 1 if prefer_last else start
+        if end - start > 1 and country:
+            matches = np.flatnonzero(self.countries[start:end] == country.encode('utf-8'))
+            if len(matches):
+                row = start + int(matches[0])
+
+        lat, lon = self.coords[row]
+        return float(lat), float(lon), self.countries[row].decode('utf-8')
+
+    def lookup_many(self, keys, countries, prefer_last: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized lookup of many keys at once
+
+        Returns the matched row for every key and a boolean array telling
+        which keys were found. Empty keys never match.
+        """
+        needles = np.char.encode(np.asarray(keys, dtype=str), 'utf-8')
+        rows = np.zeros(len(needles), dtype=np.int64)
+        if not len(needles) or not len(self.keys):
+            return rows, np.zeros(len(needles), dtype=bool)
+
+        starts = np.searchsorted(self.keys, needles, side='left')
+        ends = np.searchsorted(self.keys, needles, side='right')
+        found = (ends > starts) & (needles != b'')
+        rows = np.where(found, ends - 1 if prefer_last else starts, 0)
+
+        # Duplicate names are rare, settle the country preference one by one
+        wanted = np.char.encode(np.asarray(countries, dtype=str), 'utf-8')
+        for i in np.flatnonzero(found & (ends - starts > 1) & (wanted != b'')):
+            matches = np.flatnonzero(self.countries[starts[i]:ends[i]] == wanted[i])
+            if len(matches):
+                rows[i] = starts[i] + matches[0]
+
+        return rows, found
+
+
+class Gazetteer:
+    """City and postal code coordinates used to resolve map searches"""
+
+    def __init__(self, cities: GazetteerTable, postal: GazetteerTable,
+                 trigrams: Optional[TrigramIndex] = None):
+        self.cities = cities
+        self.postal = postal
+        self._trigrams = trigrams
+        self._trigrams_lock = Lock()
+
+    @property
+    def trigrams(self) -> TrigramIndex:
+        """Trigram index over city names, built on first use when not precompiled"""
+        if self._trigrams is None:
+            with self._trigrams_lock:
+                if self._trigrams is None:
+                    self._trigrams = TrigramIndex.build(self.cities.keys)
+                    logger.info(f"City trigram index built: {len(self._trigrams.codes)} trigrams")
+        return self._trigrams
+
+    def resolve_city(self, city: str, country: Optional[str] = None):
+        return self.cities.lookup(normalize_city(city), normalize_country(country))
+
+    def resolve_postal(self, postal: str, country: Optional[str] = None):
+        # Later rows used to overwrite earlier ones, keep that behaviour
+        return self.postal.lookup(normalize_postal(postal), normalize_country(country), prefer_last=True)
+
+    def resolve_many(self, cities, postals, countries) -> Tuple[np.ndarray, np.ndarray]:
+        """Resolve parallel sequences of cities and postal codes in bulk
+
+        Cities win over postal codes like in the single lookup. Returns a
+        (n, 2) float array of coordinates (NaN when unresolved) and an array
+        of sources: "city", "postal_code" or "".
+        """
+        countries = [normalize_country(country) or '' for country in countries]
+        coords = np.full((len(countries), 2), np.nan)
+        sources = np.full(len(countries), '', dtype=object)
+
+        rows, found = self.cities.lookup_many([normalize_city(city or '') for city in cities], countries)
+        coords[found] = self.cities.coords[rows[found]]
+        sources[found] = "city"
+
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            rows, found = self.postal.lookup_many(
+                [normalize_postal(postals[i] or '') for i in missing],
+                [countries[i] for i in missing],
+                prefer_last=True
+            )
+            coords[missing[found]] = self.postal.coords[rows[found]]
+            sources[missing[found]] = "postal_code"
+
+        return coords, sources
+
+    # ---------------------------
+    # Building
+    # ---------------------------
+    @classmethod
+    def from_csv(cls, cities_path: str = CITIES_CSV, zips_path: str = ZIPS_CSV) -> 'Gazetteer':
+        """Parse the raw CSV files with vectorized pandas operations"""
+        import pandas as pd
+
+        for path in (cities_path, zips_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Geo CSV not found: {path}")
+
+        cities_df = pd.read_csv(cities_path, dtype={'City': 'string'}, low_memory=False, engine='c')
+        cities_df["Latitude"] = pd.to_numeric(cities_df["Latitude"], errors="coerce")
+        cities_df["Longitude"] = pd.to_numeric(cities_df["Longitude"], errors="coerce")
+        cities_df = cities_df.dropna(subset=['City', 'Latitude', 'Longitude'])
+        city_countries = (
+            cities_df['Country'].astype('string').fillna('').str.strip().str.upper()
+            if 'Country' in cities_df.columns else np.full(len(cities_df), '')
+        )
+        cities = GazetteerTable.build(
+            cities_df['City'].str.lower().str.strip(),
+            cities_df["Latitude"].to_numpy(),
+            cities_df["Longitude"].to_numpy(),
+            city_countries,
+        )
+
+        zips_df = pd.read_csv(zips_path, dtype={'postal_code': 'string'}, low_memory=False, engine='c')
+        zips_df["latitude"] = pd.to_numeric(zips_df["latitude"], errors="coerce")
+        zips_df["longitude"] = pd.to_numeric(zips_df["longitude"], errors="coerce")
+        zips_df = zips_df.dropna(subset=['postal_code', 'latitude', 'longitude'])
+        zip_countries = (
+            zips_df['country_code'].astype('string').fillna('').str.strip().str.upper()
+            if 'country_code' in zips_df.columns else np.full(len(zips_df), '')
+        )
+        postal = GazetteerTable.build(
+            zips_df['postal_code'].str.upper().str.strip(),
+            zips_df["latitude"].to_numpy(),
+            zips_df["longitude"].to_numpy(),
+            zip_countries,
+        )
+
+        return cls(cities, postal)
+
+    def save(self, directory: str = GAZETTEER_DIR):
+        """Write every table column as a plain .npy file that can be memory-mapped"""
+        os.makedirs(directory, exist_ok=True)
+        for name, array in self._arrays().items():
+            path = os.path.join(directory, f"{name}.npy")
+            # Write next to the target then rename, so running workers
+            # never map a half written file
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as fh:
+                np.save(fh, array)
+            os.replace(tmp_path, path)
+
+    def _arrays(self) -> dict:
+        arrays = {
+            f"{table}_{column}": getattr(getattr(self, table), column)
+            for table in TABLES for column in COLUMNS
+        }
+        arrays.update({
+            f"trigrams_{column}": getattr(self.trigrams, column)
+            for column in TRIGRAM_COLUMNS
+        })
+        return arrays
+
+    @classmethod
+    def load(cls, directory: str = GAZETTEER_DIR) -> 'Gazetteer':
+        """Memory-map a gazetteer written by save(), pages are read on demand"""
+        def mapped(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+
+        tables = {
+            table: GazetteerTable(*[mapped(f"{table}_{column}") for column in COLUMNS])
+            for table in TABLES
+        }
+        tables['trigrams'] = TrigramIndex(*[mapped(f"trigrams_{column}") for column in TRIGRAM_COLUMNS])
+        return cls(**tables)
+
+    @staticmethod
+    def exists(directory: str = GAZETTEER_DIR) -> bool:
+        names = [f"{table}_{column}" for table in TABLES for column in COLUMNS]
+        names += [f"trigrams_{column}" for column in TRIGRAM_COLUMNS]
+        return all(os.path.exists(os.path.join(directory, f"{name}.npy")) for name in names)
+
+
+def normalize_city(city: str) -> str:
+    return city.strip().lower()
+
+
+def normalize_postal(postal: str) -> str:
+    return postal.strip().upper()
+
+
+def normalize_country(country: Optional[str]) -> Optional[str]:
+    return country.strip().upper() if country else None
+
+
+_gazetteer = None
+_lock = Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Process-wide gazetteer, memory-mapped when it has been precompiled"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _lock:
+            if _gazetteer is None:
+                if Gazetteer.exists():
+                    _gazetteer = Gazetteer.load()
+                    logger.info(f"Gazetteer mapped from {GAZETTEER_DIR}")
+                else:
+                    logger.warning("No precompiled gazetteer found, parsing CSV files. Run `manage.py build_gazetteer`")
+                    _gazetteer = Gazetteer.from_csv()
+                logger.info(f"Gazetteer ready: {len(_gazetteer.cities)} cities, {len(_gazetteer.postal)} postal codes")
+    return _gazetteer
@@ -0,0 +1,254 @@
+import logging
+import time
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from account.models import Teacher
+from .engine import bump_generation, current_generation
+from .filters import CoachTypeColumn, InstituteColumn
+from .models import TeacherLocation
+from .spatial import SpatialGrid, jitter_coordinates
+
+logger = logging.getLogger(__name__)
+
+# Resolves a (city, postal) pair to the base coordinates of that area
+Locator = Callable[[Optional[str], Optional[str]], Optional[Tuple[float, float]]]
+
+
+class TeacherLocations:
+    """Immutable snapshot of the teacher index
+
+    Coordinates are stored as compact float32 arrays; ``ids``/``user_ids``
+    and ``records`` are parallel to them (row ``i`` describes the same teacher
+    everywhere), as are the filter columns. Snapshots are never mutated,
+    updates swap in a new one.
+    """
+
+    __slots__ = ('ids', 'user_ids', 'latitudes', 'longitudes', 'records', 'grid',
+                 'coach_types', 'institutes')
+
+    def __init__(self, records: List[dict]):
+        self.records = records
+        self.ids = np.array([r['id'] for r in records], dtype=object)
+        self.user_ids = np.array([r['user_id'] for r in records], dtype=object)
+        self.latitudes = np.array([r['latitude'] for r in records], dtype=np.float32)
+        self.longitudes = np.array([r['longitude'] for r in records], dtype=np.float32)
+        self.grid = SpatialGrid(self.latitudes, self.longitudes)
+        self.coach_types = CoachTypeColumn([r['coach_types'] for r in records])
+        self.institutes = InstituteColumn([r['institute_name'] for r in records])
+
+    def __len__(self):
+        return len(self.records)
+
+
+# Seconds a snapshot is trusted while the shared generation cannot be read,
+# changes made by other processes show up after at most this long
+UNSHARED_REBUILD_INTERVAL = 30
+
+
+class TeacherLocationIndex:
+    """Process-wide index of teacher locations used by the map endpoints
+
+    Built once on first use, then kept fresh incrementally: model signals
+    mark individual teachers dirty and the next read reloads only those
+    rows. A change made by another process (seen through the shared
+    generation counter) triggers a full rebuild. While the counter is
+    unreadable (cache down) the index is rebuilt every
+    UNSHARED_REBUILD_INTERVAL seconds instead.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._snapshot: Optional[TeacherLocations] = None
+        self._positions: Dict[str, int] = {}
+        self._pending: Set[str] = set()
+        self._generation = None
+        self._built_at = 0.0
+
+    # ---------------------------
+    # Invalidation
+    # ---------------------------
+    def mark_dirty(self, teacher_ids):
+        """Schedule teachers for reload on the next read"""
+        teacher_ids = {str(teacher_id) for teacher_id in teacher_ids}
+        if not teacher_ids:
+            return
+
+        generation = bump_generation()
+        with self._lock:
+            self._pending.update(teacher_ids)
+            # Only follow the shared counter if nobody else changed it in
+            # between, otherwise leave it stale so we rebuild from scratch
+            if None not in (generation, self._generation) and generation == self._generation + 1:
+                self._generation = generation
+
+    def invalidate(self):
+        """Drop the whole index, it is rebuilt on the next read"""
+        bump_generation()
+        with self._lock:
+            self._snapshot = None
+            self._positions = {}
+            self._pending = set()
+
+    # ---------------------------
+    # Reads
+    # ---------------------------
+    def get(self, locate: Locator) -> TeacherLocations:
+        """Return an up to date snapshot, building or patching it if needed"""
+        generation = current_generation()
+        snapshot = self._snapshot
+        if snapshot is not None and not self._pending and generation is not None and generation == self._generation:
+            return snapshot
+
+        with self._lock:
+            if generation is None:
+                stale = time.monotonic() - self._built_at > UNSHARED_REBUILD_INTERVAL
+            else:
+                stale = generation != self._generation
+            if self._snapshot is None or stale:
+                self._rebuild(locate)
+                self._generation = generation
+            elif self._pending:
+                self._apply_pending(locate)
+            return self._snapshot
+
+    def _rebuild(self, locate: Locator):
+        records = _teacher_records(list(_teacher_queryset()), locate)
+        self._pending = set()
+        self._swap(records)
+        self._built_at = time.monotonic()
+        logger.info(f"Teacher location index built with {len(records)} teachers")
+
+    def _apply_pending(self, locate: Locator):
+        pending, self._pending = self._pending, set()
+        records = list(self._snapshot.records)
+        positions = dict(self._positions)
+
+        fresh = {
+            record['id']: record
+            for record in _teacher_records(list(_teacher_queryset().filter(id__in=pending)), locate)
+        }
+
+        for teacher_id in pending:
+            record = fresh.get(teacher_id)
+            position = positions.get(teacher_id)
+            if record is not None and position is not None:
+                records[position] = record
+            elif record is not None:
+                positions[teacher_id] = len(records)
+                records.append(record)
+            elif position is not None:
+                # Swap the last row into the hole to keep removal O(1)
+                last = records.pop()
+                del positions[teacher_id]
+                if position < len(records):
+                    records[position] = last
+                    positions[last['id']] = position
+
+        self._swap(records)
+        logger.info(f"Teacher location index refreshed {len(pending)} teachers")
+
+    def _swap(self, records: List[dict]):
+        self._positions = {record['id']: i for i, record in enumerate(records)}
+        self._snapshot = TeacherLocations(records)
+
+
+def _teacher_queryset():
+    return Teacher.objects.select_related(
+        'user',
+        'document',
+        'map_location'
+    ).prefetch_related('coach_type')
+
+
+def _teacher_records(teachers, locate: Locator) -> List[dict]:
+    """Flatten teachers into index rows, persisting any missing map positions"""
+    located = []
+    for teacher in teachers:
+        if not hasattr(teacher, 'document'):
+            continue  # Skip teachers without document
+
+        document = teacher.document
+        if not document.city and not document.zip_code:
+            continue  # Skip teachers without location data
+
+        location = getattr(teacher, 'map_location', None)
+        located.append((teacher, location if location is not None and location.is_current(document) else None))
+
+    _store_locations(
+        [teacher for teacher, location in located if location is None],
+        locate
+    )
+
+    records = []
+    for teacher, location in located:
+        location = location or getattr(teacher, '_fresh_map_location', None)
+        if location is None:
+            continue  # Address could not be resolved
+        records.append(_teacher_record(teacher, location))
+    return records
+
+
+def _store_locations(teachers, locate: Locator):
+    """Resolve and jitter the positions of teachers in one batch and save them"""
+    resolved = []
+    for teacher in teachers:
+        document = teacher.document
+        base = locate(document.city, document.zip_code)
+        if base is None:
+            logger.warning(f"Could not resolve location for teacher {teacher.user.username}: city={document.city}, postal={document.zip_code}")
+            continue
+        resolved.append((teacher, base))
+
+    if not resolved:
+        return
+
+    base_lats = np.array([base[0] for _, base in resolved])
+    base_lons = np.array([base[1] for _, base in resolved])
+    lats, lons = jitter_coordinates([teacher.id for teacher, _ in resolved], base_lats, base_lons)
+
+    locations = []
+    for i, (teacher, _) in enumerate(resolved):
+        location = TeacherLocation(
+            teacher=teacher,
+            city=teacher.document.city or '',
+            zip_code=teacher.document.zip_code or '',
+            base_latitude=float(base_lats[i]),
+            base_longitude=float(base_lons[i]),
+            latitude=float(lats[i]),
+            longitude=float(lons[i]),
+        )
+        teacher._fresh_map_location = location
+        locations.append(location)
+
+    TeacherLocation.objects.bulk_create(
+        locations,
+        update_conflicts=True,
+        unique_fields=['teacher'],
+        update_fields=['city', 'zip_code', 'base_latitude', 'base_longitude', 'latitude', 'longitude', 'updated_at'],
+    )
+    logger.info(f"Stored map positions for {len(locations)} teachers")
+
+
+def _teacher_record(teacher, location) -> dict:
+    """Row stored in the index for a single teacher"""
+    return {
+        'id': str(teacher.id),
+        'user_id': str(teacher.user.id),
+        'username': teacher.user.username,
+        'full_name': teacher.user.full_name,
+        'profile_pic': teacher.user.profile_pic.url if teacher.user.profile_pic else None,
+        'email': teacher.user.email,
+        'institute_name': teacher.institute_name or '',
+        'coach_types': [sport.name for sport in teacher.coach_type.all()],
+        'description': teacher.description or '',
+        'city': teacher.document.city or '',
+        'postal_code': teacher.document.zip_code or '',
+        'latitude': location.latitude,
+        'longitude': location.longitude,
+    }
+
+
+teacher_index = TeacherLocationIndex()
@@ -0,0 +1,318 @@
+import json
+import random
+import time
+import tracemalloc
+import uuid
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from account.models import Document, Teacher
+from authentication.models import UserAccount
+from controlpanel.models import Sport
+from map.gazetteer import get_gazetteer
+from map.index import teacher_index
+from map.resolver import DEFAULT_COUNTRY
+from map.views import FindNearestTeacherView
+
+BATCH_SIZE = 2000
+
+INSTITUTE_WORDS = ['Dhaka', 'National', 'City', 'Sports', 'Academy', 'Club', 'United', 'Royal', 'Youth', 'Champions']
+BENCH_SPORTS = ['Football', 'Cricket', 'Tennis', 'Badminton', 'Swimming', 'Chess', 'Boxing', 'Hockey']
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the map endpoints against synthetic teacher populations. "
+        "Every population is created inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teachers", default="1000,10000,100000",
+                            help="Comma separated population sizes to benchmark")
+        parser.add_argument("--queries", type=int, default=200, help="Requests timed per endpoint and size")
+        parser.add_argument("--country", default=DEFAULT_COUNTRY, help="Country the synthetic teachers live in")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed of the synthetic data")
+        parser.add_argument("--max-p99-ms", type=float, default=None,
+                            help="Fail when an uncached p99 latency exceeds this many milliseconds")
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["teachers"].split(",") if size.strip()]
+        except ValueError:
+            raise CommandError("--teachers must be a comma separated list of integers")
+        if not sizes or min(sizes) <= 0 or options["queries"] <= 0:
+            raise CommandError("Population sizes and --queries must be positive")
+
+        rng = random.Random(options["seed"])
+
+        started = time.perf_counter()
+        gazetteer = get_gazetteer()
+        gazetteer_seconds = time.perf_counter() - started
+        cities = _sample_cities(gazetteer, options["country"], rng)
+        if not cities:
+            raise CommandError(f"No cities found in the gazetteer for country {options['country']}")
+
+        report = {
+            "gazetteer": {
+                "load_ms": round(gazetteer_seconds * 1000, 2),
+                "bytes": _nbytes(gazetteer._arrays()),
+                "cities": len(gazetteer.cities),
+                "postal_codes": len(gazetteer.postal),
+            },
+            "populations": [],
+        }
+
+        for size in sizes:
+            self.stderr.write(f"Benchmarking {size} teachers...")
+            with transaction.atomic():
+                report["populations"].append(self._benchmark(size, cities, rng, options))
+                transaction.set_rollback(True)
+            # The rolled back rows must not stay in this process' index
+            teacher_index.invalidate()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print(report)
+
+        limit = options["max_p99_ms"]
+        if limit is not None:
+            slow = [
+                f"{population['teachers']} teachers {endpoint}: {population[endpoint]['p99_ms']}ms"
+                for population in report["populations"]
+                for endpoint in ("get", "post")
+                if population[endpoint]["p99_ms"] > limit
+            ]
+            if slow:
+                raise CommandError(f"p99 latency above {limit}ms: " + "; ".join(slow))
+
+    def _benchmark(self, size, cities, rng, options):
+        started = time.perf_counter()
+        sports = _ensure_sports()
+        _create_teachers(size, cities, sports, rng)
+        seed_seconds = time.perf_counter() - started
+
+        view = FindNearestTeacherView()
+
+        # First build resolves and stores every map position
+        teacher_index.invalidate()
+        started = time.perf_counter()
+        teachers = teacher_index.get(view._locate_teacher)
+        first_build_seconds = time.perf_counter() - started
+
+        # Later cold starts find the positions already stored
+        teacher_index.invalidate()
+        started = time.perf_counter()
+        teachers = teacher_index.get(view._locate_teacher)
+        build_seconds = time.perf_counter() - started
+
+        # tracemalloc slows allocations down, measure memory on its own build
+        teacher_index.invalidate()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        teachers = teacher_index.get(view._locate_teacher)
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        grid = teachers.grid
+        structures = {
+            "coordinates": _nbytes([teachers.latitudes, teachers.longitudes]),
+            "grid": _nbytes([grid.order, grid.starts, grid.ends, grid.lat_lo, grid.lat_hi,
+                             grid.lon_lo, grid.lon_hi, grid.cos_min]),
+            "coach_types": teachers.coach_types.bits.nbytes,
+            "institutes": _nbytes([teachers.institutes.tokens, teachers.institutes.offsets,
+                                   teachers.institutes.rows]),
+        }
+
+        user = UserAccount.objects.create(
+            email=f"bench-student-{uuid.uuid4().hex[:8]}@example.com",
+            username=f"bench_s_{uuid.uuid4().hex[:8]}",
+            full_name="Benchmark Student",
+            role='student',
+            profile_pic='bench',
+        )
+        requests = _Requests(user)
+        queries = options["queries"]
+
+        started = time.perf_counter()
+        requests.get({'city': rng.choice(cities), 'limit': 10})
+        first_request_seconds = time.perf_counter() - started
+
+        get_params = [{'city': rng.choice(cities), 'limit': 10} for _ in range(queries)]
+        post_params = [_post_payload(cities, sports, rng) for _ in range(queries)]
+
+        with override_settings(MAP_RESPONSE_CACHE_TTL=0):
+            get_times = [requests.get(params) for params in get_params]
+            post_times = [requests.post(params) for params in post_params]
+
+        # Same queries again with the response cache filled by a first pass
+        for params in get_params:
+            requests.get(params)
+        cached_times = [requests.get(params) for params in get_params]
+
+        return {
+            "teachers": size,
+            "indexed": len(teachers),
+            "seed_s": round(seed_seconds, 2),
+            "first_build_ms": round(first_build_seconds * 1000, 2),
+            "build_ms": round(build_seconds * 1000, 2),
+            "first_request_ms": round(first_request_seconds * 1000, 2),
+            "index_bytes": retained,
+            "structures_bytes": structures,
+            "get": _percentiles(get_times),
+            "post": _percentiles(post_times),
+            "get_cached": _percentiles(cached_times),
+        }
+
+    def _print(self, report):
+        gazetteer = report["gazetteer"]
+        self.stdout.write(
+            f"Gazetteer: {gazetteer['cities']} cities, {gazetteer['postal_codes']} postal codes, "
+            f"{_mb(gazetteer['bytes'])} loaded in {gazetteer['load_ms']}ms"
+        )
+        for population in report["populations"]:
+            structures = population["structures_bytes"]
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{population['teachers']} teachers ({population['indexed']} indexed)"))
+            self.stdout.write(f"  seeded in        {population['seed_s']}s")
+            self.stdout.write(f"  first build      {population['first_build_ms']}ms (stores map positions)")
+            self.stdout.write(f"  cold start       {population['build_ms']}ms")
+            self.stdout.write(f"  first request    {population['first_request_ms']}ms")
+            self.stdout.write(
+                f"  memory           {_mb(population['index_bytes'])} retained, geo arrays "
+                + ", ".join(f"{name} {_mb(size)}" for name, size in structures.items())
+            )
+            for endpoint in ("get", "post", "get_cached"):
+                stats = population[endpoint]
+                self.stdout.write(f"  {endpoint:<16} p50 {stats['p50_ms']}ms  p99 {stats['p99_ms']}ms  max {stats['max_ms']}ms")
+
+
+class _Requests:
+    """Calls the nearest-teacher view directly, skipping middleware and routing"""
+
+    def __init__(self, user):
+        self.user = user
+        self.factory = APIRequestFactory()
+        self.view = FindNearestTeacherView.as_view()
+
+    def get(self, params):
+        return self._timed(self.factory.get('/map/nearest-teacher/', params))
+
+    def post(self, payload):
+        return self._timed(self.factory.post('/map/nearest-teacher/', payload, format='json'))
+
+    def _timed(self, request):
+        force_authenticate(request, user=self.user)
+        started = time.perf_counter()
+        response = self.view(request)
+        if hasattr(response, 'render'):
+            response.render()
+        elapsed = time.perf_counter() - started
+        if response.status_code not in (200, 404):
+            raise CommandError(f"Benchmark request failed with {response.status_code}: {response.content[:200]}")
+        return elapsed
+
+
+def _sample_cities(gazetteer, country, rng, count=200):
+    """Distinct city names of country that fit Document.city"""
+    cities = gazetteer.cities
+    wanted = cities.countries == country.strip().upper().encode('utf-8')
+    names = sorted({
+        key.decode('utf-8').title()
+        for key in np.unique(cities.keys[wanted])
+        if 0 < len(key) <= Document._meta.get_field('city').max_length
+    })
+    return rng.sample(names, min(count, len(names)))
+
+
+def _ensure_sports():
+    sports = list(Sport.objects.all()[:len(BENCH_SPORTS)])
+    if not sports:
+        for name in BENCH_SPORTS:
+            sports.append(Sport.objects.create(name=name, image='bench'))
+    return sports
+
+
+def _create_teachers(size, cities, sports, rng):
+    """Bulk create teachers with documents and coach types, no signals fire"""
+    run = uuid.uuid4().hex[:6]
+
+    users = [
+        UserAccount(
+            email=f"bench-{run}-{i}@example.com",
+            username=f"bench_{run}_{i}",
+            full_name=f"Bench Teacher {i}",
+            role='teacher',
+            profile_pic='bench',
+            password='!',
+        )
+        for i in range(size)
+    ]
+    UserAccount.objects.bulk_create(users, batch_size=BATCH_SIZE)
+
+    teachers = [
+        Teacher(
+            user=user,
+            institute_name=" ".join(rng.sample(INSTITUTE_WORDS, 2)),
+            description="Synthetic teacher",
+            status='verified',
+        )
+        for user in users
+    ]
+    Teacher.objects.bulk_create(teachers, batch_size=BATCH_SIZE)
+
+    Document.objects.bulk_create(
+        [
+            Document(
+                teacher=teacher,
+                picture='bench',
+                id_front='bench',
+                id_back='bench',
+                city=rng.choice(cities),
+                zip_code='',
+            )
+            for teacher in teachers
+        ],
+        batch_size=BATCH_SIZE
+    )
+
+    through = Teacher.coach_type.through
+    through.objects.bulk_create(
+        [
+            through(teacher_id=teacher.id, sport_id=sport.id)
+            for teacher in teachers
+            for sport in rng.sample(sports, rng.randint(1, min(3, len(sports))))
+        ],
+        batch_size=BATCH_SIZE
+    )
+
+
+def _post_payload(cities, sports, rng):
+    filters = {'coach_types': [sport.name for sport in rng.sample(sports, min(2, len(sports)))]}
+    if rng.random() < 0.5:
+        filters['institute_name'] = rng.choice(INSTITUTE_WORDS)
+    if rng.random() < 0.5:
+        filters['max_distance_km'] = rng.choice([10, 50, 200])
+    return {'city': rng.choice(cities), 'limit': 10, 'filters': filters}
+
+
+def _percentiles(seconds):
+    ms = np.array(seconds) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def _nbytes(arrays):
+    values = arrays.values() if isinstance(arrays, dict) else arrays
+    return int(sum(array.nbytes for array in values))
+
+
+def _mb(size):
+    return f"{size / 1024 / 1024:.2f}MB"
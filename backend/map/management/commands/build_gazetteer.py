@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from map.gazetteer import CITIES_CSV, ZIPS_CSV, GAZETTEER_DIR, Gazetteer
+
+
+class Command(BaseCommand):
+    help = "Compile city.csv and zip.csv into the memory-mapped gazetteer used by the map views"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cities", default=CITIES_CSV, help="Path to the cities CSV")
+        parser.add_argument("--zips", default=ZIPS_CSV, help="Path to the postal codes CSV")
+        parser.add_argument("--output", default=GAZETTEER_DIR, help="Directory to write the gazetteer to")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            gazetteer = Gazetteer.from_csv(options["cities"], options["zips"])
+        except FileNotFoundError as exc:
+            raise CommandError(str(exc))
+
+        gazetteer.save(options["output"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Gazetteer written to {options['output']}: "
+            f"{len(gazetteer.cities)} cities, {len(gazetteer.postal)} postal codes "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
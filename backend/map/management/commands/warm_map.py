@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from map.engine import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile the map kernels into the on-disk cache, load the gazetteer and build the teacher index. "
+        "Run it at image build time (--kernels-only) so workers never compile on a request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kernels-only", action="store_true", help="Only compile and cache the numba kernels")
+        parser.add_argument("--no-index", action="store_true", help="Skip building the teacher index")
+
+    def handle(self, *args, **options):
+        kernels_only = options["kernels_only"]
+        timings = warm_up(
+            kernels=True,
+            gazetteer=not kernels_only,
+            index=not (kernels_only or options["no_index"]),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            "Map engine warmed up: " + ", ".join(f"{name} {ms}ms" for name, ms in timings.items())
+        ))
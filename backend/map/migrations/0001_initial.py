@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:43
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('account', '0019_subscriptionteacher'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherLocation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('city', models.CharField(blank=True, max_length=20)),
+                ('zip_code', models.CharField(blank=True, max_length=20)),
+                ('base_latitude', models.FloatField()),
+                ('base_longitude', models.FloatField()),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('teacher', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='map_location', to='account.teacher')),
+            ],
+        ),
+    ]
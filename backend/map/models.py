@@ -1,3 +1,32 @@
 from django.db import models
 
-# Create your models here.
+from account.models import Teacher
+
+import uuid
+
+class TeacherLocation(models.Model):
+    """Map position shown for a teacher, derived from their document address"""
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    teacher = models.OneToOneField(
+        Teacher,
+        on_delete=models.CASCADE,
+        related_name='map_location'
+    )
+    # Address the coordinates were resolved from, used to detect stale rows
+    city = models.CharField(max_length=20, blank=True)
+    zip_code = models.CharField(max_length=20, blank=True)
+    base_latitude = models.FloatField()
+    base_longitude = models.FloatField()
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def is_current(self, document):
+        return self.city == (document.city or '') and self.zip_code == (document.zip_code or '')
+
+    def __str__(self):
+        return f"{self.teacher}: ({self.latitude}, {self.longitude})"
@@ -0,0 +1,56 @@
+import logging
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from .gazetteer import get_gazetteer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COUNTRY = 'BD'
+
+# Shared across requests and views, inspect with resolve_location.cache_info()
+RESOLVE_CACHE_SIZE = 10000
+
+
+@lru_cache(maxsize=RESOLVE_CACHE_SIZE)
+def resolve_location(city: Optional[str], postal: Optional[str], country: Optional[str] = DEFAULT_COUNTRY) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+    """Resolve a single place to (lat, lon, source)
+    Priority: city first, then postal code as fallback
+    Handles duplicate city names by preferring matches in the specified country
+    """
+    gazetteer = get_gazetteer()
+
+    # Try city first (higher priority)
+    if city:
+        match = gazetteer.resolve_city(city, country)
+        if match is not None:
+            lat, lon, ctry = match
+            logger.info(f"Location resolved from city: {city} -> ({lat}, {lon}, {ctry})")
+            return lat, lon, "city"
+
+    # Fallback to postal code if city not found
+    if postal:
+        match = gazetteer.resolve_postal(postal, country)
+        if match is not None:
+            lat, lon, ctry = match
+            logger.info(f"Location resolved from postal: {postal} -> ({lat}, {lon}, {ctry})")
+            return lat, lon, "postal_code"
+
+    logger.warning(f"Could not resolve location for city: {city}, postal: {postal}, country: {country}")
+    return None, None, None
+
+
+def resolve_locations(queries: Sequence[Tuple[Optional[str], Optional[str], Optional[str]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Resolve many (city, postal, country) tuples with vectorized gazetteer lookups
+
+    Returns a (n, 2) coordinates array with NaN rows for unresolved places
+    and the matching array of sources.
+    """
+    if not queries:
+        return np.empty((0, 2)), np.empty(0, dtype=object)
+
+    cities, postals, countries = zip(*queries)
+    return get_gazetteer().resolve_many(cities, postals, [country or DEFAULT_COUNTRY for country in countries])
+
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import logging
+import math
+from typing import Optional
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .filters import tokenize
+from .engine import current_generation, map_cache
+
+logger = logging.getLogger(__name__)
+
+# Resolved query points are snapped to this grid (~110 m) before keying
+CELL_DEGREES = 0.001
+
+# Seconds, MAP_RESPONSE_CACHE_TTL = 0 turns the cache off
+RESPONSE_CACHE_TTL = 300
+
+renderer = JSONRenderer()
+
+
+def response_cache_key(method: str, lat: float, lon: float, limit: int, filters: Optional[dict] = None) -> str:
+    """Cache key of a nearest-teacher result set
+
+    The teacher index generation is part of the key, so any teacher change
+    makes every older entry unreachable; those simply expire.
+    """
+    cell = (math.floor(lat / CELL_DEGREES), math.floor(lon / CELL_DEGREES))
+    normalized = normalize_filters(filters or {})
+    digest = hashlib.sha1(json.dumps(normalized, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"map:nearest:{current_generation()}:{method}:{cell[0]}:{cell[1]}:{limit}:{digest}"
+
+
+def normalize_filters(filters: dict) -> dict:
+    """Equivalent filters map to the same dict (order, case, spacing)"""
+    normalized = {}
+
+    coach_types = filters.get('coach_types')
+    if coach_types:
+        if isinstance(coach_types, str):
+            coach_types = [coach_types]
+        normalized['coach_types'] = sorted({str(name) for name in coach_types})
+
+    institute_name = filters.get('institute_name')
+    if institute_name:
+        normalized['institute_name'] = tokenize(str(institute_name))
+
+    if 'max_distance_km' in filters:
+        try:
+            normalized['max_distance_km'] = float(filters['max_distance_km'])
+        except (ValueError, TypeError):
+            pass
+
+    return normalized
+
+
+def cache_ttl() -> int:
+    return getattr(settings, 'MAP_RESPONSE_CACHE_TTL', RESPONSE_CACHE_TTL)
+
+
+def get_results(key: str) -> Optional[bytes]:
+    if cache_ttl() <= 0:
+        return None
+    try:
+        return map_cache.get(key)
+    except Exception as e:
+        logger.warning(f"Nearest teacher cache read failed: {e}")
+        return None
+
+
+def store_results(key: str, results: dict) -> bytes:
+    """Render results to JSON once and keep the bytes for later requests"""
+    body = renderer.render(results)
+    if cache_ttl() <= 0:
+        return body
+    try:
+        map_cache.set(key, body, cache_ttl())
+    except Exception as e:
+        logger.warning(f"Nearest teacher cache write failed: {e}")
+    return body
+
+
+def json_response(envelope: dict, results: bytes, status: int = 200) -> HttpResponse:
+    """Wrap pre-rendered results bytes in the per-request envelope"""
+    head = renderer.render(envelope)
+    separator = b',' if envelope else b''
+    body = head[:-1] + separator + b'"results":' + results + b'}'
+    return HttpResponse(body, content_type='application/json', status=status)
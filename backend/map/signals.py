@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from authentication.models import UserAccount
+from account.models import Teacher, Document
+from controlpanel.models import Sport
+from . import engine
+
+# Every reload is deferred until the change commits: a worker reloading
+# before that would read the old rows and clear the pending ids anyway
+
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def refresh_teacher_location(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: engine.mark_dirty([pk]))
+
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+def refresh_document_location(sender, instance, **kwargs):
+    teacher_id = instance.teacher_id
+    transaction.on_commit(lambda: engine.mark_dirty([teacher_id]))
+
+@receiver(m2m_changed, sender=Teacher.coach_type.through)
+def refresh_teacher_coach_types(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+
+    if not reverse:
+        pk = instance.pk
+        transaction.on_commit(lambda: engine.mark_dirty([pk]))
+    elif pk_set:
+        teacher_ids = set(pk_set)
+        transaction.on_commit(lambda: engine.mark_dirty(teacher_ids))
+    else:
+        # sport.teacher.clear() gives no pk_set, the rows are already gone
+        transaction.on_commit(engine.invalidate)
+
+@receiver(post_save, sender=UserAccount)
+def refresh_teacher_profile(sender, instance, created, **kwargs):
+    if created or instance.role != "teacher":
+        return
+
+    user_id = instance.pk
+    transaction.on_commit(lambda: engine.mark_dirty(
+        Teacher.objects.filter(user_id=user_id).values_list("id", flat=True)
+    ))
+
+@receiver(post_save, sender=Sport)
+@receiver(post_delete, sender=Sport)
+def refresh_sport_names(sender, instance, created=False, **kwargs):
+    if not created:
+        transaction.on_commit(engine.invalidate)
@@ -0,0 +1,238 @@
+from threading import Lock
+from typing import Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Grid cell edge in degrees (~55 km of latitude)
+GRID_CELL_DEGREES = 0.5
+
+# Below this many points a full scan is cheaper than walking the grid
+BRUTE_FORCE_THRESHOLD = 2048
+
+# Number of closest cells ranked at a time by SpatialGrid.nearest
+NEAREST_CELL_BATCH = 64
+
+# Maximum offset applied to teacher pins, 0.025 degrees is ~2.8 km of latitude
+JITTER_DEGREES = 0.025
+
+
+def _haversine(lat1, lon1, lat2_array, lon2_array):
+    """Vectorized haversine distance in km, compiled by numba in compile_kernels()"""
+    R = 6371.0  # Earth radius in km
+
+    # Convert to radians
+    lat1_rad = np.radians(lat1)
+    lon1_rad = np.radians(lon1)
+    lat2_rad = np.radians(lat2_array)
+    lon2_rad = np.radians(lon2_array)
+
+    # Haversine formula
+    dlat = lat2_rad - lat1_rad
+    dlon = lon2_rad - lon1_rad
+
+    a = np.sin(dlat * 0.5) ** 2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon * 0.5) ** 2
+    c = 2.0 * np.arctan2(np.sqrt(a), np.sqrt(1.0 - a))
+
+    return R * c
+
+
+_kernel = None
+_kernel_lock = Lock()
+
+
+def compile_kernels():
+    """Compile the numba kernels for the array types the index uses
+
+    numba is only imported here. With ``cache=True`` the machine code is
+    written to disk (MAP_NUMBA_CACHE_DIR) the first time, so later
+    processes load it instead of compiling again.
+    """
+    global _kernel
+    if _kernel is None:
+        with _kernel_lock:
+            if _kernel is None:
+                from .engine import configure_numba
+                configure_numba()
+                from numba import jit
+
+                kernel = jit(nopython=True, cache=True)(_haversine)
+                for dtype in (np.float32, np.float64):
+                    kernel(0.0, 0.0, np.zeros(1, dtype=dtype), np.zeros(1, dtype=dtype))
+                _kernel = kernel
+    return _kernel
+
+
+def fast_haversine_vectorized(lat1, lon1, lat2_array, lon2_array):
+    """Haversine distances from one point to arrays of points, numba compiled on first use"""
+    return (_kernel or compile_kernels())(lat1, lon1, lat2_array, lon2_array)
+
+
+def jitter_coordinates(seeds, latitudes, longitudes, spread: float = JITTER_DEGREES) -> Tuple[np.ndarray, np.ndarray]:
+    """Spread points sharing an area by a stable pseudo-random offset
+
+    ``seeds`` are UUIDs: their two 64-bit halves are used directly as uniform
+    draws, so the same teacher always lands on the same spot and the whole
+    batch is computed without touching a random generator.
+    """
+    if not len(seeds):
+        return np.empty(0), np.empty(0)
+
+    halves = np.frombuffer(b''.join(seed.bytes for seed in seeds), dtype='>u8').reshape(-1, 2)
+    unit = halves.astype(np.float64) / 2.0 ** 64  # [0, 1)
+
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+
+    # 1 degree of longitude shrinks with cos(latitude)
+    lat_offset = (unit[:, 0] * 2.0 - 1.0) * spread
+    lon_offset = (unit[:, 1] * 2.0 - 1.0) * spread / np.cos(np.radians(latitudes))
+
+    return np.round(latitudes + lat_offset, 6), np.round(longitudes + lon_offset, 6)
+
+
+def select_nearest(indices: np.ndarray, distances: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pick the k smallest distances with argpartition, returned sorted"""
+    if len(distances) > k:
+        top = np.argpartition(distances, k - 1)[:k]
+        indices, distances = indices[top], distances[top]
+    order = np.argsort(distances, kind='stable')
+    return indices[order], distances[order]
+
+
+class SpatialGrid:
+    """Fixed-size lat/lon grid over a set of points for k-NN and radius queries
+
+    Points are sorted by cell so each occupied cell is a contiguous slice of
+    ``order``. A query ranks occupied cells by a lower bound of their
+    distance to the query point and only computes exact distances for the
+    cells that can still contain an answer.
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, cell_degrees: float = GRID_CELL_DEGREES):
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.cell_degrees = cell_degrees
+        self.size = len(latitudes)
+
+        n_cols = int(np.ceil(360.0 / cell_degrees))
+        rows = np.floor((latitudes.astype(np.float64) + 90.0) / cell_degrees).astype(np.int64)
+        cols = np.floor((longitudes.astype(np.float64) + 180.0) / cell_degrees).astype(np.int64) % n_cols
+        cell_ids = rows * n_cols + cols
+
+        self.order = np.argsort(cell_ids, kind='stable')
+        cell_keys, starts, counts = np.unique(cell_ids[self.order], return_index=True, return_counts=True)
+        self.starts = starts
+        self.ends = starts + counts
+
+        # Cell bounds in radians, used by the distance lower bound
+        cell_rows = cell_keys // n_cols
+        cell_cols = cell_keys % n_cols
+        self.lat_lo = np.radians(cell_rows * cell_degrees - 90.0)
+        self.lat_hi = np.radians((cell_rows + 1) * cell_degrees - 90.0)
+        self.lon_lo = np.radians(cell_cols * cell_degrees - 180.0)
+        self.lon_hi = np.radians((cell_cols + 1) * cell_degrees - 180.0)
+        self.cos_min = np.cos(np.minimum(np.maximum(np.abs(self.lat_lo), np.abs(self.lat_hi)), np.pi / 2))
+
+    def __len__(self):
+        return self.size
+
+    def nearest(self, lat: float, lon: float, k: int, max_distance_km: Optional[float] = None,
+                mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return indices and distances of the k closest points, nearest first"""
+        if k <= 0 or not self.size:
+            return _empty()
+
+        if self.size <= BRUTE_FORCE_THRESHOLD:
+            indices, distances = self._scan(lat, lon, mask)
+            if max_distance_km is not None:
+                keep = distances <= max_distance_km
+                indices, distances = indices[keep], distances[keep]
+            return select_nearest(indices, distances, k)
+
+        bounds = self._cell_bounds(lat, lon)
+        if max_distance_km is not None:
+            bounds[bounds > max_distance_km] = np.inf
+        sizes = self._cell_sizes(mask)
+
+        # Grow a batch of the closest cells until it holds k candidates,
+        # only the batch is sorted, never the whole grid
+        batch = min(len(bounds), NEAREST_CELL_BATCH)
+        while True:
+            if batch < len(bounds):
+                cells = np.argpartition(bounds, batch - 1)[:batch]
+            else:
+                cells = np.arange(len(bounds))
+            cells = cells[np.argsort(bounds[cells], kind='stable')]
+            cells = cells[np.isfinite(bounds[cells])]
+            filled = np.searchsorted(np.cumsum(sizes[cells]), k)
+            if filled < len(cells) or batch == len(bounds) or len(cells) < batch:
+                break
+            batch = min(len(bounds), batch * 4)
+
+        if filled >= len(cells):
+            indices, distances = self._distances(lat, lon, cells, mask)
+        else:
+            indices, distances = self._distances(lat, lon, cells[:filled + 1], mask)
+            kth = np.partition(distances, k - 1)[k - 1]
+            # Any cell whose bound is below the current kth distance may
+            # still hold a closer point
+            indices, distances = self._distances(lat, lon, np.flatnonzero(bounds <= kth), mask)
+
+        if max_distance_km is not None:
+            keep = distances <= max_distance_km
+            indices, distances = indices[keep], distances[keep]
+        return select_nearest(indices, distances, k)
+
+    def within(self, lat: float, lon: float, radius_km: float,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return indices and distances of every point within radius_km, nearest first"""
+        if not self.size:
+            return _empty()
+
+        if self.size <= BRUTE_FORCE_THRESHOLD:
+            indices, distances = self._scan(lat, lon, mask)
+        else:
+            bounds = self._cell_bounds(lat, lon)
+            indices, distances = self._distances(lat, lon, np.flatnonzero(bounds <= radius_km), mask)
+
+        keep = distances <= radius_km
+        indices, distances = indices[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return indices[order], distances[order]
+
+    def _scan(self, lat, lon, mask):
+        indices = np.arange(self.size) if mask is None else np.flatnonzero(mask)
+        return indices, fast_haversine_vectorized(lat, lon, self.latitudes[indices], self.longitudes[indices])
+
+    def _cell_sizes(self, mask):
+        if mask is None:
+            return self.ends - self.starts
+        return np.add.reduceat(mask[self.order].astype(np.int64), self.starts)
+
+    def _distances(self, lat, lon, cells, mask):
+        if not len(cells):
+            return _empty()
+        indices = np.concatenate([self.order[self.starts[c]:self.ends[c]] for c in cells])
+        if mask is not None:
+            indices = indices[mask[indices]]
+        return indices, fast_haversine_vectorized(lat, lon, self.latitudes[indices], self.longitudes[indices])
+
+    def _cell_bounds(self, lat, lon):
+        """Lower bound in km of the distance from (lat, lon) to every occupied cell"""
+        phi = np.radians(lat)
+        lam = np.radians(lon)
+
+        dphi = np.maximum(0.0, np.maximum(self.lat_lo - phi, phi - self.lat_hi))
+
+        two_pi = 2.0 * np.pi
+        dlam = np.minimum(np.mod(self.lon_lo - lam, two_pi), np.mod(lam - self.lon_hi, two_pi))
+        dlam[(self.lon_lo <= lam) & (lam <= self.lon_hi)] = 0.0
+
+        a = np.sin(dphi * 0.5) ** 2 + np.cos(phi) * self.cos_min * np.sin(dlam * 0.5) ** 2
+        return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _empty():
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
@@ -1,3 +1,172 @@
-from django.test import TestCase
+import json
+import time
+from io import StringIO
 
-# Create your tests here.
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from account.models import Teacher
+from .filters import CoachTypeColumn, InstituteColumn, filter_mask
+from .spatial import BRUTE_FORCE_THRESHOLD, SpatialGrid, fast_haversine_vectorized
+
+
+# ---------------------------
+# Spatial grid
+# ---------------------------
+def brute_force(latitudes, longitudes, lat, lon, mask=None):
+    """Every point sorted by distance, the answer SpatialGrid has to match"""
+    distances = fast_haversine_vectorized(lat, lon, latitudes, longitudes)
+    indices = np.arange(len(latitudes)) if mask is None else np.flatnonzero(mask)
+    distances = distances[indices]
+    order = np.argsort(distances, kind='stable')
+    return indices[order], distances[order]
+
+
+class SpatialGridTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        # Above the brute force threshold so queries walk the grid, half of
+        # the points clustered in one region to get crowded and empty cells
+        size = BRUTE_FORCE_THRESHOLD * 2
+        self.latitudes = np.concatenate([rng.uniform(-60, 70, size // 2), rng.normal(23.8, 0.4, size // 2)])
+        self.longitudes = np.concatenate([rng.uniform(-180, 180, size // 2), rng.normal(90.4, 0.4, size // 2)])
+        self.grid = SpatialGrid(self.latitudes, self.longitudes)
+        self.queries = [(23.8, 90.4), (0.0, 0.0), (51.5, -0.1), (-45.0, 179.9), (69.0, -179.5)]
+
+    def assertSameAnswer(self, result, expected):
+        np.testing.assert_allclose(result[1], expected[1])
+        np.testing.assert_array_equal(result[0], expected[0])
+
+    def test_nearest_matches_brute_force(self):
+        for lat, lon in self.queries:
+            for k in (1, 10, 250):
+                indices, distances = brute_force(self.latitudes, self.longitudes, lat, lon)
+                self.assertSameAnswer(self.grid.nearest(lat, lon, k), (indices[:k], distances[:k]))
+
+    def test_nearest_with_mask_and_max_distance(self):
+        mask = np.zeros(len(self.latitudes), dtype=bool)
+        mask[::3] = True
+        for lat, lon in self.queries:
+            indices, distances = brute_force(self.latitudes, self.longitudes, lat, lon, mask)
+            keep = distances <= 500
+            expected = (indices[keep][:20], distances[keep][:20])
+            self.assertSameAnswer(self.grid.nearest(lat, lon, 20, max_distance_km=500, mask=mask), expected)
+
+    def test_within_matches_brute_force(self):
+        for lat, lon in self.queries:
+            for radius in (5, 80, 1500):
+                indices, distances = brute_force(self.latitudes, self.longitudes, lat, lon)
+                keep = distances <= radius
+                self.assertSameAnswer(self.grid.within(lat, lon, radius), (indices[keep], distances[keep]))
+
+    def test_small_and_empty_grids(self):
+        grid = SpatialGrid(self.latitudes[:10], self.longitudes[:10])
+        indices, distances = brute_force(self.latitudes[:10], self.longitudes[:10], 23.8, 90.4)
+        self.assertSameAnswer(grid.nearest(23.8, 90.4, 3), (indices[:3], distances[:3]))
+
+        empty = SpatialGrid(np.empty(0), np.empty(0))
+        self.assertEqual(len(empty.nearest(0.0, 0.0, 5)[0]), 0)
+        self.assertEqual(len(empty.within(0.0, 0.0, 100)[0]), 0)
+        self.assertEqual(len(self.grid.nearest(0.0, 0.0, 0)[0]), 0)
+
+
+# ---------------------------
+# Filters
+# ---------------------------
+class FilterTests(SimpleTestCase):
+    def setUp(self):
+        self.institutes = InstituteColumn(["Dhaka Club", "Abahani Limited Dhaka", "", "Mohammedan Sporting Club"])
+        self.coach_types = CoachTypeColumn([["football"], ["cricket", "football"], [], ["hockey"]])
+
+    def test_institute_prefix_words(self):
+        self.assertEqual(self.institutes.mask("dhak").tolist(), [True, True, False, False])
+        self.assertEqual(self.institutes.mask("Club DHAKA").tolist(), [True, False, False, False])
+        self.assertEqual(self.institutes.mask("sporting club").tolist(), [False, False, False, True])
+        self.assertEqual(self.institutes.mask("barcelona").tolist(), [False, False, False, False])
+
+    def test_institute_text_without_words_matches_no_one(self):
+        for text in ("", "!!!", "  - "):
+            self.assertEqual(self.institutes.mask(text).tolist(), [False, False, False, False])
+
+    def test_coach_types(self):
+        self.assertEqual(self.coach_types.mask(["football"]).tolist(), [True, True, False, False])
+        self.assertEqual(self.coach_types.mask(["hockey", "cricket"]).tolist(), [False, True, False, True])
+        self.assertEqual(self.coach_types.mask(["tennis"]).tolist(), [False, False, False, False])
+
+    def test_filter_mask_combines_filters(self):
+        teachers = type("Teachers", (), {"institutes": self.institutes, "coach_types": self.coach_types})
+        self.assertIsNone(filter_mask(teachers))
+        self.assertEqual(filter_mask(teachers, "football", "dhaka").tolist(), [True, True, False, False])
+        self.assertEqual(filter_mask(teachers, ["cricket"], "club").tolist(), [False, False, False, False])
+
+
+# ---------------------------
+# Benchmarks
+# ---------------------------
+class BenchmarkCommandTests(TestCase):
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command("benchmark_map", "--teachers", "300", "--queries", "20", "--json", *args,
+                     stdout=out, stderr=StringIO())
+        return json.loads(out.getvalue())
+
+    def test_report(self):
+        teachers = Teacher.objects.count()
+        report = self.benchmark()
+
+        self.assertGreater(report["gazetteer"]["cities"], 0)
+        population, = report["populations"]
+        self.assertEqual(population["teachers"], 300)
+        self.assertEqual(population["indexed"], teachers + 300)
+        for endpoint in ("get", "post", "get_cached"):
+            stats = population[endpoint]
+            self.assertLessEqual(stats["p50_ms"], stats["p99_ms"])
+            self.assertLessEqual(stats["p99_ms"], stats["max_ms"])
+        self.assertGreater(population["structures_bytes"]["grid"], 0)
+
+        # Every population is rolled back
+        self.assertEqual(Teacher.objects.count(), teachers)
+
+    def test_p99_gate(self):
+        with self.assertRaisesMessage(CommandError, "p99 latency above"):
+            self.benchmark("--max-p99-ms", "0.000001")
+
+    def test_invalid_arguments(self):
+        for args in (["--teachers", "ten"], ["--teachers", "0"], ["--queries", "0"]):
+            with self.assertRaises(CommandError):
+                call_command("benchmark_map", *args, stdout=StringIO(), stderr=StringIO())
+
+
+class SpatialGridBenchmarkTests(SimpleTestCase):
+    """Latency budgets of the grid, generous enough for a loaded CI machine"""
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        size = 100_000
+        self.latitudes = rng.uniform(20.5, 26.5, size)
+        self.longitudes = rng.uniform(88.0, 92.7, size)
+        self.grid = SpatialGrid(self.latitudes, self.longitudes)
+        self.queries = list(zip(rng.uniform(21, 26, 200), rng.uniform(88.5, 92.5, 200)))
+        # Compiles the kernel outside of the timings
+        self.grid.nearest(23.8, 90.4, 10)
+
+    def timed(self, query):
+        times = []
+        for lat, lon in self.queries:
+            started = time.perf_counter()
+            query(lat, lon)
+            times.append(time.perf_counter() - started)
+        return np.percentile(times, 50), np.percentile(times, 99)
+
+    def test_nearest_beats_a_full_scan(self):
+        scan_p50, _ = self.timed(lambda lat, lon: np.argsort(
+            fast_haversine_vectorized(lat, lon, self.latitudes, self.longitudes))[:10])
+        grid_p50, grid_p99 = self.timed(lambda lat, lon: self.grid.nearest(lat, lon, 10))
+
+        self.assertLess(grid_p50, scan_p50)
+        self.assertLess(grid_p99, 0.05)
+
+    def test_within_budget(self):
+        _, p99 = self.timed(lambda lat, lon: self.grid.within(lat, lon, 25))
+        self.assertLess(p99, 0.05)
@@ -0,0 +1,88 @@
+import zlib
+from array import array
+from typing import Tuple
+
+import numpy as np
+
+COLUMNS = ('codes', 'offsets', 'postings', 'names')
+
+
+def trigrams(text: str) -> set:
+    """Trigrams of text padded like pg_trgm: two spaces in front, one behind"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_codes(text: str) -> np.ndarray:
+    """Stable 32-bit codes of the trigrams of text, sorted"""
+    return np.unique(np.array([zlib.crc32(t.encode('utf-8')) for t in trigrams(text)], dtype=np.uint32))
+
+
+def similarity(a: str, b: str) -> float:
+    """Share of trigrams two strings have in common (0..1)"""
+    ta, tb = trigrams(a), trigrams(b)
+    shared = len(ta & tb)
+    return shared / (len(ta) + len(tb) - shared)
+
+
+class TrigramIndex:
+    """Inverted trigram index over the distinct keys of a sorted key array
+
+    Stored in CSR form: the postings of ``codes[i]`` are
+    ``postings[offsets[i]:offsets[i + 1]]``, each posting being a position in
+    ``names``, which holds the first row of every distinct key.
+    """
+
+    def __init__(self, codes: np.ndarray, offsets: np.ndarray, postings: np.ndarray, names: np.ndarray):
+        self.codes = codes
+        self.offsets = offsets
+        self.postings = postings
+        self.names = names
+
+    @classmethod
+    def build(cls, keys: np.ndarray) -> 'TrigramIndex':
+        if not len(keys):
+            return cls(
+                np.empty(0, dtype=np.uint32), np.zeros(1, dtype=np.int64),
+                np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+            )
+
+        names = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+        # array.array keeps the millions of pairs compact while collecting
+        all_codes, all_names = array('I'), array('i')
+        for position, row in enumerate(names):
+            codes = trigram_codes(keys[row].decode('utf-8'))
+            all_codes.extend(codes.tolist())
+            all_names.extend([position] * len(codes))
+
+        all_codes = np.frombuffer(all_codes, dtype=np.uint32)
+        all_names = np.frombuffer(all_names, dtype=np.int32)
+        order = np.lexsort((all_names, all_codes))
+        codes, starts = np.unique(all_codes[order], return_index=True)
+        offsets = np.append(starts, len(order)).astype(np.int64)
+
+        return cls(codes, offsets, all_names[order].copy(), names)
+
+    def candidates(self, text: str, budget: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Distinct key positions sharing trigrams with text, with their hit counts
+
+        Posting lists are read rarest first and reading stops once ``budget``
+        postings have been collected, so very common trigrams ("  s") do not
+        turn a keystroke into a scan of the whole gazetteer.
+        """
+        codes = trigram_codes(text)
+        slots = np.searchsorted(self.codes, codes)
+        known = slots < len(self.codes)
+        known[known] = self.codes[slots[known]] == codes[known]
+        slots = slots[known]
+        if not len(slots):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        lengths = self.offsets[slots + 1] - self.offsets[slots]
+        order = np.argsort(lengths, kind='stable')
+        used = order[:max(1, np.searchsorted(np.cumsum(lengths[order]), budget, side='right'))]
+
+        hits = np.concatenate([self.postings[self.offsets[s]:self.offsets[s + 1]] for s in slots[used]])
+        positions, counts = np.unique(hits, return_counts=True)
+        return positions, counts
@@ -1,8 +1,12 @@
 from django.urls import path
 from .views import (
     FindNearestTeacherView,
+    ResolveLocationsView,
+    CityAutocompleteView,
 )
 
 urlpatterns = [
-    path('nearest-teacher/', FindNearestTeacherView.as_view())
+    path('nearest-teacher/', FindNearestTeacherView.as_view()),
+    path('resolve/', ResolveLocationsView.as_view()),
+    path('autocomplete/', CityAutocompleteView.as_view()),
 ]
@@ -460,319 +460,25 @@
 #                 "error": "Internal server error"
 #             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-import pandas as pd
-import numpy as np
-import os
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
-from django.conf import settings
-from django.core.cache import cache
 from functools import lru_cache
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from numba import jit
 from typing import Tuple, Optional
-import pickle
-from authentication.models import UserAccount
-from account.models import Teacher
+from . import engine
 
 logger = logging.getLogger(__name__)
 
-# Compile haversine calculation with Numba for 10x+ speed boost
-@jit(nopython=True, cache=True)
-def fast_haversine_vectorized(lat1, lon1, lat2_array, lon2_array):
-    """Ultra-fast vectorized haversine calculation using Numba JIT compilation"""
-    R = 6371.0  # Earth radius in km
-    
-    # Convert to radians
-    lat1_rad = np.radians(lat1)
-    lon1_rad = np.radians(lon1)
-    lat2_rad = np.radians(lat2_array)
-    lon2_rad = np.radians(lon2_array)
-    
-    # Haversine formula
-    dlat = lat2_rad - lat1_rad
-    dlon = lon2_rad - lon1_rad
-    
-    a = np.sin(dlat * 0.5) ** 2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon * 0.5) ** 2
-    c = 2.0 * np.arctan2(np.sqrt(a), np.sqrt(1.0 - a))
-    
-    return R * c
-
 class FindNearestTeacherView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
-    # Class-level data storage for faster access
-    _cities_df = None
-    _zips_df = None  
-    _teachers_df = None
-    _cities_dict = None  # Dictionary lookup for O(1) city access
-    _zips_dict = None    # Dictionary lookup for O(1) postal access
-    _geo_data_loaded = False
-    _lock = None
-    
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        if not FindNearestTeacherView._geo_data_loaded:
-            from threading import Lock
-            if FindNearestTeacherView._lock is None:
-                FindNearestTeacherView._lock = Lock()
-            with FindNearestTeacherView._lock:
-                if not FindNearestTeacherView._geo_data_loaded:
-                    self._load_geo_data()
-    
-    def _load_geo_data(self):
-        """Load and optimize geographic data structures for maximum speed"""
-        try:
-            # Try cached pickle data first (fastest loading)
-            cache_key = 'teacher_finder_geo_data_v3'
-            cached_data = cache.get(cache_key)
-            if cached_data:
-                try:
-                    (FindNearestTeacherView._cities_df, 
-                     FindNearestTeacherView._zips_df, 
-                     FindNearestTeacherView._cities_dict,
-                     FindNearestTeacherView._zips_dict) = pickle.loads(cached_data)
-                    FindNearestTeacherView._geo_data_loaded = True
-                    logger.info("Geographic data loaded from optimized cache")
-                    return
-                except Exception as e:
-                    logger.warning(f"Failed to load cached geo data: {e}")
-            
-            # File paths
-            cities_path = os.path.join(settings.BASE_DIR, 'map', 'city.csv')
-            zips_path = os.path.join(settings.BASE_DIR, 'map', 'zip.csv')
-            
-            # Load CSVs in parallel for speed
-            with ThreadPoolExecutor(max_workers=2) as executor:
-                cities_future = executor.submit(self._load_cities_csv, cities_path)
-                zips_future = executor.submit(self._load_zips_csv, zips_path)
-                
-                FindNearestTeacherView._cities_df = cities_future.result()
-                FindNearestTeacherView._zips_df = zips_future.result()
-            
-            # Create optimized lookup dictionaries for O(1) access
-            self._create_lookup_dictionaries()
-            
-            # Cache optimized data structures
-            try:
-                cached_data = pickle.dumps((
-                    FindNearestTeacherView._cities_df,
-                    FindNearestTeacherView._zips_df, 
-                    FindNearestTeacherView._cities_dict,
-                    FindNearestTeacherView._zips_dict
-                ))
-                cache.set(cache_key, cached_data, 7200)  # Cache for 2 hours
-            except Exception as e:
-                logger.warning(f"Failed to cache geo data: {e}")
-            
-            FindNearestTeacherView._geo_data_loaded = True
-            logger.info(f"Geographic data loaded: {len(FindNearestTeacherView._cities_df)} cities, {len(FindNearestTeacherView._zips_df)} zips")
-            
-        except Exception as e:
-            logger.error(f"Error loading geographic data: {e}")
-            raise
-    
-    def _load_cities_csv(self, cities_path):
-        """Load cities CSV with optimizations"""
-        if not os.path.exists(cities_path):
-            raise FileNotFoundError(f"City CSV not found: {cities_path}")
-        
-        cities_df = pd.read_csv(
-            cities_path, 
-            dtype={'City': 'string'},
-            low_memory=False,
-            engine='c'
-        )
-        
-        cities_df["Latitude"] = pd.to_numeric(cities_df["Latitude"], errors="coerce", downcast='float')
-        cities_df["Longitude"] = pd.to_numeric(cities_df["Longitude"], errors="coerce", downcast='float')
-        cities_df = cities_df.dropna(subset=['Latitude', 'Longitude'])
-        cities_df['city_normalized'] = cities_df['City'].str.lower().str.strip()
-        
-        # Store country info if available
-        if 'Country' in cities_df.columns:
-            cities_df['country_normalized'] = cities_df['Country'].str.lower().str.strip()
-        
-        return cities_df
-    
-    def _load_zips_csv(self, zips_path):
-        """Load zips CSV with optimizations"""
-        if not os.path.exists(zips_path):
-            raise FileNotFoundError(f"Zip CSV not found: {zips_path}")
-        
-        zips_df = pd.read_csv(
-            zips_path,
-            dtype={'postal_code': 'string'},
-            low_memory=False,
-            engine='c'
-        )
-        
-        zips_df["latitude"] = pd.to_numeric(zips_df["latitude"], errors="coerce", downcast='float')
-        zips_df["longitude"] = pd.to_numeric(zips_df["longitude"], errors="coerce", downcast='float')
-        zips_df = zips_df.dropna(subset=['latitude', 'longitude'])
-        zips_df['postal_normalized'] = zips_df['postal_code'].str.upper().str.strip()
-        
-        # Store country info if available
-        if 'country_code' in zips_df.columns:
-            zips_df['country_normalized'] = zips_df['country_code'].str.upper().str.strip()
-        
-        return zips_df
-    
-    def _create_lookup_dictionaries(self):
-        """Create O(1) lookup dictionaries for ultra-fast location resolution
-        Handles duplicate city names by storing all matches with country info
-        """
-        # Cities dictionary: normalized_name -> list of (lat, lon, country)
-        FindNearestTeacherView._cities_dict = {}
-        for _, row in FindNearestTeacherView._cities_df.iterrows():
-            key = row['city_normalized']
-            country = row.get('country_normalized', '')
-            coords = (float(row['Latitude']), float(row['Longitude']), country)
-            
-            if key not in FindNearestTeacherView._cities_dict:
-                FindNearestTeacherView._cities_dict[key] = []
-            FindNearestTeacherView._cities_dict[key].append(coords)
-        
-        # Zips dictionary: normalized_postal -> (lat, lon, country)
-        FindNearestTeacherView._zips_dict = {}
-        for _, row in FindNearestTeacherView._zips_df.iterrows():
-            key = row['postal_normalized']
-            country = row.get('country_normalized', '')
-            FindNearestTeacherView._zips_dict[key] = (float(row['latitude']), float(row['longitude']), country)
-        
-        logger.info(f"Created lookup dictionaries: {len(FindNearestTeacherView._cities_dict)} cities, {len(FindNearestTeacherView._zips_dict)} zips")
-    
-    def _add_location_variance(self, lat: float, lon: float, city: str, postal: str) -> Tuple[float, float]:
-        """Add small random variance to coordinates for teachers in the same area
-        This spreads teachers within approximately 2-5 km radius of the base location
-        """
-        # Create a deterministic but unique seed based on city and postal
-        # This ensures same city/postal combo gets consistent but different offsets
-        seed_str = f"{city}_{postal}_{np.random.randint(0, 1000000)}"
-        seed_value = hash(seed_str) % (2**32)
-        np.random.seed(seed_value)
-        
-        # Add random offset within ~2-5 km radius
-        # 1 degree latitude ≈ 111 km
-        # 1 degree longitude ≈ 111 km * cos(latitude)
-        
-        lat_offset = np.random.uniform(-0.025, 0.025)  # ~2.8 km variance
-        lon_offset = np.random.uniform(-0.025, 0.025) / np.cos(np.radians(lat))  # Adjust for latitude
-        
-        new_lat = lat + lat_offset
-        new_lon = lon + lon_offset
-        
-        # Reset random seed to avoid affecting other random operations
-        np.random.seed(None)
-        
-        return round(new_lat, 6), round(new_lon, 6)
-    
-    def _load_teachers_from_db(self):
-        """Load all teachers from database with location data"""
-        # Query all teachers with their document (location data)
-        teachers = Teacher.objects.select_related(
-            'user', 
-            'document'
-        ).prefetch_related('coach_type')
-        
-        teachers_data = []
-        for teacher in teachers:
-            # Get location from Document model
-            if not hasattr(teacher, 'document'):
-                continue  # Skip teachers without document
-            
-            city = teacher.document.city
-            postal = teacher.document.zip_code
-            
-            if not city and not postal:
-                continue  # Skip teachers without location data
-            
-            # Resolve base coordinates for the area
-            base_lat, base_lon, _ = self._resolve_location_cached(city, postal, 'BD')
-            if base_lat is None or base_lon is None:
-                logger.warning(f"Could not resolve location for teacher {teacher.user.username}: city={city}, postal={postal}")
-                continue  # Skip if we can't resolve location
-            
-            # Add variance to spread teachers within the city/area
-            lat, lon = self._add_location_variance(base_lat, base_lon, city, postal)
-            
-            # Get coach types (sports)
-            coach_types = list(teacher.coach_type.values_list('name', flat=True))
-            
-            teachers_data.append({
-                'id': str(teacher.id),
-                'user_id': str(teacher.user.id),
-                'username': teacher.user.username,
-                'full_name': teacher.user.full_name,
-                'profile_pic': teacher.user.profile_pic.url if teacher.user.profile_pic else None,
-                'email': teacher.user.email,
-                'institute_name': teacher.institute_name or '',
-                'coach_types': coach_types,
-                'description': teacher.description or '',
-                'city': city or '',
-                'postal_code': postal or '',
-                'latitude': lat,
-                'longitude': lon,
-                'base_latitude': base_lat,  # Store original for reference
-                'base_longitude': base_lon
-            })
-        
-        if not teachers_data:
-            logger.warning("No teachers with valid location data found")
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(teachers_data)
-        df['latitude_array'] = df['latitude'].astype(np.float32)
-        df['longitude_array'] = df['longitude'].astype(np.float32)
-        
-        logger.info(f"Loaded {len(df)} teachers with locations. Sample locations: {df[['username', 'city', 'postal_code', 'latitude', 'longitude']].head().to_dict('records')}")
-        
-        return df
-
-    @lru_cache(maxsize=1000)
-    def _resolve_location_cached(self, city: Optional[str], postal: Optional[str], country: Optional[str] = 'BD') -> Tuple[Optional[float], Optional[float], Optional[str]]:
-        """Ultra-fast cached location resolution using O(1) dictionary lookups
-        Priority: city first, then postal code as fallback
-        Handles duplicate city names by preferring matches in the specified country
-        """
-        # Try city first (higher priority)
-        if city:
-            city_key = city.strip().lower()
-            if city_key in FindNearestTeacherView._cities_dict:
-                matches = FindNearestTeacherView._cities_dict[city_key]
-                
-                # If there are multiple matches, prefer the specified country
-                if len(matches) > 1 and country:
-                    country_key = country.strip().upper()
-                    for lat, lon, ctry in matches:
-                        if ctry.upper() == country_key:
-                            logger.info(f"Location resolved from city with country filter: {city}, {country} -> ({lat}, {lon})")
-                            return lat, lon, "city"
-                
-                # Use first match if no country preference or only one match
-                lat, lon, ctry = matches[0]
-                logger.info(f"Location resolved from city: {city} -> ({lat}, {lon}, {ctry})")
-                return lat, lon, "city"
-        
-        # Fallback to postal code if city not found
-        if postal:
-            postal_key = postal.strip().upper()
-            if postal_key in FindNearestTeacherView._zips_dict:
-                lat, lon, ctry = FindNearestTeacherView._zips_dict[postal_key]
-                logger.info(f"Location resolved from postal: {postal} -> ({lat}, {lon}, {ctry})")
-                return lat, lon, "postal_code"
-        
-        logger.warning(f"Could not resolve location for city: {city}, postal: {postal}, country: {country}")
-        return None, None, None
-
-    def _calculate_distances_optimized(self, lat: float, lon: float, teachers_df: pd.DataFrame) -> np.ndarray:
-        """Ultra-fast distance calculation using Numba JIT compilation"""
-        teacher_lats = teachers_df['latitude_array'].values
-        teacher_lons = teachers_df['longitude_array'].values
-        
-        return fast_haversine_vectorized(lat, lon, teacher_lats, teacher_lons)
+    def _locate_teacher(self, city: Optional[str], postal: Optional[str]) -> Optional[Tuple[float, float]]:
+        """Resolve the base coordinates of a teacher's area for the location index"""
+        lat, lon, _ = engine.resolve_location(city or None, postal or None, 'BD')
+        if lat is None or lon is None:
+            return None
+        return lat, lon
 
     @lru_cache(maxsize=100)
     def _get_distance_category_cached(self, distance_km: float) -> str:
@@ -820,7 +526,7 @@ class FindNearestTeacherView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Ultra-fast cached location resolution with country preference
-            lat, lon, found_source = self._resolve_location_cached(
+            lat, lon, found_source = engine.resolve_location(
                 city if city else None,
                 postal if postal else None,
                 country
@@ -833,27 +539,45 @@ class FindNearestTeacherView(APIView):
                     "message": f"Could not resolve coordinates for city: '{city}', postal: '{postal}', country: '{country}'"
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Load teachers from database
-            teachers_df = self._load_teachers_from_db()
+            envelope = {
+                "success": True,
+                "query": {
+                    "city": city if city else None,
+                    "postal": postal if postal else None,
+                    "country": country,
+                    "limit": limit
+                },
+                "location": {
+                    "resolved_from": found_source,
+                    "latitude": round(lat, 6),
+                    "longitude": round(lon, 6)
+                }
+            }
+            
+            # Identical searches from the same spot share pre-rendered results
+            cache_key = engine.response_cache_key('get', lat, lon, limit)
+            results = engine.get_results(cache_key)
+            if results is not None:
+                return engine.json_response(envelope, results)
+            
+            # Shared in-memory teacher index, only rebuilt when teachers change
+            teachers = engine.teacher_index.get(self._locate_teacher)
             
-            if teachers_df.empty:
+            if not len(teachers):
                 return Response({
                     "success": False,
                     "error": "No teachers available",
                     "message": "No teachers found with valid location data"
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Ultra-fast distance calculation using JIT compilation
-            distances = self._calculate_distances_optimized(lat, lon, teachers_df)
-            
-            # Fast sorting using numpy argsort
-            sorted_indices = np.argsort(distances)[:limit]
+            # k-nearest search over the spatial grid, only nearby cells are visited
+            indices, distances = teachers.grid.nearest(lat, lon, limit)
             
             # Optimized result formatting
             teachers_list = []
-            for idx in sorted_indices:
-                teacher = teachers_df.iloc[int(idx)]  # Ensure integer index
-                distance_km = float(distances[idx])
+            for idx, distance_km in zip(indices, distances):
+                teacher = teachers.records[int(idx)]  # Ensure integer index
+                distance_km = float(distance_km)
                 
                 teachers_list.append({
                     "id": teacher['id'],
@@ -876,24 +600,11 @@ class FindNearestTeacherView(APIView):
                     }
                 })
             
-            return Response({
-                "success": True,
-                "query": {
-                    "city": city if city else None,
-                    "postal": postal if postal else None,
-                    "country": country,
-                    "limit": limit
-                },
-                "location": {
-                    "resolved_from": found_source,
-                    "latitude": round(lat, 6),
-                    "longitude": round(lon, 6)
-                },
-                "results": {
-                    "total_found": len(teachers_list),
-                    "teachers": teachers_list
-                }
-            }, status=status.HTTP_200_OK)
+            results = engine.store_results(cache_key, {
+                "total_found": len(teachers_list),
+                "teachers": teachers_list
+            })
+            return engine.json_response(envelope, results)
             
         except ValueError:
             return Response({
@@ -928,7 +639,7 @@ class FindNearestTeacherView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Fast location resolution with country preference
-            lat, lon, found_source = self._resolve_location_cached(
+            lat, lon, found_source = engine.resolve_location(
                 city if city else None,
                 postal if postal else None,
                 country
@@ -940,73 +651,71 @@ class FindNearestTeacherView(APIView):
                     "error": "Location not found"
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Load teachers from database
-            teachers_df = self._load_teachers_from_db()
+            envelope = {
+                "success": True,
+                "query": {
+                    "city": city if city else None,
+                    "postal": postal if postal else None,
+                    "country": country,
+                    "limit": limit,
+                    "filters": filters
+                }
+            }
+            
+            # Identical searches from the same spot share pre-rendered results
+            cache_key = engine.response_cache_key('post', lat, lon, limit, filters)
+            results = engine.get_results(cache_key)
+            if results is not None:
+                return engine.json_response(envelope, results)
+            
+            # Shared in-memory teacher index, only rebuilt when teachers change
+            teachers = engine.teacher_index.get(self._locate_teacher)
             
-            if teachers_df.empty:
+            if not len(teachers):
                 return Response({
                     "success": False,
                     "error": "No teachers available"
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Apply filters efficiently using pandas vectorized operations
-            filtered_df = teachers_df.copy()
-            
-            # Filter by coach types (sports)
-            if 'coach_types' in filters and filters['coach_types']:
-                filtered_df = filtered_df[
-                    filtered_df['coach_types'].apply(
-                        lambda x: any(ct in x for ct in filters['coach_types'])
-                    )
-                ]
-            
-            # Filter by institute name (partial match)
-            if 'institute_name' in filters and filters['institute_name']:
-                filtered_df = filtered_df[
-                    filtered_df['institute_name'].str.contains(
-                        filters['institute_name'], 
-                        case=False, 
-                        na=False
-                    )
-                ]
+            # Columnar filters: sport bitmask and tokenized institute names
+            mask = engine.filter_mask(
+                teachers,
+                coach_types=filters.get('coach_types'),
+                institute_name=filters.get('institute_name')
+            )
             
-            if filtered_df.empty:
+            if mask is not None and not mask.any():
                 return Response({
                     "success": False,
                     "error": "No teachers found matching filters"
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Reset index to avoid indexing issues
-            filtered_df = filtered_df.reset_index(drop=True)
-            
-            # Fast distance calculation for filtered data
-            teacher_lats = filtered_df['latitude_array'].values
-            teacher_lons = filtered_df['longitude_array'].values
-            distances = fast_haversine_vectorized(lat, lon, teacher_lats, teacher_lons)
-            
-            # Apply distance filter
+            # Distance filter, ignored when it is not a number
+            max_distance = None
             if 'max_distance_km' in filters:
                 try:
                     max_distance = float(filters['max_distance_km'])
-                    valid_indices = distances <= max_distance
-                    if not valid_indices.any():
-                        return Response({
-                            "success": False,
-                            "error": "No teachers within specified distance"
-                        }, status=status.HTTP_404_NOT_FOUND)
-                    filtered_df = filtered_df[valid_indices].reset_index(drop=True)
-                    distances = distances[valid_indices]
                 except (ValueError, TypeError):
                     pass
             
-            # Fast sorting and limiting
-            sorted_indices = np.argsort(distances)[:limit]
+            # k-nearest search over the spatial grid restricted to the filtered rows
+            indices, distances = teachers.grid.nearest(
+                lat, lon, limit,
+                max_distance_km=max_distance,
+                mask=mask
+            )
+            
+            if not len(indices):
+                return Response({
+                    "success": False,
+                    "error": "No teachers within specified distance"
+                }, status=status.HTTP_404_NOT_FOUND)
             
             # Build response
             teachers_list = []
-            for idx in sorted_indices:
-                teacher = filtered_df.iloc[int(idx)]  # Ensure integer index
-                distance_km = float(distances[idx])
+            for idx, distance_km in zip(indices, distances):
+                teacher = teachers.records[int(idx)]
+                distance_km = float(distance_km)
                 
                 teachers_list.append({
                     "id": teacher['id'],
@@ -1027,23 +736,127 @@ class FindNearestTeacherView(APIView):
                     }
                 })
             
+            results = engine.store_results(cache_key, {
+                "total_found": len(teachers_list),
+                "teachers": teachers_list
+            })
+            return engine.json_response(envelope, results)
+            
+        except Exception as e:
+            logger.error(f"Error in POST endpoint: {e}", exc_info=True)
+            return Response({
+                "success": False,
+                "error": "Internal server error"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ResolveLocationsView(APIView):
+    """Bulk geocoding of (city, postal, country) entries in a single request"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    MAX_LOCATIONS = 1000
+
+    def post(self, request):
+        try:
+            locations = request.data.get('locations')
+            if not isinstance(locations, list) or not locations:
+                return Response({
+                    "success": False,
+                    "error": "Validation failed",
+                    "details": ["'locations' must be a non-empty list"]
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            if len(locations) > self.MAX_LOCATIONS:
+                return Response({
+                    "success": False,
+                    "error": "Validation failed",
+                    "details": [f"At most {self.MAX_LOCATIONS} locations can be resolved per request"]
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            # Accept {"city", "postal", "country"} objects or [city, postal, country] lists
+            queries = []
+            for item in locations:
+                if isinstance(item, dict):
+                    city, postal, country = item.get('city'), item.get('postal'), item.get('country')
+                elif isinstance(item, (list, tuple)):
+                    city, postal, country = (list(item) + [None, None, None])[:3]
+                else:
+                    city = postal = country = None
+                queries.append((
+                    str(city).strip() if city else '',
+                    str(postal).strip() if postal else '',
+                    str(country).strip() if country else None,
+                ))
+
+            coords, sources = engine.resolve_locations(queries)
+
+            results = []
+            for (lat, lon), source in zip(coords.tolist(), sources):
+                if source:
+                    results.append({
+                        "resolved_from": source,
+                        "latitude": round(lat, 6),
+                        "longitude": round(lon, 6)
+                    })
+                else:
+                    results.append(None)
+
+            return Response({
+                "success": True,
+                "results": {
+                    "total": len(results),
+                    "resolved": sum(1 for result in results if result is not None),
+                    "locations": results
+                }
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error(f"Error in ResolveLocationsView: {e}", exc_info=True)
+            return Response({
+                "success": False,
+                "error": "Internal server error"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CityAutocompleteView(APIView):
+    """Ranked city suggestions while the user is typing"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            query = request.query_params.get('q', '').strip()
+            country = request.query_params.get('country', 'BD').strip()  # Default to Bangladesh
+            limit = min(max(int(request.query_params.get('limit', '10')), 1), 25)
+
+            if len(query) < 2:
+                return Response({
+                    "success": False,
+                    "error": "Validation failed",
+                    "details": ["Query must be at least 2 characters long"]
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            suggestions = engine.suggest_cities(query, country, limit)
+
             return Response({
                 "success": True,
                 "query": {
-                    "city": city if city else None,
-                    "postal": postal if postal else None,
+                    "q": query,
                     "country": country,
-                    "limit": limit,
-                    "filters": filters
+                    "limit": limit
                 },
                 "results": {
-                    "total_found": len(teachers_list),
-                    "teachers": teachers_list
+                    "total_found": len(suggestions),
+                    "suggestions": suggestions
                 }
             }, status=status.HTTP_200_OK)
-            
+
+        except ValueError:
+            return Response({
+                "success": False,
+                "error": "Invalid limit parameter"
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            logger.error(f"Error in POST endpoint: {e}", exc_info=True)
+            logger.error(f"Error in CityAutocompleteView: {e}", exc_info=True)
             return Response({
                 "success": False,
                 "error": "Internal server error"
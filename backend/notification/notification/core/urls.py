@@ -1,6 +0,0 @@
-from django.urls import path, include
-
-urlpatterns = [
-    path("notifications/", include("notifications.urls")),
-]
-
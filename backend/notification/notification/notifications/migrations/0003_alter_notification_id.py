@@ -1,19 +0,0 @@
-# Generated by Django 5.2.7 on 2025-10-02 22:16
-
-import uuid
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('notifications', '0002_alter_notification_id'),
-    ]
-
-    operations = [
-        migrations.AlterField(
-            model_name='notification',
-            name='id',
-            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
-        ),
-    ]
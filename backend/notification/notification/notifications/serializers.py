@@ -1,9 +0,0 @@
-from rest_framework import serializers
-from .models import Notification
-
-
-class NotificationSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Notification
-        fields = "__all__"
-
@@ -1,7 +0,0 @@
-from django.urls import path
-from .views import NotificationListCreateView
-
-urlpatterns = [
-    path("", NotificationListCreateView.as_view(), name="notification-list-create"),
-]
-
@@ -1,3 +1,68 @@
-from django.test import TestCase
+import threading
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from account.models import Teacher
+from core import events
+from core.events import MemoryEventBus
+from teacher.session.models import BookedSession
+from .views import StripeWebhookView
+
+User = get_user_model()
+
+
+def create_user(role):
+    name = f"{role}{uuid.uuid4().hex[:8]}"
+    return User.objects.create_user(email=f"{name}@example.com", username=name, password="secret", role=role)
+
+
+class BookedSessionWebhookTests(TransactionTestCase):
+    def setUp(self):
+        self.bus = MemoryEventBus(maxlen=100)
+        patcher = mock.patch.object(events, "get_bus", return_value=self.bus)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.booked_session = BookedSession.objects.create(
+            teacher=Teacher.objects.get(user=create_user("teacher")), student=create_user("student"),
+            session_time=timezone.now() + timedelta(days=1), channel_name="channel",
+        )
+
+    def handle(self):
+        metadata = {"booked_session_id": str(self.booked_session.id)}
+        StripeWebhookView().handle_booked_session(metadata, {"amount_total": 5000})
+
+    def published(self):
+        return [fields for _, fields in self.bus.entries.values() if fields["type"] == "payment.succeeded"]
+
+    def test_redeliveries_publish_once(self):
+        self.handle()
+        self.handle()
+
+        self.assertEqual(len(self.published()), 1)
+        self.booked_session.refresh_from_db()
+        self.assertTrue(self.booked_session.is_paid)
+
+    def test_concurrent_deliveries_publish_once(self):
+        def redeliver():
+            try:
+                self.handle()
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            self.handle()
+            # The redelivery waits on the row lock until this one commits
+            thread = threading.Thread(target=redeliver)
+            thread.start()
+            time.sleep(0.3)
+        thread.join()
+
+        self.assertEqual(len(self.published()), 1)
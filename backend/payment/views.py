@@ -1,6 +1,7 @@
 import json
 import stripe
 from django.conf import settings
+from django.db import transaction
 from django.http import HttpResponse
 from django.utils.decorators import method_decorator
 from django.utils import timezone
@@ -13,6 +14,7 @@ from account.models import Subscription, Student, SubscriptionTeacher, Teacher
 from teacher.session.models import BookedSession
 from teacher.dashboard.models import IncomeHistory
 from controlpanel.models import TeacherDeduction, AdminIncome
+from core.events import publish
 
 
 
@@ -207,6 +209,14 @@ class StripeWebhookView(APIView):
         teacher.can_access_schedule = True
         teacher.save()
 
+        # Stripe redelivers webhooks, announce a payment once
+        if created:
+            publish("payment.succeeded", {
+                "kind": "teacher-subscription",
+                "user_id": teacher.user_id,
+                "ends_at": subscription.end_date,
+            })
+
         print(f"✅ Subscription saved & account upgraded for student {teacher.id}")
 
     def handle_subscription(self, metadata, session):
@@ -239,6 +249,14 @@ class StripeWebhookView(APIView):
         student.account_type = "pro"
         student.save()
 
+        # Stripe redelivers webhooks, announce a payment once
+        if created:
+            publish("payment.succeeded", {
+                "kind": "subscription",
+                "user_id": student.user_id,
+                "ends_at": subscription.end_date,
+            })
+
         print(f"✅ Subscription saved & account upgraded for student {student.id}")
 
 
@@ -248,19 +266,32 @@ class StripeWebhookView(APIView):
         if not booked_session_id:
             return
 
-        try:
-            booked_session = BookedSession.objects.get(id=booked_session_id)
-        except BookedSession.DoesNotExist:
-            return
-
-        teacher = booked_session.teacher
-        student = booked_session.student
-        if not teacher or not student:
-            return
-
-        # Mark session as paid
-        booked_session.is_paid = True
-        booked_session.save()
+        with transaction.atomic():
+            # Locked so concurrent redeliveries of the webhook see each
+            # other's is_paid, only the first one announces the payment
+            try:
+                booked_session = BookedSession.objects.select_for_update().get(id=booked_session_id)
+            except BookedSession.DoesNotExist:
+                return
+
+            teacher = booked_session.teacher
+            student = booked_session.student
+            if not teacher or not student:
+                return
+
+            # Mark session as paid
+            newly_paid = not booked_session.is_paid
+            booked_session.is_paid = True
+            booked_session.save()
+
+            if newly_paid:
+                publish("payment.succeeded", {
+                    "kind": "booked_session",
+                    "user_id": student.id,
+                    "teacher_user_id": teacher.user_id,
+                    "booked_session_id": booked_session.id,
+                    "student_name": student.full_name,
+                })
 
         # Total amount (divide by 100 to get dollars)
         total_paid = Decimal(session.get("amount_total", 0)) / 100
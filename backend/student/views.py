@@ -29,8 +29,7 @@ from .serializers import (
     StudentProfileUpdateSerializer,
     RatingReviewSerializer
 )
-from communication.notification.models import Notification
-from communication.messaging.socket import sio
+from core.events import publish
 
 from core.permissions import IsProStudent
 
@@ -86,8 +85,6 @@ class SessionDetailView(APIView):
         serializer = SessionDetailsSerializer(session)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-from asgiref.sync import async_to_sync
-
 class BookedSessionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -178,35 +175,15 @@ class BookedSessionView(APIView):
             session_time=session_time
         )
 
-        # 6. Send notification to the teacher
-        header = "New Session Booked"
-        detail = f"{request.user.full_name} booked a session for {session_datetime.strftime('%Y-%m-%d %H:%M')}."
-        onclick_location = f"/teacher/booked-sessions/{booked_session.id}"
+        # 6. Notify the teacher, through the notification consumer of the event bus
+        publish("booking.created", {
+            "booked_session_id": booked_session.id,
+            "teacher_user_id": session_option.teacher.user_id,
+            "student_user_id": request.user.id,
+            "student_name": request.user.full_name,
+            "starts_at": session_datetime,
+        })
 
-        notification = Notification.objects.create(
-            recipient=session_option.teacher.user,
-            header=header,
-            detail=detail,
-            onclick_location=onclick_location
-        )
-
-        try:
-            async def send_notification():
-                await sio.emit("send_notification", {
-                    "user_id": str(session_option.teacher.user.id),
-                    "header": header,
-                    "detail": detail,
-                    "onclick_location": onclick_location
-                })
-            
-            # Convert async to sync properly
-            sync_send = async_to_sync(send_notification)
-            sync_send()
-            print(f"Real-time notification sent to teacher {session_option.teacher.user.id}")
-            
-        except Exception as e:
-            print(f"Failed to send real-time notification: {e}")
-            # Notification is still saved in database even if Socket.IO fails 
         conversation, _ = Conversation.objects.get_or_create(
             teacher=session_option.teacher.user,
             student=request.user
@@ -307,7 +284,9 @@ class ProfileView(generics.RetrieveAPIView):
     serializer_class = StudentProfileSerializer
 
     def get_object(self):
-        return self.request.user.student
+        # The serializer reads most of the student and user rows, which
+        # request.user only carries as token claims
+        return Student.objects.select_related("user").get(user=self.request.user)
 
 class ProfileGetOrUpdateView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -316,7 +295,7 @@ class ProfileGetOrUpdateView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         user = self.request.user
 
-        student, _ = Student.objects.get_or_create(user=user)
+        student, _ = Student.objects.select_related("user").get_or_create(user=user)
         return student
 
 class RatingReviewView(generics.ListCreateAPIView):
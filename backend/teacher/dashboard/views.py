@@ -20,7 +20,7 @@ from datetime import timedelta, date
 from core.permissions import IsTeacher
 from controlpanel.models import Withdraw
 
-from account.models import Document
+from account.models import Document, Teacher
 
 from teacher.session.models import (
     BookedSession
@@ -549,9 +549,14 @@ class AccountUploadWebhookView(APIView):
 class AccountDetailView(APIView):
     permission_classes = [IsAuthenticated, IsTeacher]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
+
+    def get_teacher(self, request):
+        # request.user.teacher only holds the token claims and the serializer
+        # reads most of the row, load it in one query rather than one per column
+        return Teacher.objects.select_related("user", "document").get(pk=request.user.teacher.pk)
     
     def get(self, request):
-        teacher = request.user.teacher
+        teacher = self.get_teacher(request)
         serializer = AccountDetailSerializer(teacher)
         
         # Include available sports
@@ -564,7 +569,7 @@ class AccountDetailView(APIView):
         return Response(response_data, status=status.HTTP_200_OK)
     
     def patch(self, request):
-        teacher = request.user.teacher
+        teacher = self.get_teacher(request)
         document = getattr(teacher, "document", None)
         user = teacher.user
         
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0019_subscriptionteacher'),
+        ('teacher', '0013_bookedsession_notification_reminder_sent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookedsession',
+            index=models.Index(condition=models.Q(('is_paid', True), models.Q(('reminder_sent', False), ('notification_reminder_sent', False), _connector='OR')), fields=['session_time'], name='booked_session_reminder_due'),
+        ),
+    ]
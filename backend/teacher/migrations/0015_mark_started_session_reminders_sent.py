@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:02
+
+from django.db import migrations
+from django.db.models import Q
+from django.utils import timezone
+
+
+def mark_started_sessions_sent(apps, schema_editor):
+    BookedSession = apps.get_model('teacher', 'BookedSession')
+
+    # Sessions that started without their reminders would stay in the
+    # booked_session_reminder_due index for good
+    BookedSession.objects.filter(
+        Q(reminder_sent=False) | Q(notification_reminder_sent=False),
+        session_time__lte=timezone.now(),
+    ).update(reminder_sent=True, notification_reminder_sent=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher', '0014_bookedsession_reminder_due_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_started_sessions_sent, migrations.RunPython.noop),
+    ]
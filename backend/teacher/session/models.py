@@ -107,6 +107,19 @@ class BookedSession(models.Model):
     notification_reminder_sent = models.BooleanField(default=False)
     is_paid = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Due reminders: upcoming sessions only, the sweeper marks started
+            # ones sent, so the index stays small and its probe cheap
+            models.Index(
+                fields=["session_time"],
+                name="booked_session_reminder_due",
+                condition=models.Q(is_paid=True) & (
+                    models.Q(reminder_sent=False) | models.Q(notification_reminder_sent=False)
+                ),
+            ),
+        ]
+
     def __str__(self):
         teacher_name = self.teacher.user.username if self.teacher and self.teacher.user else "Unknown Teacher"
         student_name = self.student.username if self.student else "Unknown Student"